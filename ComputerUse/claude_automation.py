@@ -1,24 +1,23 @@
 import asyncio
-import websockets
 import json
 
+from computer_client import ComputerClient
+
 class ClaudeAutomation:
     def __init__(self, uri="ws://localhost:8767"):
         self.uri = uri
-        
+        self.client = ComputerClient(uri)
+
+    def report_error(self, cmd, result):
+        if result.get('status') == 'error':
+            print(f"Error executing command {cmd}: {result.get('message')}")
+
     async def execute_commands(self, commands):
-        async with websockets.connect(self.uri) as websocket:
-            results = []
-            for cmd in commands:
-                try:
-                    await websocket.send(json.dumps(cmd))
-                    response = await websocket.recv()
-                    results.append(json.loads(response))
-                    await asyncio.sleep(3)  # Delay between commands
-                except Exception as e:
-                    print(f"Error executing command {cmd}: {str(e)}")
-                    results.append({"status": "error", "message": str(e)})
-            return results
+        # Each command completes before the next is sent, so no fixed delay is needed
+        return await self.client.sequence(commands, on_result=self.report_error)
+
+    async def close(self):
+        await self.client.close()
 
     async def select_all_and_copy(self):
         commands = [
@@ -49,17 +48,21 @@ class ClaudeAutomation:
 async def main():
     automation = ClaudeAutomation()
     
-    results = await automation.select_all_and_copy()
-    print("Select and copy results:", json.dumps(results, indent=2))
-    
-    position = await automation.get_mouse_position()
-    print("Mouse position:", json.dumps(position, indent=2))
-    
-    click_results = await automation.move_and_click(500, 500)
-    print("Move and click results:", json.dumps(click_results, indent=2))
-    
-    paste_results = await automation.paste()
-    print("Paste results:", json.dumps(paste_results, indent=2))
+    try:
+        results = await automation.select_all_and_copy()
+        print("Select and copy results:", json.dumps(results, indent=2))
+        
+        position = await automation.get_mouse_position()
+        print("Mouse position:", json.dumps(position, indent=2))
+        
+        click_results = await automation.move_and_click(500, 500)
+        print("Move and click results:", json.dumps(click_results, indent=2))
+        
+        paste_results = await automation.paste()
+        print("Paste results:", json.dumps(paste_results, indent=2))
+        print("Latency:", json.dumps(automation.client.stats(), indent=2))
+    finally:
+        await automation.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,7 +1,8 @@
 import asyncio
-import websockets
 import json
 
+from computer_client import ComputerClient
+
 async def run_claude_test():
     uri = "ws://localhost:8767"
     
@@ -23,20 +24,20 @@ async def run_claude_test():
     ]
     
     try:
-        async with websockets.connect(uri) as websocket:
+        async with ComputerClient(uri) as client:
             print("Connected to MCP server")
             
             for cmd in commands:
                 print(f"\nSending command: {json.dumps(cmd, indent=2)}")
-                await websocket.send(json.dumps(cmd))
-                response = await websocket.recv()
-                print(f"Server response: {response}")
-                await asyncio.sleep(2)  # Wait between commands
+                # Returns once the server has executed the command
+                response = await client.request(cmd)
+                print(f"Server response: {json.dumps(response)}")
                 
             print("\nTest sequence completed successfully")
+            print(f"Latency: {json.dumps(client.stats(), indent=2)}")
             
     except Exception as e:
         print(f"Error during test: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(run_claude_test())
\ No newline at end of file
+    asyncio.run(run_claude_test())
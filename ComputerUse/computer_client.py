@@ -0,0 +1,220 @@
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import defaultdict
+
+import websockets
+
+class ComputerClient:
+    """Persistent, pipelined client for the Computer Control Server.
+
+    One WebSocket is kept open for the lifetime of the client and is
+    re-established automatically (with jittered exponential backoff) when it
+    drops. Every request carries an ID, so any number of them can be in flight
+    and responses are matched back regardless of arrival order. WebSocket
+    pings act as heartbeats, so a dead peer is detected even when idle.
+
+    Usage:
+        async with ComputerClient() as client:
+            position = await client.request({"type": "system", "action": "get_mouse_position"})
+            results = await client.batch([...])
+    """
+
+    def __init__(self, uri="ws://localhost:8767", name=None, timeout=30.0,
+                 heartbeat_interval=10.0, heartbeat_timeout=10.0,
+                 backoff_base=0.1, backoff_max=10.0, verbose=False):
+        self.uri = uri
+        self.name = name or uri
+        self.timeout = timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.verbose = verbose
+        self.websocket = None
+        self.pending = {}
+        self.connected = asyncio.Event()
+        # action name -> list of round-trip latencies in seconds
+        self.latencies = defaultdict(list)
+        self._ids = itertools.count(1)
+        self._task = None
+
+    async def __aenter__(self):
+        try:
+            await self.connect()
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def in_flight(self):
+        return len(self.pending)
+
+    def start(self):
+        """Start the background connection loop without waiting for it"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def connect(self, timeout=None):
+        """Start the connection loop and wait until the first connection is up"""
+        self.start()
+        await asyncio.wait_for(self.connected.wait(), timeout or self.timeout)
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._fail_pending(ConnectionError(f"{self.name} closed"))
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            try:
+                async with websockets.connect(
+                    self.uri,
+                    ping_interval=self.heartbeat_interval,
+                    ping_timeout=self.heartbeat_timeout
+                ) as websocket:
+                    self.websocket = websocket
+                    self.connected.set()
+                    attempt = 0
+                    if self.verbose:
+                        print(f"Connected to {self.name}")
+                    async for message in websocket:
+                        self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.verbose or attempt == 0:
+                    print(f"Connection to {self.name} failed: {e}")
+            finally:
+                self.connected.clear()
+                self.websocket = None
+                self._fail_pending(ConnectionError(f"Lost connection to {self.name}"))
+            # Full jitter keeps many clients from reconnecting in lockstep
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _dispatch(self, message):
+        try:
+            response = json.loads(message)
+        except json.JSONDecodeError:
+            print(f"{self.name} sent invalid JSON: {message!r}")
+            return
+        future = self.pending.pop(response.pop('id', None), None)
+        if future is not None and not future.done():
+            future.set_result(response)
+
+    def _fail_pending(self, exc):
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def submit(self, command, timeout=None):
+        """Send a command and return its request ID and a future for its response.
+
+        Sends happen in call order, so commands submitted on one client are
+        executed by the server in the same order. Wait for the response with
+        `result`, which also forgets requests that time out.
+        """
+        if not self.connected.is_set():
+            self.start()
+            await asyncio.wait_for(self.connected.wait(), timeout or self.timeout)
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            await self.websocket.send(json.dumps({**command, 'id': request_id}))
+        except Exception:
+            self.pending.pop(request_id, None)
+            raise
+        return request_id, future
+
+    async def result(self, request_id, future, timeout=None):
+        """Wait for the response to a submitted command.
+
+        A request that times out or whose waiter is cancelled is forgotten, so it
+        no longer counts as in flight.
+        """
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def _complete(self, command, request_id, future, sent, timeout):
+        response = await self.result(request_id, future, timeout)
+        name = f"{command.get('type', '')}.{command.get('action', '')}"
+        self.latencies[name].append(time.perf_counter() - sent)
+        return response
+
+    async def request(self, command, timeout=None):
+        """Send one command and wait until the server has executed it"""
+        sent = time.perf_counter()
+        request_id, future = await self.submit(command, timeout)
+        return await self._complete(command, request_id, future, sent, timeout)
+
+    async def batch(self, commands, timeout=None):
+        """Pipeline several commands and wait for all of them.
+
+        The server executes them in order; results are returned in the same
+        order as `commands`. Failures are returned as error responses instead
+        of aborting the rest of the batch.
+        """
+        pending = []
+        for command in commands:
+            sent = time.perf_counter()
+            request_id, future = await self.submit(command, timeout)
+            pending.append(self._complete(command, request_id, future, sent, timeout))
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        return [
+            {'status': 'error', 'message': str(r) or type(r).__name__} if isinstance(r, Exception) else r
+            for r in results
+        ]
+
+    async def sequence(self, commands, timeout=None, on_result=None):
+        """Run commands one after another, each waiting for the previous one to complete"""
+        results = []
+        for command in commands:
+            try:
+                result = await self.request(command, timeout)
+            except Exception as e:
+                result = {'status': 'error', 'message': str(e) or type(e).__name__}
+            if on_result is not None:
+                on_result(command, result)
+            results.append(result)
+        return results
+
+    async def drain(self, timeout=None):
+        """Wait until every in-flight request has completed"""
+        if self.pending:
+            await asyncio.wait(list(self.pending.values()), timeout=timeout or self.timeout)
+
+    async def cancel(self, target=None):
+        """Cancel queued actions by request ID (all queued actions when target is None)"""
+        command = {'type': 'control', 'action': 'cancel'}
+        if target is not None:
+            command['target'] = target
+        return await self.request(command)
+
+    def stats(self):
+        """Per-action call count and latency percentiles in milliseconds"""
+        summary = {}
+        for name, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            pick = lambda pct: round(ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))] * 1000, 3)
+            summary[name] = {'count': len(ordered), 'p50_ms': pick(50), 'p95_ms': pick(95), 'max_ms': pick(100)}
+        return summary
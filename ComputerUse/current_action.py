@@ -1,18 +1,18 @@
 import asyncio
-import websockets
 import json
 
+from computer_client import ComputerClient
+
 async def test_connection():
     uri = "ws://localhost:8767"
     # First let's check system info
     command = {"type": "system", "action": "get_mouse_position"}
     
     try:
-        async with websockets.connect(uri) as websocket:
+        async with ComputerClient(uri) as client:
             print("Connected to MCP server")
-            await websocket.send(json.dumps(command))
-            response = await websocket.recv()
-            print(f"Current mouse position: {response}")
+            response = await client.request(command)
+            print(f"Current mouse position: {json.dumps(response)}")
             
             # Now move mouse to center
             move_command = {
@@ -21,12 +21,11 @@ async def test_connection():
                 "x": 500, 
                 "y": 500
             }
-            await websocket.send(json.dumps(move_command))
-            move_response = await websocket.recv()
-            print(f"Move result: {move_response}")
+            move_response = await client.request(move_command)
+            print(f"Move result: {json.dumps(move_response)}")
             
     except Exception as e:
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(test_connection())
\ No newline at end of file
+    asyncio.run(test_connection())
@@ -1,7 +1,8 @@
 import asyncio
-import websockets
 import json
 
+from computer_client import ComputerClient
+
 async def execute_mcp_commands():
     uri = "ws://localhost:8767"
     commands = [
@@ -14,14 +15,13 @@ async def execute_mcp_commands():
     ]
     
     try:
-        async with websockets.connect(uri) as websocket:
+        async with ComputerClient(uri) as client:
             print("Connected to MCP server")
-            for cmd in commands:
-                print(f"\nExecuting command: {json.dumps(cmd, indent=2)}")
-                await websocket.send(json.dumps(cmd))
-                response = await websocket.recv()
-                print(f"Response: {response}")
-                await asyncio.sleep(3)  # Wait 3 seconds between commands
+            # Pipeline all commands; the server executes them in order
+            results = await client.batch(commands)
+            for cmd, response in zip(commands, results):
+                print(f"\nExecuted command: {json.dumps(cmd, indent=2)}")
+                print(f"Response: {json.dumps(response)}")
             
             print("\nAll commands executed successfully")
             
@@ -29,4 +29,4 @@ async def execute_mcp_commands():
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(execute_mcp_commands())
\ No newline at end of file
+    asyncio.run(execute_mcp_commands())
@@ -1,28 +1,380 @@
 import asyncio
+import os
 import websockets
 import json
 import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+from computer_client import ComputerClient
+from mcp_computer_server import is_read_only
+
+class UpstreamPool:
+    """A fixed-size pool of persistent, multiplexed upstream connections"""
+
+    def __init__(self, uri, size=4, backoff_base=0.1, backoff_max=10.0):
+        self.uri = uri
+        self.connections = [
+            ComputerClient(uri, name=f"{uri}#{i}", backoff_base=backoff_base,
+                           backoff_max=backoff_max, verbose=True)
+            for i in range(size)
+        ]
+        # Number of proxy clients pinned to each connection
+        self.assigned = {connection: 0 for connection in self.connections}
+
+    def start(self):
+        for connection in self.connections:
+            connection.start()
+
+    async def close(self):
+        await asyncio.gather(*(connection.close() for connection in self.connections))
+
+    def assign(self):
+        """Pin a new client to the connection with the fewest pinned clients"""
+        live = [c for c in self.connections if c.connected.is_set()]
+        connection = min(live or self.connections, key=lambda c: (self.assigned[c], c.in_flight))
+        self.assigned[connection] += 1
+        return connection
+
+    def release(self, connection):
+        self.assigned[connection] -= 1
+
+    def pick(self, preferred=None):
+        """Return the preferred connection if it is up, else the least loaded live one"""
+        if preferred is not None and preferred.connected.is_set():
+            return preferred
+        live = [c for c in self.connections if c.connected.is_set()]
+        return min(live or self.connections, key=lambda c: c.in_flight)
+
+
+class CircuitBreaker:
+    """Fails fast once a backend has failed repeatedly.
+
+    closed -> open after `failure_threshold` consecutive failures; after
+    `reset_timeout` seconds one trial request is let through (half-open) and
+    its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.state = 'closed'
+        self.opened_at = 0.0
+
+    def allow(self):
+        if self.state == 'open':
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = 'half_open'
+            return True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.state = 'closed'
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+
+
+class Backend:
+    """One Computer Control Server (usually one desktop) behind the proxy"""
+
+    def __init__(self, name, uri, pool_size=4, failure_threshold=3, reset_timeout=10.0):
+        self.name = name
+        self.uri = uri
+        self.pool = UpstreamPool(uri, size=pool_size)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.healthy = False
+        self.sessions = 0
+
+    @property
+    def available(self):
+        return self.healthy and self.breaker.state != 'open'
+
+    @property
+    def load(self):
+        return (self.sessions, sum(c.in_flight for c in self.pool.connections))
+
+    async def request(self, command, timeout, connection=None):
+        """Send one command and wait for its response, updating the circuit breaker"""
+        if not self.breaker.allow():
+            raise ConnectionError(f"Backend {self.name} is unavailable (circuit open)")
+        try:
+            connection = self.pool.pick(connection)
+            _, upstream = await connection.submit(command, timeout)
+            response = await asyncio.wait_for(upstream, timeout)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return response
+
+    def status(self):
+        return {
+            'name': self.name,
+            'uri': self.uri,
+            'healthy': self.healthy,
+            'circuit': self.breaker.state,
+            'sessions': self.sessions,
+            'in_flight': self.load[1],
+        }
+
+
+class BackendRegistry:
+    """Backends plus the routing-key -> backend assignments that give sessions affinity"""
+
+    def __init__(self, session_ttl=3600.0):
+        self.backends = {}
+        self.session_ttl = session_ttl
+        # routing key -> [backend name, last seen]
+        self.routes = {}
+
+    def add(self, backend):
+        self.backends[backend.name] = backend
+
+    async def remove(self, name):
+        backend = self.backends.pop(name, None)
+        if backend is not None:
+            self.routes = {key: route for key, route in self.routes.items() if route[0] != name}
+            await backend.pool.close()
+
+    def place(self, routing_key=None):
+        """Return the backend for a routing key, placing new keys on the least loaded backend"""
+        route = self.routes.get(routing_key) if routing_key is not None else None
+        if route is not None and route[0] in self.backends:
+            route[1] = time.monotonic()
+            return self.backends[route[0]]
+
+        candidates = [b for b in self.backends.values() if b.available] or list(self.backends.values())
+        if not candidates:
+            raise ConnectionError("No backends registered")
+        backend = min(candidates, key=lambda b: b.load)
+        if routing_key is not None:
+            self.routes[routing_key] = [backend.name, time.monotonic()]
+        return backend
+
+    def prune_routes(self):
+        cutoff = time.monotonic() - self.session_ttl
+        self.routes = {key: route for key, route in self.routes.items() if route[1] >= cutoff}
+
+
+def parse_backends(spec):
+    """Parse 'name=ws://host:port,name2=ws://host2:port' into a dict"""
+    backends = {}
+    for i, entry in enumerate(part.strip() for part in spec.split(',')):
+        if not entry:
+            continue
+        name, sep, uri = entry.partition('=')
+        if not sep:
+            name, uri = f"backend{i}", entry
+        backends[name.strip()] = uri.strip()
+    return backends
+
 
 class MCPIntegrationServer:
-    def __init__(self):
-        self.host = 'localhost'
-        self.port = 8767
-        
+    def __init__(self, host=None, port=None, upstream_uri=None, pool_size=None, request_timeout=None,
+                 backends=None, health_interval=None):
+        self.host = host or os.getenv('INTEGRATION_HOST', 'localhost')
+        self.port = port or int(os.getenv('INTEGRATION_PORT', '8768'))
+        self.request_timeout = request_timeout or float(os.getenv('UPSTREAM_TIMEOUT', '30'))
+        self.health_interval = health_interval or float(os.getenv('HEALTH_CHECK_INTERVAL', '5'))
+        pool_size = pool_size or int(os.getenv('UPSTREAM_POOL_SIZE', '4'))
+
+        # BACKENDS takes precedence; a single UPSTREAM_URI is the one-desktop setup
+        if backends is None:
+            if upstream_uri is None and os.getenv('BACKENDS'):
+                backends = parse_backends(os.getenv('BACKENDS'))
+            else:
+                backends = {'default': upstream_uri or os.getenv('UPSTREAM_URI', 'ws://localhost:8767')}
+
+        self.registry = BackendRegistry(session_ttl=float(os.getenv('SESSION_TTL', '3600')))
+        for name, uri in backends.items():
+            self.registry.add(Backend(
+                name,
+                uri,
+                pool_size=pool_size,
+                failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '3')),
+                reset_timeout=float(os.getenv('CIRCUIT_RESET_TIMEOUT', '10'))
+            ))
+        self._health_task = None
+
+    def start(self):
+        for backend in self.registry.backends.values():
+            backend.pool.start()
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self.health_check_loop())
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await asyncio.gather(*(b.pool.close() for b in self.registry.backends.values()))
+
+    async def check_backend(self, backend):
+        probe = {'type': 'system', 'action': 'get_screen_size'}
+        try:
+            # Probes bypass the breaker's fast-fail so an open circuit can recover
+            connection = backend.pool.pick()
+            _, upstream = await connection.submit(probe, self.health_interval)
+            await asyncio.wait_for(upstream, self.health_interval)
+        except Exception as e:
+            if backend.healthy:
+                print(f"Backend {backend.name} failed health check: {str(e) or type(e).__name__}")
+            backend.healthy = False
+            backend.breaker.record_failure()
+            return
+        if not backend.healthy:
+            print(f"Backend {backend.name} is healthy")
+        backend.healthy = True
+        backend.breaker.record_success()
+
+    async def health_check_loop(self):
+        while True:
+            await asyncio.gather(*(self.check_backend(b) for b in list(self.registry.backends.values())))
+            self.registry.prune_routes()
+            await asyncio.sleep(self.health_interval)
+
+    def routing_params(self, websocket):
+        """Read ?session=<key> / ?backend=<name> from the connection URL"""
+        request = getattr(websocket, 'request', None)
+        path = request.path if request is not None else getattr(websocket, 'path', '')
+        params = parse_qs(urlparse(path or '').query)
+        return params.get('session', [None])[0], params.get('backend', [None])[0]
+
+    async def fan_out(self, command):
+        """Run a read-only command on several backends at once"""
+        inner = command.get('command') or {}
+        if not isinstance(inner, dict) or not is_read_only(inner):
+            return {'status': 'error', 'message': 'Only read-only actions can be fanned out'}
+        names = command.get('backends', '*')
+        if names == '*':
+            names = list(self.registry.backends)
+        backends = [self.registry.backends[n] for n in names if n in self.registry.backends]
+        responses = await asyncio.gather(
+            *(b.request(inner, self.request_timeout) for b in backends),
+            return_exceptions=True
+        )
+        results = {}
+        for backend, response in zip(backends, responses):
+            if isinstance(response, Exception):
+                response = {'status': 'error', 'message': str(response) or type(response).__name__}
+            results[backend.name] = response
+        for name in names:
+            if name not in self.registry.backends:
+                results[name] = {'status': 'error', 'message': f'Unknown backend: {name}'}
+        return {'status': 'success', 'action': 'fanout', 'results': results}
+
+    async def handle_proxy_action(self, command):
+        action = command.get('action')
+        if action == 'list_backends':
+            return {
+                'status': 'success',
+                'action': 'list_backends',
+                'backends': [b.status() for b in self.registry.backends.values()]
+            }
+        return {'status': 'error', 'message': 'Unknown proxy action'}
+
+    async def cancelled_nothing(self):
+        return {'status': 'success', 'action': 'cancel', 'cancelled': 0}
+
+    async def cancel_upstream(self, backend, command, upstream_ids, target):
+        """Send a cancel to each pooled connection holding one of the targeted requests"""
+        if target is None:
+            entries = list(upstream_ids.values())
+        else:
+            entries = [upstream_ids[t] for t in (target if isinstance(target, list) else [target]) if t in upstream_ids]
+        by_connection = {}
+        for connection, upstream_id in entries:
+            by_connection.setdefault(connection, []).append(upstream_id)
+        if not by_connection:
+            return await self.cancelled_nothing()
+        upstreams = []
+        for connection, targets in by_connection.items():
+            _, upstream = await connection.submit({**command, 'target': targets}, self.request_timeout)
+            upstreams.append(self.await_upstream(backend, upstream))
+        responses = await asyncio.gather(*upstreams)
+        for response in responses:
+            if response.get('status') != 'success':
+                return response
+        return {'status': 'success', 'action': 'cancel',
+                'cancelled': sum(r.get('cancelled', 0) for r in responses)}
+
+    async def forward(self, websocket, request, client_id, has_id, upstream_ids, entry=None):
+        """Await a response and relay it to the client under its own ID"""
+        try:
+            response = await request
+        except Exception as e:
+            response = {'status': 'error', 'message': str(e) or type(e).__name__}
+        finally:
+            # A reused client ID may already map to a newer request
+            if entry is not None and upstream_ids.get(client_id) == entry:
+                del upstream_ids[client_id]
+        if has_id:
+            response['id'] = client_id
+        try:
+            await websocket.send(json.dumps(response))
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
     async def handle_connection(self, websocket):
         print("New client connected to integration server")
+        session_key, backend_name = self.routing_params(websocket)
+        if backend_name is not None:
+            backend = self.registry.backends.get(backend_name)
+            if backend is None:
+                await websocket.close(1008, f"Unknown backend: {backend_name}")
+                return
+        else:
+            backend = self.registry.place(session_key)
+        backend.sessions += 1
+        print(f"Client routed to backend {backend.name}")
+
+        # Pin each client to one upstream connection so its actions keep their order.
+        # Spreading clients across the pool also keeps the upstream scheduler's
+        # per-connection fairness meaningful.
+        pinned = connection = backend.pool.assign()
+        tasks = set()
+        # client request ID -> (upstream connection, upstream request ID), for translating cancellations
+        upstream_ids = {}
         try:
             async for message in websocket:
                 try:
                     # Parse incoming message
                     command = json.loads(message)
-                    
-                    # Forward command to computer control server
-                    async with websockets.connect(f'ws://{self.host}:{self.port}') as computer_ws:
-                        await computer_ws.send(json.dumps(command))
-                        response = await computer_ws.recv()
-                        # Forward response back to client
-                        await websocket.send(response)
-                        
+                    has_id = isinstance(command, dict) and 'id' in command
+                    client_id = command.pop('id', None) if has_id else None
+                    entry = None
+
+                    if command.get('type') == 'fanout':
+                        request = self.fan_out(command)
+                    elif command.get('type') == 'proxy':
+                        request = self.handle_proxy_action(command)
+                    elif command.get('type') == 'control' and command.get('action') == 'cancel':
+                        # Cancel only this client's requests, on whichever shared connections carry them
+                        request = self.cancel_upstream(backend, command, upstream_ids, command.get('target'))
+                    else:
+                        # Fail fast instead of queueing behind a dead backend
+                        if not backend.breaker.allow():
+                            raise ConnectionError(f"Backend {backend.name} is unavailable (circuit open)")
+                        # Forward command to computer control server over a shared connection
+                        connection = backend.pool.pick(connection)
+                        upstream_id, upstream = await connection.submit(command, self.request_timeout)
+                        request = self.await_upstream(backend, upstream)
+                        if has_id:
+                            entry = upstream_ids[client_id] = (connection, upstream_id)
+                    task = asyncio.create_task(self.forward(websocket, request, client_id, has_id, upstream_ids, entry))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
                 except json.JSONDecodeError as e:
                     error_response = {
                         'status': 'error',
@@ -30,26 +382,47 @@ class MCPIntegrationServer:
                     }
                     await websocket.send(json.dumps(error_response))
                 except Exception as e:
+                    if isinstance(e, (ConnectionError, asyncio.TimeoutError)):
+                        backend.breaker.record_failure()
                     error_response = {
                         'status': 'error',
-                        'message': str(e)
+                        'message': str(e) or type(e).__name__
                     }
+                    if has_id:
+                        error_response['id'] = client_id
                     await websocket.send(json.dumps(error_response))
         except Exception as e:
             print(f"Connection error: {e}")
         finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            backend.sessions -= 1
+            backend.pool.release(pinned)
             print("Client disconnected from integration server")
 
+    async def await_upstream(self, backend, upstream):
+        try:
+            response = await asyncio.wait_for(upstream, self.request_timeout)
+        except Exception:
+            backend.breaker.record_failure()
+            raise
+        backend.breaker.record_success()
+        return response
+
     async def start_server(self):
-        integration_port = 8768  # Different port from computer server
+        self.start()
         server = await websockets.serve(
             self.handle_connection,
             self.host,
-            integration_port
+            self.port
         )
-        
-        print(f"MCP Integration Server running on ws://{self.host}:{integration_port}")
-        await server.wait_closed()
+
+        targets = ', '.join(f"{b.name}={b.uri}" for b in self.registry.backends.values())
+        print(f"MCP Integration Server running on ws://{self.host}:{self.port} -> {targets}")
+        try:
+            await server.wait_closed()
+        finally:
+            await self.close()
 
 async def main():
     try:
@@ -62,4 +435,4 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
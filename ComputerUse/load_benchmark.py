@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""Load generator and latency benchmark for the computer-control WebSocket stack.
+
+Opens N concurrent clients against a ComputerControlServer (or an
+MCPIntegrationServer in front of one) and replays a mixed action profile at a
+target rate. Each client runs an open-loop schedule: commands are pipelined
+(the protocol matches responses by id) and sent when they are due, whether or
+not earlier responses have arrived, so a server that falls behind shows up as
+growing latency and requests in flight rather than as a lower send rate. The
+server stamps each response with the time its action waited in the scheduler's
+queue, which is reported as queueing delay per action type. Send lag (due time
+to actual send) is reported to confirm the generator kept up.
+
+Examples:
+    # Benchmark an in-process server backed by a mock input backend
+    python load_benchmark.py --mock --clients 8 --rate 20 --duration 10
+
+    # Same, with an in-process integration proxy in front of the mock server
+    python load_benchmark.py --mock --proxy --clients 8 --rate 20
+
+    # Benchmark a running integration proxy
+    python load_benchmark.py --uri ws://localhost:8768 --clients 4 --rate 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+import websockets
+
+from computer_client import ComputerClient
+
+# Action profiles: (weight, command) pairs replayed by every client
+PROFILES = {
+    "mixed": [
+        (4, {"type": "system", "action": "get_mouse_position"}),
+        (1, {"type": "system", "action": "get_screen_size"}),
+        (3, {"type": "mouse", "action": "move", "x": 500, "y": 500}),
+        (2, {"type": "mouse", "action": "click"}),
+        (1, {"type": "keyboard", "action": "press", "key": "shift"}),
+        (1, {"type": "keyboard", "action": "type", "text": "benchmark"}),
+    ],
+    "read_only": [
+        (3, {"type": "system", "action": "get_mouse_position"}),
+        (1, {"type": "system", "action": "get_screen_size"}),
+    ],
+    "input_heavy": [
+        (3, {"type": "mouse", "action": "move", "x": 500, "y": 500}),
+        (2, {"type": "mouse", "action": "click"}),
+        (2, {"type": "keyboard", "action": "hotkey", "keys": ["shift", "tab"]}),
+        (1, {"type": "keyboard", "action": "type", "text": "benchmark"}),
+    ],
+}
+
+
+class MockInputBackend:
+    """Stand-in for pyautogui that records calls and simulates input latency.
+
+    pyautogui calls are synchronous, so the simulated latency blocks the server's
+    input thread exactly like the real backend does.
+    """
+
+    def __init__(self, latency=0.0, width=1920, height=1080):
+        self.latency = latency
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+        self.calls = 0
+        self.FAILSAFE = False
+
+    def _act(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def size(self):
+        return self.width, self.height
+
+    def position(self):
+        self._act()
+        return self.x, self.y
+
+    def moveTo(self, x, y):
+        self._act()
+        self.x, self.y = x, y
+
+    def dragTo(self, x, y, duration=0.0):
+        self._act()
+        self.x, self.y = x, y
+
+    def click(self, button='left', clicks=1):
+        self._act()
+
+    def scroll(self, amount):
+        self._act()
+
+    def write(self, text):
+        self._act()
+
+    def press(self, key):
+        self._act()
+
+    def hotkey(self, *keys):
+        self._act()
+
+
+class MockClipboard:
+    def __init__(self):
+        self.text = ""
+
+    def copy(self, text):
+        self.text = text
+
+    def paste(self):
+        return self.text
+
+
+def action_name(command):
+    return f"{command.get('type', '')}.{command.get('action', '')}"
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class LoadBenchmark:
+    def __init__(self, uri, clients, rate, duration, profile, seed=None):
+        self.uri = uri
+        self.clients = clients
+        self.rate = rate
+        self.duration = duration
+        self.profile = PROFILES[profile]
+        self.random = random.Random(seed)
+        # action name -> list of (send_lag, latency, queue_delay) samples in seconds;
+        # queue_delay is None when the server did not report it
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.max_in_flight = 0
+
+    def pick_command(self):
+        weights = [weight for weight, _ in self.profile]
+        _, command = self.random.choices(self.profile, weights=weights)[0]
+        return command
+
+    async def run_client(self, client_id, start):
+        interval = 1.0 / self.rate
+        # Stagger clients so they do not all fire on the same tick
+        scheduled = start + interval * client_id / self.clients
+        deadline = start + self.duration
+        in_flight = []
+        async with ComputerClient(self.uri) as client:
+            while scheduled < deadline:
+                command = self.pick_command()
+                now = time.perf_counter()
+                if scheduled > now:
+                    await asyncio.sleep(scheduled - now)
+                sent = time.perf_counter()
+                name = action_name(command)
+                try:
+                    request_id, future = await client.submit(command)
+                except (ConnectionError, asyncio.TimeoutError):
+                    self.errors[name] += 1
+                    break
+                self.max_in_flight = max(self.max_in_flight, client.in_flight)
+                # Do not wait for the response before sending the next command
+                in_flight.append(asyncio.ensure_future(
+                    self.record(client, name, request_id, future, sent - scheduled, sent)
+                ))
+                scheduled += interval
+            await asyncio.gather(*in_flight)
+
+    async def record(self, client, name, request_id, future, send_lag, sent):
+        try:
+            response = await client.result(request_id, future)
+        except (ConnectionError, asyncio.TimeoutError):
+            self.errors[name] += 1
+            return
+        received = time.perf_counter()
+        if response.get('status') != 'success':
+            self.errors[name] += 1
+        queued_ms = response.get('queued_ms')
+        self.samples[name].append((send_lag, received - sent, queued_ms / 1000 if queued_ms is not None else None))
+
+    async def run(self):
+        start = time.perf_counter() + 0.05
+        results = await asyncio.gather(
+            *(self.run_client(i, start) for i in range(self.clients)),
+            return_exceptions=True
+        )
+        elapsed = time.perf_counter() - start
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Client error: {result}", file=sys.stderr)
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        def summarise(samples):
+            lag = [g * 1000 for g, _, _ in samples]
+            latency = [l * 1000 for _, l, _ in samples]
+            queue = [q * 1000 for _, _, q in samples if q is not None]
+            return {
+                "count": len(samples),
+                "throughput_per_sec": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+                "latency_ms": {
+                    "p50": percentile(latency, 50),
+                    "p95": percentile(latency, 95),
+                    "p99": percentile(latency, 99),
+                    "max": max(latency) if latency else None,
+                },
+                "queue_delay_ms": {
+                    "p50": percentile(queue, 50),
+                    "p95": percentile(queue, 95),
+                    "p99": percentile(queue, 99),
+                    "max": max(queue) if queue else None,
+                },
+                "send_lag_ms": {
+                    "p50": percentile(lag, 50),
+                    "p95": percentile(lag, 95),
+                    "p99": percentile(lag, 99),
+                    "max": max(lag) if lag else None,
+                },
+            }
+
+        all_samples = [s for samples in self.samples.values() for s in samples]
+        return {
+            "uri": self.uri,
+            "clients": self.clients,
+            "target_rate_per_client": self.rate,
+            "duration_sec": round(elapsed, 3),
+            "max_in_flight_per_client": self.max_in_flight,
+            "total": summarise(all_samples),
+            "errors": dict(self.errors),
+            "actions": {name: summarise(samples) for name, samples in sorted(self.samples.items())},
+        }
+
+
+def print_report(report):
+    print(f"\nTarget: {report['uri']}  clients={report['clients']}  "
+          f"rate/client={report['target_rate_per_client']}/s  elapsed={report['duration_sec']}s  "
+          f"max in flight/client={report['max_in_flight_per_client']}")
+    header = f"{'action':<28}{'count':>8}{'ops/s':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'q p50':>9}{'q p99':>9}{'lag p99':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["actions"].items()) + [("TOTAL", report["total"])]
+    for name, stats in rows:
+        lat = stats["latency_ms"]
+        queue = stats["queue_delay_ms"]
+        lag = stats["send_lag_ms"]
+        fmt = lambda v: f"{v:9.2f}" if v is not None else f"{'-':>9}"
+        print(f"{name:<28}{stats['count']:>8}{stats['throughput_per_sec']:>10.1f}"
+              f"{fmt(lat['p50'])}{fmt(lat['p95'])}{fmt(lat['p99'])}{fmt(queue['p50'])}{fmt(queue['p99'])}"
+              f"{fmt(lag['p99'])}")
+    if report["errors"]:
+        print(f"\nErrors: {json.dumps(report['errors'])}")
+    print("(latency, server queueing delay and send lag in ms)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the computer-control WebSocket stack")
+    parser.add_argument("--uri", default="ws://localhost:8767", help="Server to benchmark")
+    parser.add_argument("--clients", type=int, default=4, help="Number of concurrent clients")
+    parser.add_argument("--rate", type=float, default=10.0, help="Target actions per second per client")
+    parser.add_argument("--duration", type=float, default=10.0, help="Run time in seconds")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed", help="Action mix to replay")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for the action mix")
+    parser.add_argument("--mock", action="store_true",
+                        help="Start an in-process ComputerControlServer with a mock input backend")
+    parser.add_argument("--mock-port", type=int, default=8777, help="Port for the mock server")
+    parser.add_argument("--mock-latency-ms", type=float, default=0.0,
+                        help="Simulated blocking time per input call on the mock backend")
+    parser.add_argument("--proxy", action="store_true",
+                        help="With --mock, also start an in-process MCPIntegrationServer in front of the mock server")
+    parser.add_argument("--proxy-port", type=int, default=8778, help="Port for the in-process proxy")
+    parser.add_argument("--json", dest="json_path", help="Write the report to this JSON file")
+    args = parser.parse_args()
+
+    mock_server = None
+    proxy = None
+    proxy_server = None
+    uri = args.uri
+    if args.mock:
+        from mcp_computer_server import ComputerControlServer
+        control = ComputerControlServer(
+            host='localhost',
+            port=args.mock_port,
+            backend=MockInputBackend(latency=args.mock_latency_ms / 1000.0),
+            clipboard=MockClipboard()
+        )
+        mock_server = await websockets.serve(control.handle_connection, control.host, control.port)
+        uri = f"ws://{control.host}:{control.port}"
+        print(f"Mock Computer Control Server running on {uri}")
+
+        if args.proxy:
+            from full_mcp_integration import MCPIntegrationServer
+            proxy = MCPIntegrationServer(host='localhost', port=args.proxy_port, upstream_uri=uri)
+            proxy.start()
+            proxy_server = await websockets.serve(proxy.handle_connection, proxy.host, proxy.port)
+            uri = f"ws://{proxy.host}:{proxy.port}"
+            print(f"In-process MCP Integration Server running on {uri}")
+
+    try:
+        benchmark = LoadBenchmark(uri, args.clients, args.rate, args.duration, args.profile, args.seed)
+        report = await benchmark.run()
+    finally:
+        if proxy_server is not None:
+            proxy_server.close()
+            await proxy_server.wait_closed()
+            await proxy.close()
+        if mock_server is not None:
+            mock_server.close()
+            await mock_server.wait_closed()
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nBenchmark stopped by user")
@@ -1,24 +1,21 @@
 import asyncio
-import websockets
 import json
 
+from computer_client import ComputerClient
+
 class ClaudeComputerClient:
     def __init__(self, uri="ws://localhost:8767"):
         self.uri = uri
+        self.client = ComputerClient(uri)
         
     async def send_command(self, command_data):
-        async with websockets.connect(self.uri) as websocket:
-            await websocket.send(json.dumps(command_data))
-            response = await websocket.recv()
-            return json.loads(response)
+        return await self.client.request(command_data)
             
     async def execute_sequence(self, commands):
-        results = []
-        for cmd in commands:
-            result = await self.send_command(cmd)
-            results.append(result)
-            await asyncio.sleep(3)
-        return results
+        return await self.client.sequence(commands)
+
+    async def close(self):
+        await self.client.close()
 
 async def main():
     client = ClaudeComputerClient()
@@ -36,6 +33,8 @@ async def main():
         print(json.dumps(results, indent=2))
     except Exception as e:
         print(f"Error: {str(e)}")
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
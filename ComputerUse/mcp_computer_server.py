@@ -1,40 +1,226 @@
 import asyncio
 import websockets
 import json
-import pyautogui
 import base64
 import io
-from PIL import Image
-from mss import mss
 import time
 import sys
 import os
-import pyperclip
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Actions that only read state and never generate OS input
+READ_ONLY_ACTIONS = {
+    ('system', 'get_screen_size'),
+    ('system', 'get_mouse_position'),
+}
+
+def is_read_only(action_data):
+    return (action_data.get('type'), action_data.get('action')) in READ_ONLY_ACTIONS
+
+class TokenBucket:
+    """Token-bucket rate limiter; a rate of 0 means unlimited"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until a token is available (0 if one is available now)"""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.rate:
+            self._refill()
+            self.tokens -= 1
+
+
+class ClientQueue:
+    """Per-connection lanes of (action, time queued), rate limit and outgoing responses"""
+
+    def __init__(self, websocket, rate, burst):
+        self.websocket = websocket
+        self.priority = deque()
+        self.input = deque()
+        self.bucket = TokenBucket(rate, burst)
+        self.outbox = asyncio.Queue()
+
+    @property
+    def queued(self):
+        return len(self.priority) + len(self.input)
+
+
+class ActionScheduler:
+    """Serialises actions from all connections onto the single OS input queue.
+
+    Every connection gets its own bounded queue. Read-only queries go in a
+    separately bounded priority lane that is always served before input; input actions are taken
+    round-robin across connections, subject to a per-connection and a global
+    rate limit. A connection whose queue is full gets an explicit 'busy'
+    response instead of having its messages buffered without limit.
+    Each response carries `queued_ms`, the time its action waited in the queue.
+    """
+
+    def __init__(self, execute, rate=None, burst=None, global_rate=None, max_queued=None):
+        self.execute = execute
+        self.rate = rate if rate is not None else float(os.getenv('CLIENT_ACTION_RATE', '0'))
+        self.burst = burst if burst is not None else float(os.getenv('CLIENT_ACTION_BURST', '10'))
+        self.max_queued = max_queued if max_queued is not None else int(os.getenv('CLIENT_MAX_QUEUED', '100'))
+        global_rate = global_rate if global_rate is not None else float(os.getenv('GLOBAL_ACTION_RATE', '0'))
+        self.global_bucket = TokenBucket(global_rate, self.burst)
+        self.clients = []
+        self._cursor = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def register(self, websocket):
+        client = ClientQueue(websocket, self.rate, self.burst)
+        self.clients.append(client)
+        return client
+
+    def unregister(self, client):
+        """Drop a disconnected client along with anything it still had queued"""
+        if client in self.clients:
+            index = self.clients.index(client)
+            self.clients.remove(client)
+            if index < self._cursor:
+                self._cursor -= 1
+
+    def submit(self, client, action_data):
+        """Queue an action; returns False when its lane of the client's queue is full"""
+        lane = client.priority if is_read_only(action_data) else client.input
+        if len(lane) >= self.max_queued:
+            return False
+        lane.append((action_data, time.monotonic()))
+        self._wakeup.set()
+        return True
+
+    def cancel(self, client, target=None):
+        """Remove queued (not yet executed) actions by ID or list of IDs; all of them when target is None"""
+        targets = target if isinstance(target, list) else [target]
+        cancelled = []
+        for lane in (client.priority, client.input):
+            keep = deque()
+            for entry in lane:
+                if target is None or entry[0].get('id') in targets:
+                    cancelled.append(entry[0])
+                else:
+                    keep.append(entry)
+            lane.clear()
+            lane.extend(keep)
+        return cancelled
+
+    def retry_after(self, client):
+        """Rough estimate of how long until the client's queue has room"""
+        rates = [r for r in (self.rate, self.global_bucket.rate) if r]
+        return round(client.queued / min(rates), 3) if rates else 0.0
+
+    def _next(self):
+        count = len(self.clients)
+        for offset in range(count):
+            client = self.clients[(self._cursor + offset) % count]
+            if client.priority:
+                return client, client.priority.popleft()
+        for offset in range(count):
+            index = (self._cursor + offset) % count
+            client = self.clients[index]
+            if client.input and client.bucket.wait_time() == 0 and self.global_bucket.wait_time() == 0:
+                client.bucket.take()
+                self.global_bucket.take()
+                self._cursor = (index + 1) % count
+                return client, client.input.popleft()
+        return None
+
+    def _next_ready_in(self):
+        waits = [
+            max(client.bucket.wait_time(), self.global_bucket.wait_time())
+            for client in self.clients if client.input
+        ]
+        return min(waits) if waits else None
+
+    async def run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._next_ready_in())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            client, (action_data, queued_at) = item
+            queued_ms = (time.monotonic() - queued_at) * 1000
+            response = await self.execute(action_data)
+            response['queued_ms'] = round(queued_ms, 3)
+            if 'id' in action_data:
+                response['id'] = action_data['id']
+            client.outbox.put_nowait(response)
+
 
 class ComputerControlServer:
-    def __init__(self, host='localhost', port=8767):
+    def __init__(self, host='localhost', port=8767, backend=None, clipboard=None):
         self.host = host
         self.port = port
-        self.sct = mss()
-        pyautogui.FAILSAFE = False
-        self.screen_width, self.screen_height = pyautogui.size()
-        
+        # The input backend and clipboard default to pyautogui/pyperclip but can be
+        # swapped out (e.g. for a mock backend when benchmarking without a desktop)
+        if backend is None:
+            import pyautogui
+            from mss import mss
+            self.sct = mss()
+            backend = pyautogui
+        if clipboard is None:
+            import pyperclip
+            clipboard = pyperclip
+        self.backend = backend
+        self.clipboard = clipboard
+        self.backend.FAILSAFE = False
+        self.screen_width, self.screen_height = self.backend.size()
+        self.input_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='input')
+        self.scheduler = ActionScheduler(self.execute_action)
+
+    async def call_backend(self, func, *args, **kwargs):
+        """Run a blocking input/clipboard call on the input thread.
+
+        A single thread keeps OS input strictly ordered while the event loop stays
+        free to accept queries, cancellations and new connections.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.input_executor, functools.partial(func, *args, **kwargs))
+
     async def execute_action(self, action_data):
         """Execute various computer control actions"""
         action_type = action_data.get('type', '')
         try:
             if action_type == 'keyboard':
-                return await self.handle_keyboard_action(action_data)
+                result = await self.handle_keyboard_action(action_data)
             elif action_type == 'mouse':
-                return await self.handle_mouse_action(action_data)
+                result = await self.handle_mouse_action(action_data)
             elif action_type == 'system':
-                return await self.handle_system_action(action_data)
+                result = await self.handle_system_action(action_data)
             elif action_type == 'text':
-                return await self.handle_text_action(action_data)
+                result = await self.handle_text_action(action_data)
             else:
                 return {'status': 'error', 'message': 'Unknown action type'}
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
+        if result is None:
+            return {'status': 'error', 'message': 'Unknown action'}
+        return result
 
     async def handle_keyboard_action(self, data):
         """Handle keyboard-related actions"""
@@ -42,17 +228,17 @@ class ComputerControlServer:
         
         if action == 'type':
             text = data.get('text', '')
-            pyautogui.write(text)
+            await self.call_backend(self.backend.write, text)
             return {'status': 'success', 'action': 'type', 'text': text}
             
         elif action == 'hotkey':
             keys = data.get('keys', [])
-            pyautogui.hotkey(*keys)
+            await self.call_backend(self.backend.hotkey, *keys)
             return {'status': 'success', 'action': 'hotkey', 'keys': keys}
             
         elif action == 'press':
             key = data.get('key', '')
-            pyautogui.press(key)
+            await self.call_backend(self.backend.press, key)
             return {'status': 'success', 'action': 'press', 'key': key}
 
     async def handle_mouse_action(self, data):
@@ -62,13 +248,13 @@ class ComputerControlServer:
         if action == 'move':
             x = data.get('x', 0)
             y = data.get('y', 0)
-            pyautogui.moveTo(x, y)
+            await self.call_backend(self.backend.moveTo, x, y)
             return {'status': 'success', 'action': 'move', 'position': {'x': x, 'y': y}}
             
         elif action == 'click':
             button = data.get('button', 'left')
             clicks = data.get('clicks', 1)
-            pyautogui.click(button=button, clicks=clicks)
+            await self.call_backend(self.backend.click, button=button, clicks=clicks)
             return {'status': 'success', 'action': 'click', 'button': button, 'clicks': clicks}
             
         elif action == 'drag':
@@ -77,9 +263,14 @@ class ComputerControlServer:
             end_x = data.get('end_x', 0)
             end_y = data.get('end_y', 0)
             duration = data.get('duration', 0.5)
-            pyautogui.dragTo(end_x, end_y, duration=duration)
+            await self.call_backend(self.backend.dragTo, end_x, end_y, duration=duration)
             return {'status': 'success', 'action': 'drag'}
 
+        elif action == 'scroll':
+            amount = data.get('amount', 0)
+            await self.call_backend(self.backend.scroll, amount)
+            return {'status': 'success', 'action': 'scroll', 'amount': amount}
+
     async def handle_system_action(self, data):
         """Handle system-related actions"""
         action = data.get('action', '')
@@ -93,7 +284,7 @@ class ComputerControlServer:
             }
             
         elif action == 'get_mouse_position':
-            x, y = pyautogui.position()
+            x, y = await self.call_backend(self.backend.position)
             return {
                 'status': 'success',
                 'action': 'get_mouse_position',
@@ -106,11 +297,11 @@ class ComputerControlServer:
         action = data.get('action', '')
         
         if action == 'copy':
-            pyautogui.hotkey('command', 'a')
+            await self.call_backend(self.backend.hotkey, 'command', 'a')
             await asyncio.sleep(0.1)
-            pyautogui.hotkey('command', 'c')
+            await self.call_backend(self.backend.hotkey, 'command', 'c')
             await asyncio.sleep(0.1)
-            text = pyperclip.paste()
+            text = await self.call_backend(self.clipboard.paste)
             return {
                 'status': 'success',
                 'action': 'copy',
@@ -119,31 +310,80 @@ class ComputerControlServer:
             
         elif action == 'paste':
             text = data.get('text', '')
-            pyperclip.copy(text)
-            pyautogui.hotkey('command', 'v')
+            await self.call_backend(self.clipboard.copy, text)
+            await self.call_backend(self.backend.hotkey, 'command', 'v')
             return {'status': 'success', 'action': 'paste'}
 
+    async def write_responses(self, client):
+        while True:
+            response = await client.outbox.get()
+            await client.websocket.send(json.dumps(response))
+
+    async def handle_control_action(self, client, data):
+        """Handle scheduler controls; these bypass the action queues"""
+        action = data.get('action', '')
+
+        if action == 'cancel':
+            cancelled = self.scheduler.cancel(client, data.get('target'))
+            for action_data in cancelled:
+                response = {'status': 'cancelled', 'action': action_data.get('action')}
+                if 'id' in action_data:
+                    response['id'] = action_data['id']
+                client.outbox.put_nowait(response)
+            return {'status': 'success', 'action': 'cancel', 'cancelled': len(cancelled)}
+
+        elif action == 'queue_status':
+            return {
+                'status': 'success',
+                'action': 'queue_status',
+                'queued': client.queued,
+                'max_queued': self.scheduler.max_queued
+            }
+
+        return {'status': 'error', 'message': 'Unknown control action'}
+
     async def handle_connection(self, websocket):
         print("New client connected")
+        self.scheduler.start()
+        client = self.scheduler.register(websocket)
+        writer = asyncio.create_task(self.write_responses(client))
         try:
             async for message in websocket:
                 try:
                     data = json.loads(message)
-                    response = await self.execute_action(data)
-                    await websocket.send(json.dumps(response))
+                    if not isinstance(data, dict):
+                        raise ValueError('Action must be a JSON object')
+                    if data.get('type') == 'control':
+                        response = await self.handle_control_action(client, data)
+                    elif self.scheduler.submit(client, data):
+                        continue
+                    else:
+                        # Explicit backpressure instead of unbounded buffering
+                        response = {
+                            'status': 'busy',
+                            'message': 'Action queue full',
+                            'queued': client.queued,
+                            'retry_after': self.scheduler.retry_after(client)
+                        }
+                    # Echo the request ID so clients can pipeline requests
+                    if 'id' in data:
+                        response['id'] = data['id']
+                    client.outbox.put_nowait(response)
                 except json.JSONDecodeError:
-                    await websocket.send(json.dumps({
+                    client.outbox.put_nowait({
                         'status': 'error',
                         'message': 'Invalid JSON format'
-                    }))
+                    })
                 except Exception as e:
-                    await websocket.send(json.dumps({
+                    client.outbox.put_nowait({
                         'status': 'error',
                         'message': str(e)
-                    }))
+                    })
         except Exception as e:
             print(f"Connection error: {e}")
         finally:
+            self.scheduler.unregister(client)
+            writer.cancel()
             print("Client disconnected")
 
     async def start_server(self):
@@ -163,6 +403,7 @@ class ComputerControlServer:
         print(f"Computer Control Server starting on ws://{self.host}:{self.port}")
         
         async with server:
+            self.scheduler.start()
             await asyncio.Future()
 
 async def main():
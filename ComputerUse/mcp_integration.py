@@ -1,9 +1,10 @@
 import asyncio
-import websockets
 import json
 import sys
 import os
 
+from computer_client import ComputerClient
+
 class MCPIntegration:
     def __init__(self):
         self.computer_uri = "ws://localhost:8767"  # Computer control server
@@ -18,14 +19,12 @@ class MCPIntegration:
 
     async def execute_computer_commands(self):
         try:
-            async with websockets.connect(self.computer_uri) as websocket:
+            async with ComputerClient(self.computer_uri) as client:
                 print("Connected to Computer Control Server")
-                for cmd in commands:
+                for cmd in self.commands:
                     print(f"\nExecuting: {json.dumps(cmd, indent=2)}")
-                    await websocket.send(json.dumps(cmd))
-                    response = await websocket.recv()
-                    print(f"Response: {response}")
-                    await asyncio.sleep(3)
+                    response = await client.request(cmd)
+                    print(f"Response: {json.dumps(response)}")
         except Exception as e:
             print(f"Error with computer control: {e}")
 
@@ -39,4 +38,4 @@ if __name__ == "__main__":
     if not os.path.exists(python_path):
         print(f"Warning: Python path {python_path} not found")
     
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,7 +1,8 @@
 import asyncio
-import websockets
 import json
 
+from computer_client import ComputerClient
+
 async def run_test():
     uri = "ws://localhost:8767"
     sequence = [
@@ -13,13 +14,13 @@ async def run_test():
         {"type": "keyboard", "action": "hotkey", "keys": ["command", "v"]}
     ]
     
-    async with websockets.connect(uri) as websocket:
-        for cmd in sequence:
-            await websocket.send(json.dumps(cmd))
-            response = await websocket.recv()
-            print(f"Command: {cmd}")
-            print(f"Response: {response}\n")
-            await asyncio.sleep(3)  # 3 second delay between commands
+    async with ComputerClient(uri) as client:
+        # Each command is awaited until the server has executed it
+        await client.sequence(
+            sequence,
+            on_result=lambda cmd, response: print(f"Command: {cmd}\nResponse: {json.dumps(response)}\n")
+        )
+        print(f"Latency: {json.dumps(client.stats(), indent=2)}")
 
 if __name__ == "__main__":
-    asyncio.run(run_test())
\ No newline at end of file
+    asyncio.run(run_test())
@@ -1,25 +1,21 @@
 import asyncio
-import websockets
 import json
-import time
+
+from computer_client import ComputerClient
 
 async def test_computer_control():
     uri = "ws://localhost:8767"
     print("Connecting to", uri)
     
     try:
-        async with websockets.connect(uri) as websocket:
+        async with ComputerClient(uri, timeout=5) as client:
             print("Connected to Computer Control Server")
 
             # Example 1: Get screen size
-            request = {
-                'command': 'get_screen_size'
-            }
+            request = {'type': 'system', 'action': 'get_screen_size'}
             print(f"Sending request: {request}")
-            await websocket.send(json.dumps(request))
-
-            response = await websocket.recv()
-            print(f"Received response: {response}")
+            response = await client.request(request)
+            print(f"Received response: {json.dumps(response)}")
             
             # Example 2: Move mouse in a square pattern
             points = [
@@ -32,37 +28,27 @@ async def test_computer_control():
             
             print("\nMoving mouse in a square pattern...")
             for x, y in points:
-                request = {
-                    'command': 'move',
-                    'x': x,
-                    'y': y
-                }
                 print(f"Moving to: ({x}, {y})")
-                await websocket.send(json.dumps(request))
-                await asyncio.sleep(1)
+                await client.request({'type': 'mouse', 'action': 'move', 'x': x, 'y': y})
 
             # Example 3: Perform click
             print("\nPerforming click...")
-            request = {
-                'command': 'click',
+            await client.request({
+                'type': 'mouse',
+                'action': 'click',
                 'button': 'left',
                 'clicks': 1
-            }
-            await websocket.send(json.dumps(request))
-            await asyncio.sleep(1)
+            })
 
             # Example 4: Scroll test
             print("\nTesting scroll...")
-            request = {
-                'command': 'scroll',
-                'amount': 100
-            }
-            await websocket.send(json.dumps(request))
-            await asyncio.sleep(1)
+            response = await client.request({'type': 'mouse', 'action': 'scroll', 'amount': 100})
+            print(f"Received response: {json.dumps(response)}")
 
             print("Test completed successfully")
+            print(f"Latency: {json.dumps(client.stats(), indent=2)}")
             
-    except websockets.exceptions.ConnectionRefusedError:
+    except (ConnectionError, asyncio.TimeoutError):
         print("Could not connect to the server. Make sure the server is running.")
     except Exception as e:
         print(f"Test error: {str(e)}")
@@ -77,4 +63,4 @@ async def main():
         print(f"Main error: {str(e)}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,189 @@
+import asyncio
+import json
+
+import websockets
+
+import mcp_computer_server
+from mcp_computer_server import ActionScheduler, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def use_clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(mcp_computer_server.time, 'monotonic', clock)
+    return clock
+
+
+def click(client_name, number):
+    return {'type': 'mouse', 'action': 'click', 'id': f'{client_name}{number}'}
+
+
+def drain(scheduler):
+    """IDs of actions in the order the scheduler hands them out"""
+    order = []
+    while (item := scheduler._next()) is not None:
+        order.append(item[1][0]['id'])
+    return order
+
+
+def test_token_bucket_spends_burst_then_refills_at_rate(monkeypatch):
+    clock = use_clock(monkeypatch)
+    bucket = TokenBucket(rate=4, burst=3)
+    for _ in range(3):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert bucket.wait_time() == 0.25
+    clock.now += 0.125
+    assert bucket.wait_time() == 0.125
+    clock.now += 0.125
+    assert bucket.wait_time() == 0
+    # Idle time never refills beyond the burst
+    clock.now += 60
+    bucket.wait_time()
+    assert bucket.tokens == 3
+
+
+def test_zero_rate_is_unlimited(monkeypatch):
+    use_clock(monkeypatch)
+    bucket = TokenBucket(rate=0, burst=1)
+    for _ in range(1000):
+        bucket.take()
+    assert bucket.wait_time() == 0
+
+
+def test_rate_limit_is_unlimited_by_default(monkeypatch):
+    monkeypatch.delenv('CLIENT_ACTION_RATE', raising=False)
+    scheduler = ActionScheduler(execute=None)
+    client = scheduler.register(None)
+    for number in range(50):
+        scheduler.submit(client, click('a', number))
+    assert len(drain(scheduler)) == 50
+
+
+def test_input_is_taken_round_robin_across_connections():
+    scheduler = ActionScheduler(execute=None, rate=0, global_rate=0, max_queued=10)
+    a, b, c = (scheduler.register(None) for _ in range(3))
+    for number in range(3):
+        scheduler.submit(a, click('a', number))
+    scheduler.submit(b, click('b', 0))
+    for number in range(2):
+        scheduler.submit(c, click('c', number))
+    assert drain(scheduler) == ['a0', 'b0', 'c0', 'a1', 'c1', 'a2']
+
+
+def test_rate_limited_connection_does_not_hold_up_others(monkeypatch):
+    clock = use_clock(monkeypatch)
+    scheduler = ActionScheduler(execute=None, rate=1, burst=1, global_rate=0, max_queued=10)
+    a, b = scheduler.register(None), scheduler.register(None)
+    for number in range(2):
+        scheduler.submit(a, click('a', number))
+        scheduler.submit(b, click('b', number))
+    assert drain(scheduler) == ['a0', 'b0']
+    assert scheduler._next_ready_in() == 1
+    clock.now += 1
+    assert drain(scheduler) == ['a1', 'b1']
+
+
+def test_read_only_actions_bypass_queued_input(monkeypatch):
+    use_clock(monkeypatch)
+    scheduler = ActionScheduler(execute=None, rate=1, burst=1, global_rate=0, max_queued=10)
+    a, b = scheduler.register(None), scheduler.register(None)
+    for number in range(3):
+        scheduler.submit(a, click('a', number))
+    scheduler.submit(b, {'type': 'system', 'action': 'get_mouse_position', 'id': 'b-pos'})
+    scheduler.submit(a, {'type': 'system', 'action': 'get_screen_size', 'id': 'a-size'})
+    # Both queries run ahead of the input, and are not held back by a's exhausted rate limit
+    assert drain(scheduler) == ['a-size', 'b-pos', 'a0']
+
+
+def test_full_lane_is_refused(monkeypatch):
+    monkeypatch.setenv('CLIENT_MAX_QUEUED', '2')
+    scheduler = ActionScheduler(execute=None, rate=10, global_rate=0)
+    client = scheduler.register(None)
+    assert scheduler.submit(client, click('a', 0))
+    assert scheduler.submit(client, click('a', 1))
+    assert not scheduler.submit(client, click('a', 2))
+    assert client.queued == 2
+    assert scheduler.retry_after(client) == 0.2
+    # Read-only queries have their own lane, so a full input lane does not block them
+    assert scheduler.submit(client, {'type': 'system', 'action': 'get_screen_size'})
+
+
+def test_server_answers_busy_when_queue_is_full(monkeypatch):
+    monkeypatch.setenv('CLIENT_MAX_QUEUED', '1')
+
+    class Backend:
+        def size(self):
+            return 800, 600
+
+    async def scenario():
+        server = mcp_computer_server.ComputerControlServer(backend=Backend(), clipboard=object())
+        release = asyncio.Event()
+
+        async def execute(action):
+            await release.wait()
+            return {'status': 'success'}
+
+        server.scheduler.execute = execute
+        async with websockets.serve(server.handle_connection, 'localhost', 0) as listener:
+            port = listener.sockets[0].getsockname()[1]
+            async with websockets.connect(f'ws://localhost:{port}') as socket:
+                # a0 is executing, a1 fills the queue, so a2 is refused
+                for number in range(3):
+                    await socket.send(json.dumps(click('a', number)))
+                    await asyncio.sleep(0.05)
+                busy = json.loads(await asyncio.wait_for(socket.recv(), 1))
+                release.set()
+                done = [json.loads(await asyncio.wait_for(socket.recv(), 1)) for _ in range(2)]
+        server.scheduler._task.cancel()
+        return busy, done
+
+    busy, done = asyncio.run(scenario())
+    assert (busy['id'], busy['status'], busy['queued']) == ('a2', 'busy', 1)
+    assert [(r['id'], r['status']) for r in done] == [('a0', 'success'), ('a1', 'success')]
+
+
+def test_cancel_removes_only_targeted_queued_actions():
+    scheduler = ActionScheduler(execute=None, rate=0, global_rate=0, max_queued=10)
+    a, b = scheduler.register(None), scheduler.register(None)
+    for number in range(3):
+        scheduler.submit(a, click('a', number))
+        scheduler.submit(b, click('b', number))
+    scheduler.submit(a, {'type': 'system', 'action': 'get_screen_size', 'id': 'a-size'})
+    assert [x['id'] for x in scheduler.cancel(a, ['a1', 'a-size', 'b0'])] == ['a-size', 'a1']
+    assert [x['id'] for x in scheduler.cancel(a, 'a2')] == ['a2']
+    assert drain(scheduler) == ['a0', 'b0', 'b1', 'b2']
+    for number in range(2):
+        scheduler.submit(b, click('b', number))
+    assert len(scheduler.cancel(b)) == 2
+    assert b.queued == 0
+
+
+def test_run_executes_in_order_and_reports_queue_delay():
+    async def scenario():
+        executed = []
+
+        async def execute(action):
+            executed.append(action['id'])
+            return {'status': 'success'}
+
+        scheduler = ActionScheduler(execute, rate=0, global_rate=0, max_queued=10)
+        client = scheduler.register(None)
+        scheduler.start()
+        for number in range(3):
+            scheduler.submit(client, click('a', number))
+        responses = [await asyncio.wait_for(client.outbox.get(), 1) for _ in range(3)]
+        scheduler._task.cancel()
+        return executed, responses
+
+    executed, responses = asyncio.run(scenario())
+    assert executed == ['a0', 'a1', 'a2']
+    assert [r['id'] for r in responses] == executed
+    assert all(r['queued_ms'] >= 0 for r in responses)
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""Reproducible benchmark for the DuckDB CSV query server.
+
+Generates synthetic device-export CSVs (timestamps, brand/model categories and
+radio/throughput metrics) of the requested sizes, then for each dataset and
+loader starts `main.py` as a single HTTP process and measures:
+
+- cold load: first query in a fresh process with an empty ingest cache
+- warm load: first query after restarting the process (ingest cache and OS
+  file cache populated)
+- query latency per query, with the result cache bypassed and with cache hits
+- result transfer time, size and peak RSS per serialisation mode
+- closed-loop throughput of concurrent HTTP clients
+- peak RSS of the server for each of the above (Linux only)
+
+Results are written as JSON; `--compare` checks a report against a baseline.
+
+Examples:
+    # Default suite (10MB and 100MB datasets, every loader)
+    python benchmark.py
+
+    # Up to 10GB, table loader only, 16 concurrent clients
+    python benchmark.py --sizes 10MB,1GB,10GB --loaders table --clients 16
+
+    # Run and compare against a stored report, failing on >10% regressions
+    python benchmark.py --compare bench_results/baseline.json
+
+    # Compare two existing reports without running anything
+    python benchmark.py --current bench_results/new.json --compare bench_results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import duckdb
+import httpx
+
+from cache_manager import parse_bytes, physical_memory
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Bump when the generated data changes, so cached datasets are regenerated
+DATA_VERSION = 1
+
+BRANDS = {
+    "Samsung": ["Galaxy S23", "Galaxy S24", "Galaxy A54", "Galaxy A15"],
+    "Apple": ["iPhone 13", "iPhone 14", "iPhone 15", "iPhone 15 Pro"],
+    "Xiaomi": ["Redmi Note 12", "Redmi Note 13", "13T", "Poco X6"],
+    "Google": ["Pixel 7", "Pixel 8", "Pixel 8a"],
+    "OnePlus": ["Nord 3", "11", "12"],
+    "Motorola": ["Moto G54", "Edge 40"],
+    "Nokia": ["G42", "X30"],
+    "Oppo": ["Reno 10", "A78"],
+}
+
+# Loader configurations: environment of the server process
+LOADERS = {
+    # CSVs read into in-memory tables
+    "table": {"DATASET_MODE": "table", "INGEST_CACHE": "0"},
+    # CSVs scanned from disk by every query
+    "view": {"DATASET_MODE": "view", "INGEST_CACHE": "0"},
+    # CSVs converted to Parquet once, then loaded from the conversion
+    "ingest_cache": {"DATASET_MODE": "table", "INGEST_CACHE": "1"},
+}
+
+# Queries timed per dataset, modelled on typical coverage analyses
+QUERIES = {
+    "count": 'SELECT count(*) AS n FROM data_0',
+    "brand_summary": (
+        'SELECT "Brand", "Model", count(*) AS samples, avg("RSRP (dBm)") AS avg_rsrp, '
+        'avg("Download (Mbps)") AS avg_download FROM data_0 GROUP BY ALL ORDER BY ALL'
+    ),
+    "hourly": (
+        'SELECT date_trunc(\'hour\', "Timestamp") AS hour, count(*) AS samples, '
+        'quantile_cont("Download (Mbps)", 0.5) AS median_download FROM data_0 GROUP BY 1 ORDER BY 1'
+    ),
+    "coverage_grid": (
+        'SELECT round("Latitude", 2) AS lat, round("Longitude", 2) AS lon, avg("RSRP (dBm)") AS avg_rsrp, '
+        'sum("UMR Count") AS total_mr FROM data_0 GROUP BY 1, 2 HAVING avg_rsrp < -90 '
+        'ORDER BY total_mr DESC LIMIT 10'
+    ),
+    "filter_rows": (
+        'SELECT * FROM data_0 WHERE "Brand" = \'Samsung\' AND "RSRP (dBm)" < -110 '
+        'ORDER BY "Timestamp" LIMIT 1000'
+    ),
+}
+
+# Serialisation modes: (request fields, Accept-Encoding)
+SERIALIZATIONS = {
+    "json": ({}, "identity"),
+    "json_gzip": ({}, "gzip"),
+    "ndjson": ({"format": "ndjson"}, "identity"),
+    "arrow": ({"format": "arrow"}, "identity"),
+    "parquet": ({"format": "parquet"}, "identity"),
+    "csv": ({"format": "csv"}, "identity"),
+}
+
+# Metrics compared by --compare: key suffix -> True if higher is better
+COMPARED = {
+    "seconds": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "queries_per_sec": True,
+    "peak_rss_bytes": False,
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Any]:
+    ms = [s * 1000 for s in seconds]
+    return {
+        "count": len(ms),
+        "p50_ms": round(percentile(ms, 50), 2) if ms else None,
+        "p95_ms": round(percentile(ms, 95), 2) if ms else None,
+        "max_ms": round(max(ms), 2) if ms else None,
+    }
+
+
+def generation_sql(rows: int, seed: int, path: str) -> str:
+    brands = list(BRANDS)
+    models = [BRANDS[brand] for brand in brands]
+
+    def uniform(k: int) -> str:
+        # Deterministic value in [0, 1) for row i and column k
+        return f"((hash(i, {seed}, {k}) % 1000000) / 1000000.0)"
+
+    return f"""
+        COPY (
+            SELECT
+                TIMESTAMP '2024-01-01' + to_seconds(i * 2 + (hash(i, {seed}, 0) % 2)::BIGINT) AS "Timestamp",
+                'DEV-' || lpad(((hash(i, {seed}, 1) % 50000))::VARCHAR, 6, '0') AS "Device ID",
+                {brands}[b + 1] AS "Brand",
+                list_element({models}[b + 1], (hash(i, {seed}, 2) % len({models}[b + 1]))::INTEGER + 1) AS "Model",
+                round(51.3 + {uniform(3)} * 0.4, 6) AS "Latitude",
+                round(-0.5 + {uniform(4)} * 0.6, 6) AS "Longitude",
+                round(-140 + {uniform(5)} * 70, 1) AS "RSRP (dBm)",
+                round(-20 + {uniform(6)} * 17, 1) AS "RSRQ (dB)",
+                round(-5 + {uniform(7)} * 35, 1) AS "SINR (dB)",
+                round({uniform(8)} * {uniform(9)} * 400, 2) AS "Download (Mbps)",
+                round({uniform(10)} * 60, 2) AS "Upload (Mbps)",
+                (hash(i, {seed}, 11) % 200)::INTEGER AS "UMR Count"
+            FROM (SELECT range AS i, (hash(range, {seed}, 12) % {len(brands)})::INTEGER AS b FROM range({rows}))
+            ORDER BY i
+        ) TO {duckdb_literal(path)} (HEADER, DELIMITER ',')
+    """
+
+
+def duckdb_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def generate_dataset(data_dir: str, label: str, target_bytes: int, seed: int) -> Dict[str, Any]:
+    """Write (or reuse) a synthetic device export of about `target_bytes`"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"devices_{label}_seed{seed}.csv")
+    meta_path = path + ".json"
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") == DATA_VERSION and meta.get("bytes") == os.path.getsize(path):
+            return meta
+
+    conn = duckdb.connect()
+    # Estimate the row width from a sample to hit the target size
+    sample_rows = 20000
+    sample = path + ".sample"
+    conn.execute(generation_sql(sample_rows, seed, sample))
+    rows = max(1, int(target_bytes * sample_rows / os.path.getsize(sample)))
+    os.remove(sample)
+
+    started = time.perf_counter()
+    conn.execute(generation_sql(rows, seed, path))
+    conn.close()
+    meta = {
+        "version": DATA_VERSION, "label": label, "path": path, "rows": rows, "seed": seed,
+        "bytes": os.path.getsize(path), "generate_seconds": round(time.perf_counter() - started, 2),
+    }
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Server-Timing header -> {phase: seconds}"""
+    phases = {}
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        if name and params.startswith('dur='):
+            phases[name] = float(params[4:]) / 1000
+    return phases
+
+
+class ServerProcess:
+    """`main.py` running as a single HTTP process with the given environment"""
+
+    def __init__(self, port: int, env: Dict[str, str], log_path: str):
+        self.port = port
+        self.env = env
+        self.log_path = log_path
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, timeout: float = 120.0):
+        env = {**os.environ, **self.env, "SERVER_MODE": "http", "HTTP_WORKERS": "1",
+               "HOST": "127.0.0.1", "PORT": str(self.port)}
+        env.pop("PRELOAD_MANIFEST", None)
+        with open(self.log_path, "ab") as log:
+            self.process = subprocess.Popen(
+                [sys.executable, os.path.join(HERE, "main.py")], env=env,
+                stdin=subprocess.DEVNULL, stdout=log, stderr=log
+            )
+        deadline = time.time() + timeout
+        async with httpx.AsyncClient(timeout=5) as client:
+            while True:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"Server exited with {self.process.returncode}, see {self.log_path}")
+                try:
+                    if (await client.get(f"{self.url}/health")).status_code == 200:
+                        return
+                except httpx.TransportError:
+                    pass
+                if time.time() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"Server did not start within {timeout:g}s, see {self.log_path}")
+                await asyncio.sleep(0.2)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def peak_rss(self) -> Optional[int]:
+        """Peak resident memory since start (or the last reset), from /proc; None elsewhere"""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) * 1024
+        except (OSError, AttributeError):
+            pass
+        return None
+
+    def reset_peak_rss(self):
+        """Restart peak RSS tracking (Linux 4.0+); otherwise peaks accumulate from process start"""
+        try:
+            with open(f"/proc/{self.process.pid}/clear_refs", "w") as f:
+                f.write("5")
+        except (OSError, AttributeError):
+            pass
+
+
+def drop_os_caches() -> bool:
+    """Drop the OS file cache so cold loads read from disk (needs root on Linux)"""
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3")
+        return True
+    except OSError:
+        return False
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        self.client = httpx.AsyncClient(timeout=None)
+
+    async def query(self, url: str, csv_file_path: str, query: str, use_cache: bool = False,
+                    accept_encoding: str = "identity", **fields) -> Tuple[float, httpx.Response, int]:
+        """POST a query and read the whole response; returns (seconds, response, body bytes)"""
+        body = {"csv_file_path": csv_file_path, "query": query, "no_cache": not use_cache, **fields}
+        started = time.perf_counter()
+        async with self.client.stream("POST", f"{url}/execute_query", json=body,
+                                      headers={"accept-encoding": accept_encoding}) as response:
+            size = 0
+            async for chunk in response.aiter_raw():
+                size += len(chunk)
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"Query failed with {response.status_code}: {query}")
+        return elapsed, response, size
+
+    async def measure_load(self, server: ServerProcess, dataset: Dict[str, Any]) -> Dict[str, Any]:
+        seconds, response, _ = await self.query(server.url, dataset["path"], QUERIES["count"])
+        phases = parse_server_timing(response.headers.get("server-timing"))
+        return {
+            "seconds": round(seconds, 4),
+            "load_seconds": round(phases.get("load", 0.0), 4),
+            "peak_rss_bytes": server.peak_rss(),
+        }
+
+    async def measure_queries(self, server: ServerProcess, dataset: Dict[str, Any]) -> Dict[str, Any]:
+        results = {}
+        for name, query in QUERIES.items():
+            uncached = [(await self.query(server.url, dataset["path"], query))[0] for _ in range(self.args.repeat)]
+            # The first cached run fills the result cache
+            await self.query(server.url, dataset["path"], query, use_cache=True)
+            cached = [(await self.query(server.url, dataset["path"], query, use_cache=True))[0]
+                      for _ in range(self.args.repeat)]
+            results[name] = {"uncached": latency_summary(uncached), "cached": latency_summary(cached)}
+        return results
+
+    async def measure_serialization(self, server: ServerProcess, dataset: Dict[str, Any]) -> Dict[str, Any]:
+        query = f"SELECT * FROM data_0 LIMIT {self.args.result_rows}"
+        results = {}
+        for name, (fields, accept_encoding) in SERIALIZATIONS.items():
+            server.reset_peak_rss()
+            seconds, _, size = await self.query(server.url, dataset["path"], query,
+                                                accept_encoding=accept_encoding, **fields)
+            rows = min(self.args.result_rows, dataset["rows"])
+            results[name] = {
+                "seconds": round(seconds, 4),
+                "bytes": size,
+                "rows_per_sec": round(rows / seconds) if seconds else None,
+                "peak_rss_bytes": server.peak_rss(),
+            }
+        return results
+
+    async def measure_concurrency(self, server: ServerProcess, dataset: Dict[str, Any]) -> Dict[str, Any]:
+        """Closed loop: each client sends its next query as soon as the previous one returns"""
+        queries = list(QUERIES.values())
+        latencies: List[float] = []
+        errors = 0
+        deadline = time.perf_counter() + self.args.duration
+
+        async def run_client(client_id: int):
+            nonlocal errors
+            i = client_id
+            while time.perf_counter() < deadline:
+                try:
+                    seconds, _, _ = await self.query(server.url, dataset["path"], queries[i % len(queries)])
+                    latencies.append(seconds)
+                except (RuntimeError, httpx.TransportError):
+                    errors += 1
+                i += 1
+
+        server.reset_peak_rss()
+        started = time.perf_counter()
+        await asyncio.gather(*(run_client(i) for i in range(self.args.clients)))
+        elapsed = time.perf_counter() - started
+        return {
+            "clients": self.args.clients,
+            "elapsed": round(elapsed, 3),
+            "queries": len(latencies),
+            "errors": errors,
+            "queries_per_sec": round(len(latencies) / elapsed, 2) if elapsed else None,
+            "latency": latency_summary(latencies),
+            "peak_rss_bytes": server.peak_rss(),
+        }
+
+    async def run_loader(self, dataset: Dict[str, Any], loader: str, work_dir: str) -> Dict[str, Any]:
+        cache_dir = tempfile.mkdtemp(prefix="ingest_", dir=work_dir)
+        env = {
+            **LOADERS[loader],
+            "INGEST_CACHE_DIR": cache_dir,
+            "JOB_SPOOL_DIR": os.path.join(work_dir, "job_spool"),
+            "QUERY_TIMEOUT": "0",
+            "SLOW_QUERY_SECONDS": "0",
+            "CACHE_IDLE_TTL": "86400",
+        }
+        server = ServerProcess(self.args.port, env, os.path.join(work_dir, "server.log"))
+        result: Dict[str, Any] = {"dataset": dataset["label"], "loader": loader}
+        try:
+            if self.args.drop_caches and not drop_os_caches():
+                print("Could not drop OS caches (needs root); cold loads may read from memory", file=sys.stderr)
+            await server.start()
+            result["cold_load"] = await self.measure_load(server, dataset)
+            server.stop()
+
+            await server.start()
+            result["warm_load"] = await self.measure_load(server, dataset)
+            result["queries"] = await self.measure_queries(server, dataset)
+            result["serialization"] = await self.measure_serialization(server, dataset)
+            result["concurrency"] = await self.measure_concurrency(server, dataset)
+        finally:
+            server.stop()
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        return result
+
+    async def run(self) -> Dict[str, Any]:
+        sizes = [size.strip() for size in self.args.sizes.split(',') if size.strip()]
+        loaders = [loader.strip() for loader in self.args.loaders.split(',') if loader.strip()]
+        for loader in loaders:
+            if loader not in LOADERS:
+                raise ValueError(f"Unknown loader {loader}, expected one of {', '.join(LOADERS)}")
+
+        report = {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "environment": environment(),
+            "config": {
+                "sizes": sizes, "loaders": loaders, "seed": self.args.seed, "repeat": self.args.repeat,
+                "result_rows": self.args.result_rows, "clients": self.args.clients,
+                "duration": self.args.duration, "data_version": DATA_VERSION,
+            },
+            "datasets": [],
+            "results": [],
+        }
+        work_dir = tempfile.mkdtemp(prefix="duckdb_bench_")
+        try:
+            for size in sizes:
+                print(f"Preparing {size} dataset...", file=sys.stderr)
+                dataset = generate_dataset(self.args.data_dir, size, parse_bytes(size), self.args.seed)
+                report["datasets"].append(dataset)
+                for loader in loaders:
+                    print(f"Benchmarking {size} with the {loader} loader...", file=sys.stderr)
+                    report["results"].append(await self.run_loader(dataset, loader, work_dir))
+        finally:
+            await self.client.aclose()
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return report
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "memory_bytes": physical_memory(),
+    }
+
+
+def flatten(report: Dict[str, Any]) -> Dict[str, Tuple[float, bool]]:
+    """Compared metrics of a report as {"10MB/table/queries/count/cached/p50_ms": (value, higher_is_better)}"""
+    metrics = {}
+
+    def walk(prefix: str, value: Any):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                walk(f"{prefix}/{key}", item)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            name = prefix.rsplit('/', 1)[-1]
+            if name in COMPARED:
+                metrics[prefix] = (value, COMPARED[name])
+
+    for result in report["results"]:
+        walk(f"{result['dataset']}/{result['loader']}",
+             {k: v for k, v in result.items() if k not in ("dataset", "loader")})
+    return metrics
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Metrics present in both reports with their relative change; regressions exceed `threshold`"""
+    old, new = flatten(baseline), flatten(current)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        (before, higher_is_better), (after, _) = old[key], new[key]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        rows.append({"metric": key, "baseline": before, "current": after, "change": round(change, 4),
+                     "regression": worse > threshold})
+    return rows
+
+
+def format_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1000 or unit == "GB":
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1000
+
+
+def print_report(report: Dict[str, Any]):
+    for result in report["results"]:
+        print(f"\n{result['dataset']} / {result['loader']}")
+        for name in ("cold_load", "warm_load"):
+            load = result[name]
+            print(f"  {name:<12} {load['seconds']:>9.3f}s  (load {load['load_seconds']:.3f}s, "
+                  f"peak RSS {format_bytes(load['peak_rss_bytes'])})")
+        print(f"  {'query':<16}{'uncached p50':>14}{'p95':>10}{'cached p50':>12}{'p95':>10}   (ms)")
+        for name, stats in result["queries"].items():
+            print(f"  {name:<16}{stats['uncached']['p50_ms']:>14.2f}{stats['uncached']['p95_ms']:>10.2f}"
+                  f"{stats['cached']['p50_ms']:>12.2f}{stats['cached']['p95_ms']:>10.2f}")
+        print(f"  {'serialisation':<16}{'seconds':>10}{'size':>10}{'rows/s':>12}{'peak RSS':>11}")
+        for name, stats in result["serialization"].items():
+            print(f"  {name:<16}{stats['seconds']:>10.3f}{format_bytes(stats['bytes']):>10}"
+                  f"{stats['rows_per_sec'] or 0:>12}{format_bytes(stats['peak_rss_bytes']):>11}")
+        concurrency = result["concurrency"]
+        print(f"  concurrency  {concurrency['clients']} clients: {concurrency['queries_per_sec']} queries/s, "
+              f"p50 {concurrency['latency']['p50_ms']}ms, p95 {concurrency['latency']['p95_ms']}ms, "
+              f"{concurrency['errors']} errors, peak RSS {format_bytes(concurrency['peak_rss_bytes'])}")
+
+
+def print_comparison(rows: List[Dict[str, Any]], threshold: float):
+    regressions = [row for row in rows if row["regression"]]
+    print(f"\nCompared {len(rows)} metrics, {len(regressions)} regressed by more than {threshold:.0%}")
+    for row in regressions:
+        print(f"  {row['metric']:<60} {row['baseline']:>12g} -> {row['current']:<12g} ({row['change']:+.1%})")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the DuckDB CSV query server")
+    parser.add_argument("--sizes", default="10MB,100MB", help="Comma-separated dataset sizes, e.g. 10MB,1GB,10GB")
+    parser.add_argument("--loaders", default=",".join(LOADERS),
+                        help=f"Comma-separated loaders to run ({', '.join(LOADERS)})")
+    parser.add_argument("--data-dir", default=os.path.join(HERE, "bench_data"),
+                        help="Where generated datasets are kept and reused")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the generated data")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query for latency percentiles")
+    parser.add_argument("--result-rows", type=int, default=100000,
+                        help="Rows transferred per serialisation mode")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent HTTP clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of concurrent load")
+    parser.add_argument("--port", type=int, default=18010, help="Port for the benchmarked server")
+    parser.add_argument("--drop-caches", action="store_true",
+                        help="Drop the OS file cache before each cold load (needs root)")
+    parser.add_argument("--json", dest="json_path",
+                        help="Write the report here (default: bench_results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline report to compare the results with")
+    parser.add_argument("--current", help="With --compare, an existing report to compare instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change counted as a regression (default: 0.10)")
+    args = parser.parse_args()
+
+    if args.current:
+        with open(args.current) as f:
+            report = json.load(f)
+    else:
+        report = await Benchmark(args).run()
+        print_report(report)
+        json_path = args.json_path or os.path.join(
+            HERE, "bench_results", f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {json_path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print_comparison(rows, args.threshold)
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nBenchmark stopped by user")
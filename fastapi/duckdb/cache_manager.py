@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger("fastapi-mcp-server")
+
+_UNITS = {'': 1, 'B': 1, 'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4,
+          'KIB': 1024, 'MIB': 1024 ** 2, 'GIB': 1024 ** 3, 'TIB': 1024 ** 4}
+
+
+def parse_bytes(value: str) -> int:
+    """Parse sizes such as '512MB', '4GiB' or '1073741824'"""
+    text = value.strip().upper().replace(' ', '')
+    number = text.rstrip('KMGTIB')
+    unit = text[len(number):]
+    if unit not in _UNITS:
+        raise ValueError(f"Unknown size unit: {value}")
+    return int(float(number) * _UNITS[unit])
+
+
+def physical_memory() -> Optional[int]:
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class CacheEntry:
+    def __init__(self, value: Any):
+        self.value = value
+        self.last_access = time.time()
+        # Requests currently using the value (between get() and done())
+        self.users = 0
+
+
+class DatasetCacheManager:
+    """Thread-safe LRU cache of loaded datasets with a global memory budget.
+
+    `resident_bytes` reports the memory DuckDB itself accounts for. Whenever a
+    load pushes it over `memory_budget`, least recently used entries are
+    evicted until it fits again (the entry just loaded is never evicted).
+    Entries idle for longer than `idle_ttl` seconds are expired by `expire()`.
+    Pinned keys are never evicted or expired.
+
+    `get` marks the entry as in use until the caller hands it back with
+    `done`. Entries in use are never evicted or expired, and entries removed
+    while in use (by `clear`) are only released once their last user is done.
+    """
+
+    def __init__(self, release: Callable[[Any], None], resident_bytes: Callable[[], int],
+                 memory_budget: Optional[int], idle_ttl: float,
+                 size_of: Optional[Callable[[Any], int]] = None):
+        self.release = release
+        self.resident_bytes = resident_bytes
+        self.size_of = size_of
+        self.memory_budget = memory_budget
+        self.idle_ttl = idle_ttl
+        self.entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self.lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.pinned: Set[str] = set()
+        # Entries removed from the cache while still in use, released by the last done()
+        self.retired: List[CacheEntry] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for a key, loading it at most once.
+
+        The value is in use until `done(key, value)` is called.
+        """
+        with self.lock:
+            entry = self._touch(key)
+            if entry is not None:
+                self.hits += 1
+                entry.users += 1
+                return entry.value
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Concurrent requests for the same key wait for a single load
+        with load_lock:
+            with self.lock:
+                entry = self._touch(key)
+                if entry is not None:
+                    self.hits += 1
+                    entry.users += 1
+                    return entry.value
+                self.misses += 1
+            try:
+                value = loader()
+            finally:
+                with self.lock:
+                    self._load_locks.pop(key, None)
+            entry = CacheEntry(value)
+            entry.users = 1
+            with self.lock:
+                self.entries[key] = entry
+        self.enforce_budget(protect=key)
+        return value
+
+    def done(self, key: str, value: Any):
+        """Hand back a value obtained from `get`; releases it if it was removed while in use"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.value is not value:
+                entry = next((e for e in self.retired if e.value is value), None)
+                if entry is None:
+                    return
+            entry.users = max(0, entry.users - 1)
+            if entry.users or entry not in self.retired:
+                return
+            self.retired.remove(entry)
+        self._release(key, entry.value)
+
+    def _touch(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.last_access = time.time()
+            self.entries.move_to_end(key)
+        return entry
+
+    def _release(self, key: str, value: Any):
+        try:
+            self.release(value)
+        except Exception as e:
+            logger.error(f"Error releasing cache entry {key}: {str(e)}", exc_info=True)
+
+    def pin(self, key: str):
+        with self.lock:
+            self.pinned.add(key)
+
+    def unpin(self, key: str):
+        with self.lock:
+            self.pinned.discard(key)
+
+    def enforce_budget(self, protect: Optional[str] = None):
+        """Evict least recently used entries until DuckDB's memory use fits the budget.
+
+        Entries that are pinned or in use are skipped. Eviction stops early when
+        releasing an entry frees nothing (its memory is shared with other entries).
+        """
+        if not self.memory_budget:
+            return
+        resident = self.resident_bytes()
+        while resident > self.memory_budget:
+            with self.lock:
+                victim = next((k for k, e in self.entries.items()
+                               if k != protect and k not in self.pinned and not e.users), None)
+                if victim is None:
+                    return
+                entry = self.entries.pop(victim)
+                self.evictions += 1
+            logger.info(f"Evicting dataset {victim} to stay within the memory budget")
+            self._release(victim, entry.value)
+            previous, resident = resident, self.resident_bytes()
+            if resident >= previous:
+                return
+
+    def expire(self):
+        """Release entries that have been idle for longer than idle_ttl"""
+        cutoff = time.time() - self.idle_ttl
+        with self.lock:
+            expired = [(k, e) for k, e in self.entries.items()
+                       if e.last_access < cutoff and k not in self.pinned and not e.users]
+            for key, _ in expired:
+                del self.entries[key]
+            self.expirations += len(expired)
+        for key, entry in expired:
+            self._release(key, entry.value)
+
+    def clear(self):
+        with self.lock:
+            entries, self.entries = list(self.entries.items()), OrderedDict()
+            # Entries in use are released by their last done()
+            self.retired.extend(entry for _, entry in entries if entry.users)
+            entries = [(key, entry) for key, entry in entries if not entry.users]
+        for key, entry in entries:
+            self._release(key, entry.value)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self.lock:
+            entries = list(self.entries.items())
+            pinned = set(self.pinned)
+            hits, misses = self.hits, self.misses
+            evictions, expirations = self.evictions, self.expirations
+        return {
+            "entries": len(entries),
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "expirations": expirations,
+            "pinned": len(pinned & {key for key, _ in entries}),
+            "resident_bytes": self.resident_bytes(),
+            "memory_budget_bytes": self.memory_budget,
+            # Most recently used last
+            "datasets": [
+                {
+                    "key": key,
+                    "bytes": self.size_of(entry.value) if self.size_of else None,
+                    "idle_seconds": round(now - entry.last_access, 1),
+                    "pinned": key in pinned,
+                    "in_use": entry.users,
+                }
+                for key, entry in entries
+            ],
+        }
@@ -0,0 +1,421 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import duckdb
+
+from ingest_cache import prefix_digest
+from sources import is_multi_file, source_stat
+
+logger = logging.getLogger("fastapi-mcp-server")
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value: str) -> str:
+    """SQL string literal, for the few statements (view definitions) that cannot take parameters"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+class FileTable:
+    """One CSV file, or glob/directory of CSVs, loaded into a table (or exposed as a lazy view)
+    in the shared database"""
+
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+        # 'table' (materialised in memory) or 'view' (scanned from disk by each query)
+        self.mode: Optional[str] = None
+        self.accesses = 0
+        self.mtime: Optional[float] = None
+        # Bytes of the file that are in the table
+        self.size: Optional[int] = None
+        # source_stat() of the file when it was last brought up to date; it can differ from
+        # (mtime, size) when the file ends with a line that is still being written
+        self.checked: Optional[Tuple[float, int]] = None
+        # SHA-1 of every byte in [0, size), to recognise appends; it is extended with the
+        # appended bytes so only new data is hashed after an append
+        self.prefix_digest = None
+        # Column profile from describe_dataset, dropped whenever the content changes
+        self.profile: Optional[dict] = None
+        # Memory DuckDB reported gaining while this file was loaded
+        self.bytes = 0
+        self.refcount = 0
+        # Held while the file is (re)loaded or materialised, so each file loads once at a time
+        self.lock = threading.Lock()
+
+
+class Dataset:
+    """A combination of files, exposed as `data_0..data_n` views in its own schema.
+
+    Cursors opened through a dataset resolve `data_i` through the dataset's
+    schema and the stable per-file table names through the main schema.
+    Short queries borrow cursors from a small pool instead of opening and
+    configuring a new one each time.
+    """
+
+    def __init__(self, catalog: 'DatasetCatalog', key: str, paths: List[str], tables: List[FileTable],
+                 pool_size: int = 8):
+        self.catalog = catalog
+        self.key = key
+        self.paths = paths
+        self.tables = tables
+        self.schema = self.schema_for(key)
+        self.pool_size = pool_size
+        self.idle: List[duckdb.DuckDBPyConnection] = []
+        self.pool_lock = threading.Lock()
+        self.closed = False
+        self.conn = self.cursor()
+
+    @staticmethod
+    def schema_for(key: str) -> str:
+        return "ds_" + hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def cursor(self) -> duckdb.DuckDBPyConnection:
+        cursor = self.catalog.conn.cursor()
+        cursor.execute(f"SET search_path = '{self.schema},main'")
+        # Lets query_progress() report on running queries without printing a bar
+        cursor.execute("SET enable_progress_bar = true")
+        cursor.execute("SET enable_progress_bar_print = false")
+        return cursor
+
+    @contextmanager
+    def pooled_cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Borrow a configured cursor; it is returned to the pool unless the query failed"""
+        with self.pool_lock:
+            cursor = self.idle.pop() if self.idle else None
+        if cursor is None:
+            cursor = self.cursor()
+        try:
+            yield cursor
+        except BaseException:
+            cursor.close()
+            raise
+        with self.pool_lock:
+            if not self.closed and len(self.idle) < self.pool_size:
+                self.idle.append(cursor)
+                return
+        cursor.close()
+
+    def close_pool(self):
+        with self.pool_lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for cursor in idle:
+            cursor.close()
+
+    @property
+    def table_names(self) -> List[str]:
+        return [table.name for table in self.tables]
+
+    @property
+    def bytes(self) -> int:
+        """Memory held by this dataset's tables (shared tables are counted in full)"""
+        return sum(table.bytes for table in {id(t): t for t in self.tables}.values())
+
+
+class LoadPolicy:
+    """Chooses whether a file is materialised as a table or exposed as a lazy view.
+
+    In 'auto' mode files of at least `lazy_min_bytes` start out as views, so
+    queries only read the columns and row groups they need, and are
+    materialised once they have been queried `materialize_after` times (unless
+    larger than `materialize_max_bytes`).
+    """
+
+    MODES = ('auto', 'table', 'view')
+
+    def __init__(self, mode: str = 'auto', lazy_min_bytes: int = 512 * 1000 ** 2,
+                 materialize_after: int = 20, materialize_max_bytes: Optional[int] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown dataset mode: {mode}")
+        self.mode = mode
+        self.lazy_min_bytes = lazy_min_bytes
+        self.materialize_after = materialize_after
+        self.materialize_max_bytes = materialize_max_bytes
+
+    def initial_mode(self, size: int) -> str:
+        if self.mode != 'auto':
+            return self.mode
+        return 'view' if size >= self.lazy_min_bytes else 'table'
+
+    def should_materialize(self, table: FileTable) -> bool:
+        return (
+            self.mode == 'auto'
+            and table.mode == 'view'
+            and table.accesses >= self.materialize_after
+            and (self.materialize_max_bytes is None or (table.size or 0) <= self.materialize_max_bytes)
+        )
+
+
+class DatasetCatalog:
+    """Shared database in which every distinct file is loaded exactly once.
+
+    Files get stable table names derived from their file names and are
+    reference counted by the datasets (file combinations) that use them, so
+    memory and load time scale with the number of distinct files rather than
+    the number of combinations requested. Files of a dataset that need
+    (re)loading are loaded `load_workers` at a time; DuckDB's own thread
+    pool is shared by all of them. `lock` only guards the file and dataset
+    bookkeeping; loads hold the lock of the file they load, so unrelated
+    datasets load concurrently.
+    """
+
+    def __init__(self, conn: duckdb.DuckDBPyConnection,
+                 load_table: Callable[[duckdb.DuckDBPyConnection, str, str, bool], None],
+                 incremental: bool = True, policy: Optional[LoadPolicy] = None,
+                 load_workers: int = 4):
+        self.conn = conn
+        # load_table(cursor, name, path, lazy) creates the table, or a view if lazy
+        self.load_table = load_table
+        self.policy = policy or LoadPolicy()
+        self.incremental = incremental
+        self.files: Dict[str, FileTable] = {}
+        self.lock = threading.RLock()
+        self.load_pool = ThreadPoolExecutor(max_workers=max(1, load_workers), thread_name_prefix="catalog-load")
+        self.full_loads = 0
+        self.appends = 0
+        self.materializations = 0
+
+    def execute(self, sql: str):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql)
+        finally:
+            cursor.close()
+
+    def memory_usage(self) -> int:
+        """Bytes of memory DuckDB currently reports in use across the shared database"""
+        cursor = self.conn.cursor()
+        try:
+            return int(cursor.execute("SELECT COALESCE(SUM(memory_usage_bytes), 0) FROM duckdb_memory()").fetchone()[0])
+        finally:
+            cursor.close()
+
+    def table_name_for(self, path: str) -> str:
+        if is_multi_file(path):
+            # Globs and directories are named after the directory holding the files
+            if os.path.isdir(path):
+                directory = os.path.normpath(path)
+            else:
+                directory = os.path.dirname(path[:min(path.find(c) for c in '*?[' if c in path)])
+            stem = os.path.basename(os.path.abspath(directory))
+        else:
+            stem = os.path.splitext(os.path.basename(path))[0]
+        base = re.sub(r'\W+', '_', stem).strip('_').lower() or 'data'
+        if base[0].isdigit() or re.fullmatch(r'data_\d+', base):
+            base = f"t_{base}"
+        taken = {table.name for table in self.files.values()}
+        name, n = base, 2
+        while name in taken:
+            name, n = f"{base}_{n}", n + 1
+        return name
+
+    def acquire_files(self, paths: List[str]) -> List[FileTable]:
+        """Reference the shared tables of some files, loading those not loaded or changed in parallel"""
+        tables = []
+        with self.lock:
+            for path in paths:
+                table = self.files.get(path)
+                if table is None:
+                    table = self.files[path] = FileTable(path, self.table_name_for(path))
+                table.refcount += 1
+                tables.append(table)
+        try:
+            unique = list({id(table): table for table in tables}.values())
+            if any(table.checked != source_stat(table.path) for table in unique):
+                before = self.memory_usage()
+                results = [result for result in self.load_pool.map(self.refresh_if_stale, unique) if result]
+                if results:
+                    self.distribute_memory(results, self.memory_usage() - before)
+                appended = sum(1 for _, _, append in results if append)
+                with self.lock:
+                    self.appends += appended
+                    self.full_loads += len(results) - appended
+        except Exception:
+            with self.lock:
+                for table in tables:
+                    self.release_file(table)
+            raise
+        return tables
+
+    def refresh_if_stale(self, table: FileTable):
+        """Refresh a file unless it is up to date, e.g. because a concurrent request just loaded it"""
+        with table.lock:
+            stat = source_stat(table.path)
+            if table.checked == stat:
+                return None
+            return self.refresh_file(table, stat)
+
+    def refresh_file(self, table: FileTable, stat):
+        """Bring one file's table up to date; returns (table, bytes read, whether rows were appended)"""
+        mtime, size = stat
+        old_size = table.size or 0
+        appendable = self.incremental and not is_multi_file(table.path)
+        cursor = self.conn.cursor()
+        try:
+            loaded = None
+            if appendable and table.mode == 'table':
+                loaded = self.append_new_rows(cursor, table, size)
+            appended = loaded is not None
+            if not appended:
+                table.prefix_digest = None
+                self.replace_object(cursor, table, self.policy.initial_mode(size))
+                loaded = size
+        finally:
+            cursor.close()
+        table.mtime, table.size, table.checked = mtime, loaded, stat
+        table.profile = None
+        if not appended and appendable and table.mode == 'table':
+            if source_stat(table.path) != stat:
+                # The file changed while it was read, so the table may hold rows beyond `size`. Without a
+                # prefix digest the next access reloads it in full instead of appending those rows again.
+                logger.info(f"{table.path} changed while it was loaded, it will be reloaded in full")
+            else:
+                table.prefix_digest = prefix_digest(table.path, loaded)
+        return table, loaded - old_size if appended else loaded, appended
+
+    @staticmethod
+    def distribute_memory(results, delta: int):
+        """Attribute memory gained by loads that ran together in proportion to the bytes each read"""
+        total = sum(added for _, added, _ in results)
+        for table, added, _ in results:
+            share = delta * added // total if total else delta // len(results)
+            table.bytes = max(0, table.bytes + share)
+
+    def replace_object(self, cursor: duckdb.DuckDBPyConnection, table: FileTable, mode: str):
+        """(Re)create a file's table or view in one transaction, so concurrent queries never miss it"""
+        cursor.execute("BEGIN TRANSACTION")
+        try:
+            if table.mode is not None and table.mode != mode:
+                cursor.execute(f"DROP {table.mode.upper()} IF EXISTS main.{quote_identifier(table.name)}")
+            self.load_table(cursor, table.name, table.path, mode == 'view')
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        table.mode = mode
+
+    def record_access(self, dataset: 'Dataset') -> bool:
+        """Count a query against a dataset's files; returns True if a lazy file was materialised"""
+        materialized = False
+        for table in {id(t): t for t in dataset.tables}.values():
+            table.accesses += 1
+            if not self.policy.should_materialize(table):
+                continue
+            with table.lock:
+                if not self.policy.should_materialize(table) or self.files.get(table.path) is not table:
+                    continue
+                before = self.memory_usage()
+                cursor = self.conn.cursor()
+                try:
+                    self.replace_object(cursor, table, 'table')
+                except Exception as e:
+                    logger.warning(f"Could not materialise {table.path}: {str(e)}")
+                    continue
+                finally:
+                    cursor.close()
+                table.bytes = max(0, self.memory_usage() - before)
+                self.materializations += 1
+                materialized = True
+                logger.info(f"Materialised {table.path} after {table.accesses} queries")
+        return materialized
+
+    def append_new_rows(self, cursor: duckdb.DuckDBPyConnection, table: FileTable, size: int) -> Optional[int]:
+        """Insert only the rows appended to a file since it was loaded.
+
+        Returns the number of bytes now in the table, or None if the file did not
+        just grow (earlier content changed, or the loaded part ended mid-line) and
+        has to be loaded again in full.
+        """
+        old_size = table.size
+        if table.prefix_digest is None or not old_size or size <= old_size:
+            return None
+        with open(table.path, 'rb') as f:
+            f.seek(old_size - 1)
+            if f.read(1) != b'\n':
+                return None
+            # Only take complete lines; a line still being written is picked up next time
+            tail = f.read(size - old_size)
+        end = tail.rfind(b'\n') + 1
+        if end == 0:
+            return old_size
+        # Every byte already loaded is compared; a sampled hash would miss edits between samples
+        digest = prefix_digest(table.path, old_size)
+        if digest.hexdigest() != table.prefix_digest.hexdigest():
+            return None
+
+        try:
+            dialect = cursor.execute(
+                "SELECT Delimiter, Quote, Escape, DateFormat, TimestampFormat FROM sniff_csv(?)", [table.path]
+            ).fetchone()
+            columns = dict(cursor.execute(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = 'main' AND table_name = ? ORDER BY ordinal_position", [table.name]
+            ).fetchall())
+            options = {'delim': dialect[0], 'quote': dialect[1], 'escape': dialect[2],
+                       'dateformat': dialect[3], 'timestampformat': dialect[4]}
+            # sniff_csv reports options it did not detect as '(empty)'
+            options = {name: value for name, value in options.items() if value and value != '(empty)'}
+            with tempfile.NamedTemporaryFile(suffix='.csv') as chunk:
+                chunk.write(tail[:end])
+                chunk.flush()
+                args = ''.join(f", {name} = ?" for name in options)
+                cursor.execute(
+                    f"INSERT INTO main.{quote_identifier(table.name)} "
+                    f"SELECT * FROM read_csv(?, header = false, columns = ?{args})",
+                    [chunk.name, columns, *options.values()]
+                )
+        except duckdb.Error as e:
+            logger.info(f"Appended rows of {table.path} do not fit its table, reloading in full: {str(e).splitlines()[0]}")
+            return None
+        digest.update(tail[:end])
+        table.prefix_digest = digest
+        logger.info(f"Appended {end} new bytes of {table.path} to {table.name}")
+        return old_size + end
+
+    def release_file(self, table: FileTable):
+        """Drop a reference to a file, and its table with the last one (called holding `lock`)"""
+        table.refcount -= 1
+        if table.refcount <= 0:
+            if table.mode is not None:
+                self.execute(f"DROP {table.mode.upper()} IF EXISTS main.{quote_identifier(table.name)}")
+            self.files.pop(table.path, None)
+
+    def open(self, key: str, paths: List[str]) -> Dataset:
+        """Create a dataset over the given files, loading any that are missing"""
+        tables = self.acquire_files(paths)
+        with self.lock:
+            try:
+                schema = Dataset.schema_for(key)
+                self.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+                for i, table in enumerate(tables):
+                    self.execute(
+                        f"CREATE OR REPLACE VIEW {schema}.data_{i} AS "
+                        f"SELECT * FROM main.{quote_identifier(table.name)}"
+                    )
+                return Dataset(self, key, paths, tables)
+            except Exception:
+                for table in tables:
+                    self.release_file(table)
+                raise
+
+    def close(self, dataset: Dataset):
+        """Drop a dataset's views and release its files"""
+        with self.lock:
+            try:
+                dataset.conn.close()
+                dataset.close_pool()
+            except Exception:
+                pass
+            self.execute(f"DROP SCHEMA IF EXISTS {dataset.schema} CASCADE")
+            for table in dataset.tables:
+                self.release_file(table)
@@ -0,0 +1,123 @@
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd is optional
+    zstandard = None
+
+# Media types that are already compressed and are sent as they are
+INCOMPRESSIBLE_TYPES = ('application/vnd.apache.parquet', 'application/gzip', 'application/zstd', 'image/')
+
+
+def supported_encodings() -> List[str]:
+    return (['zstd'] if zstandard is not None else []) + ['gzip']
+
+
+def choose_encoding(accept_encoding: str, allowed: List[str]) -> Optional[str]:
+    """Pick the first allowed encoding the client accepts (q > 0), in server preference order"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(','):
+        parts = [part.strip() for part in item.split(';')]
+        if not parts[0]:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[parts[0]] = q
+    for encoding in allowed:
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: Optional[int]):
+        if encoding == 'zstd':
+            self._obj = zstandard.ZstdCompressor(level=level or 3).compressobj()
+            self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            # wbits=31 writes the gzip container
+            self._obj = zlib.compressobj(level or 6, zlib.DEFLATED, 31)
+            self._flush_block = zlib.Z_SYNC_FLUSH
+        self.encoding = encoding
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so streamed output reaches the client without waiting"""
+        return self._obj.compress(data) + self._obj.flush(self._flush_block)
+
+    def finish(self, data: bytes = b'') -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with zstd or gzip, as negotiated by Accept-Encoding.
+
+    Bodies smaller than `minimum_size` and already encoded or compressed media
+    types are sent unchanged. Streamed responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, encodings: Optional[List[str]] = None,
+                 level: Optional[int] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = [e for e in (encodings or supported_encodings()) if e in supported_encodings()]
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode('latin-1') for k, v in scope["headers"] if k == b'accept-encoding'), '')
+        encoding = choose_encoding(accept, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers: List[Tuple[bytes, bytes]] = message.get("headers", [])
+                content_type = next((v.decode('latin-1') for k, v in headers if k == b'content-type'), '')
+                passthrough = (
+                    any(k == b'content-encoding' for k, _ in headers)
+                    or content_type.startswith(INCOMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    await send(start)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.level)
+                headers = [(k, v) for k, v in start.get("headers", []) if k != b'content-length']
+                headers += [(b'content-encoding', encoding.encode()), (b'vary', b'Accept-Encoding')]
+                if not more_body:
+                    body = compressor.finish(body)
+                    headers.append((b'content-length', str(len(body)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send({**start, "headers": headers})
+            body = compressor.chunk(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,37 @@
+from typing import Any, Dict
+
+import duckdb
+
+from catalog import quote_identifier
+
+# Sample values returned per column
+SAMPLE_ROWS = 5
+
+
+def profile_table(cursor: duckdb.DuckDBPyConnection, table_name: str) -> Dict[str, Any]:
+    """Per-column type, null count, min/max, approximate distinct count and sample values.
+
+    Costs one SUMMARIZE scan, one counting scan and a short LIMIT read.
+    """
+    table = f"main.{quote_identifier(table_name)}"
+    summary = cursor.execute(f"SUMMARIZE {table}").fetchall()
+    names = [row[0] for row in summary]
+
+    counts = ', '.join(f"count({quote_identifier(name)})" for name in names)
+    totals = cursor.execute(f"SELECT count(*){', ' + counts if counts else ''} FROM {table}").fetchone()
+    row_count, non_null = totals[0], totals[1:]
+
+    sample = cursor.execute(f"SELECT * FROM {table} LIMIT {SAMPLE_ROWS}").fetchall()
+
+    columns = []
+    for i, (name, column_type, min_value, max_value, approx_unique, *_rest) in enumerate(summary):
+        columns.append({
+            "name": name,
+            "type": column_type,
+            "nullCount": row_count - non_null[i],
+            "min": min_value,
+            "max": max_value,
+            "approxDistinct": approx_unique,
+            "samples": [row[i] for row in sample],
+        })
+    return {"rowCount": row_count, "columns": columns}
@@ -0,0 +1,149 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import duckdb
+
+logger = logging.getLogger("fastapi-mcp-server")
+
+# Bytes hashed from each of the start, middle and end of a file
+HASH_SAMPLE_BYTES = 1024 * 1024
+
+# Conversions attempted before giving up on a CSV that keeps changing while it is read
+CONVERT_ATTEMPTS = 3
+
+
+def prefix_digest(path: str, length: int):
+    """SHA-1 of every one of the first `length` bytes of a file; the hash object can be
+    extended with bytes appended later"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(HASH_SAMPLE_BYTES, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest
+
+
+def prefix_hash(path: str, length: int, full_hash: bool = False) -> str:
+    """Content hash of the first `length` bytes of a file.
+
+    By default only the first, middle and last HASH_SAMPLE_BYTES of the range are
+    hashed, so hashing a multi-GB file costs a few milliseconds; set full_hash to
+    hash every byte.
+    """
+    if full_hash or length <= 3 * HASH_SAMPLE_BYTES:
+        return prefix_digest(path, length).hexdigest()
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for offset in (0, length // 2, length - HASH_SAMPLE_BYTES):
+            f.seek(offset)
+            digest.update(f.read(HASH_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def file_fingerprint(path: str, full_hash: bool = False) -> Dict[str, Any]:
+    """Size, mtime and content hash of a file (see prefix_hash)"""
+    stat = os.stat(path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": prefix_hash(path, stat.st_size, full_hash),
+    }
+
+
+class IngestCache:
+    """On-disk Parquet conversions of CSV files that survive restarts.
+
+    Each CSV is parsed once and written to `<cache_dir>/<path id>-<fingerprint id>.parquet`,
+    where the fingerprint covers size, mtime and content hash. Later loads read the
+    columnar file instead of re-parsing and re-inferring types from the CSV.
+    Conversions run on connections from `connect` (a fresh in-memory database
+    by default), so they can share the server's thread and memory limits.
+    """
+
+    def __init__(self, cache_dir: str, full_hash: bool = False,
+                 connect: Optional[Callable[[], duckdb.DuckDBPyConnection]] = None):
+        self.cache_dir = cache_dir
+        self.full_hash = full_hash
+        self.connect = connect or (lambda: duckdb.connect(database=':memory:'))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    @staticmethod
+    def path_id(path: str) -> str:
+        return hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+
+    def entry_path(self, path: str, fingerprint: Dict[str, Any]) -> str:
+        key = f"{fingerprint['size']}:{fingerprint['mtime_ns']}:{fingerprint['hash']}"
+        fingerprint_id = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{self.path_id(path)}-{fingerprint_id}.parquet")
+
+    def get(self, path: str) -> str:
+        """Return the Parquet conversion of a CSV, converting it first if needed"""
+        with self._lock_for(os.path.abspath(path)):
+            for _ in range(CONVERT_ATTEMPTS):
+                fingerprint = file_fingerprint(path, self.full_hash)
+                entry = self.entry_path(path, fingerprint)
+                if os.path.exists(entry):
+                    return entry
+                if self.convert(path, entry, fingerprint):
+                    self.remove_stale(path, keep=entry)
+                    return entry
+            raise RuntimeError(f"{path} changed during each of {CONVERT_ATTEMPTS} conversions")
+
+    def convert(self, path: str, entry: str, fingerprint: Dict[str, Any]) -> bool:
+        """Convert a CSV to `entry`; returns False, publishing nothing, if the CSV changed meanwhile"""
+        start = time.time()
+        tmp_path = f"{entry}.tmp-{os.getpid()}-{threading.get_ident()}"
+        conn = self.connect()
+        try:
+            conn.execute(
+                "COPY (SELECT * FROM read_csv_auto($source, sample_size=-1)) "
+                "TO $target (FORMAT PARQUET, COMPRESSION ZSTD)",
+                {'source': path, 'target': tmp_path}
+            )
+            # The fingerprint was taken before the COPY; a conversion of a file that has
+            # since changed would be stored under the wrong key
+            stat = os.stat(path)
+            if (stat.st_size, stat.st_mtime_ns) != (fingerprint['size'], fingerprint['mtime_ns']):
+                logger.info(f"{path} changed while it was converted, discarding the conversion")
+                return False
+            # Publish atomically so concurrent readers never see a partial file
+            os.replace(tmp_path, entry)
+        finally:
+            conn.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        manifest = {
+            "source": os.path.abspath(path),
+            "created": time.time(),
+            **fingerprint,
+        }
+        with open(f"{entry}.json", 'w') as f:
+            json.dump(manifest, f)
+        logger.info(f"Converted {path} to {entry} in {time.time() - start:.2f}s")
+        return True
+
+    def remove_stale(self, path: str, keep: str):
+        """Delete conversions of earlier versions of the same CSV"""
+        for stale in glob.glob(os.path.join(self.cache_dir, f"{self.path_id(path)}-*.parquet")):
+            if stale != keep:
+                for file_path in (stale, f"{stale}.json"):
+                    try:
+                        os.remove(file_path)
+                    except OSError:
+                        pass
@@ -0,0 +1,58 @@
+import datetime
+import decimal
+import json
+import math
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """JSON form of values neither encoder handles natively (same as FastAPI's encoder)"""
+    if isinstance(value, decimal.Decimal):
+        # Decimals without a fractional part stay exact integers; others become strings,
+        # since a float would round them
+        return int(value) if value.is_finite() and value.as_tuple().exponent >= 0 else str(value)
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, tuple) and hasattr(value, 'months') and hasattr(value, 'nanoseconds'):
+        # Arrow intervals (DuckDB INTERVAL), in seconds with 30-day months like DuckDB's timedelta conversion
+        return (value.months * 30 + value.days) * 86400 + value.nanoseconds / 1e9
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode('utf-8', errors='replace')
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def _finite(value: Any) -> Any:
+    """Replace NaN and infinities (not valid JSON) with None, as orjson does"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def dumps(document: Any) -> bytes:
+    """Compact JSON bytes for query results.
+
+    Uses orjson when installed. Dates and timestamps become ISO 8601 strings,
+    NaN and infinities become null, and integral decimals become numbers
+    while other decimals become strings so no digits are lost.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(document, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # e.g. HUGEINT values beyond 64 bits, which only the json module can write
+            pass
+    return json.dumps(_finite(document), default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(',', ':')).encode()
@@ -3,17 +3,44 @@ import os
 import json
 import logging
 import duckdb
+import pyarrow as pa
 import threading
 import time
 import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from collections.abc import Sequence
-from typing import Any, Optional, List
-from fastapi import FastAPI, HTTPException
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, List, Tuple, Union
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 import uvicorn
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 
+from cache_manager import DatasetCacheManager, parse_bytes, physical_memory
+from compression import CompressionMiddleware
+from catalog import Dataset, DatasetCatalog, LoadPolicy, quote_identifier, quote_literal
+from dataset_profile import profile_table
+from ingest_cache import IngestCache
+from json_encoding import dumps
+from preload import Warmer, WarmupEntry, load_manifest
+from query_profiling import QueryMetrics, SlowQueryLog, explain, process_rss, render_prometheus, server_timing
+from query_executor import ExecutorBusyError, QueryExecutor
+from query_jobs import Job, JobManager, read_rows, spool_batches, valid_job_id
+from query_tracker import QueryCancelledError, QueryHandle, QueryRegistry, QueryTimeoutError
+from result_cache import ResultCache
+from result_shaping import (
+    ShapeOptions, encode_compact, read_summary, shape_page, shape_result, split_sample, summary_query
+)
+from result_cursors import CursorRegistry, ResultCursor, limit_batches
+from statements import Params, Statement, StatementRegistry
+from scale_out import run_router, worker_environment
+from sources import expand_source, is_multi_file, source_stat
+from result_formats import BINARY_FORMATS, MEDIA_TYPES, FILE_EXTENSIONS, encode_batches, negotiate_format
+
 from mcp.server import Server
 from mcp.types import (
     Resource,
@@ -24,16 +51,77 @@ from mcp.types import (
     LoggingLevel
 )
 
-# DuckDB cache management
-duckdb_cache = {}
-cache_access_times = {}
+# Rows per Arrow record batch when streaming results
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '10000'))
+
+# Seconds between progress notifications and client disconnect checks
+PROGRESS_INTERVAL = float(os.getenv('PROGRESS_INTERVAL', '1'))
+
+# Default size limits for execute_query tool responses
+MCP_MAX_ROWS = int(os.getenv('MCP_MAX_ROWS', '100'))
+MCP_MAX_BYTES = int(os.getenv('MCP_MAX_BYTES', '32768'))
+
+# read_csv option that infers column types from every row rather than a sample
+CSV_FULL_SNIFF = "sample_size = -1"
+
+class FastJSONResponse(JSONResponse):
+    """JSON response written by the fast result encoder, bypassing FastAPI's generic encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
 
 class QueryRequest(BaseModel):
+    csv_file_path: Optional[str] = None
+    query: Optional[str] = None
+    # Streaming: "ndjson" (one row object per line) or "json" (chunked JSON document)
+    stream: Optional[str] = None
+    # Response format: json, ndjson, arrow, parquet or csv (overrides the Accept header)
+    format: Optional[str] = None
+    # Pagination: page_size opens a server-held cursor, cursor fetches its next page
+    page_size: Optional[int] = None
+    cursor: Optional[str] = None
+    # Client-chosen ID for cancelling and polling the query (generated if omitted)
+    query_id: Optional[str] = None
+    # Seconds before the query is interrupted (defaults to QUERY_TIMEOUT, 0 disables)
+    timeout: Optional[float] = None
+    # Skip the result cache for this request
+    no_cache: bool = False
+    # Values for $name (object) or $1/? (array) parameters in the query
+    params: Optional[Union[Dict[str, Any], List[Any]]] = None
+    # Run a registered statement instead of `query`
+    statement: Optional[str] = None
+    # Also run the query under EXPLAIN ANALYZE and return its profile and phase timings
+    profile: bool = False
+
+class StatementRequest(BaseModel):
+    name: str
+    query: str
+    # Default CSV files, used when a call does not name any
+    csv_file_path: Optional[str] = None
+    # Parameter name (or 1-based position) -> DuckDB type, e.g. {"since": "DATE"}
+    param_types: Optional[Dict[str, str]] = None
+
+class DescribeRequest(BaseModel):
+    csv_file_path: str
+
+class WarmupRequest(BaseModel):
+    csv_file_path: str
+    # Keep the dataset loaded regardless of idle time and memory pressure
+    pin: bool = False
+    # Higher priorities are loaded first
+    priority: int = 0
+
+class JobRequest(BaseModel):
     csv_file_path: str
     query: str
+    # Client-chosen job ID (generated if omitted)
+    job_id: Optional[str] = None
+    # Seconds before the job is interrupted (defaults to JOB_TIMEOUT, 0 disables)
+    timeout: Optional[float] = None
+    params: Optional[Union[Dict[str, Any], List[Any]]] = None
 
 class MCPFastAPIServer:
-    def __init__(self):
+    def __init__(self, preload: bool = True):
         self.app = Server("fastapi-mcp-server")
         self.fastapi_app = FastAPI()
         
@@ -45,11 +133,130 @@ class MCPFastAPIServer:
             allow_methods=["*"],
             allow_headers=["*"],
         )
+
+        # Compress responses with zstd (if installed) or gzip, as the client accepts
+        compression = os.getenv('RESPONSE_COMPRESSION', 'zstd,gzip')
+        if compression not in ('', '0', 'none'):
+            self.fastapi_app.add_middleware(
+                CompressionMiddleware,
+                minimum_size=parse_bytes(os.getenv('COMPRESSION_MIN_BYTES', '1024')),
+                encodings=[encoding.strip() for encoding in compression.split(',')],
+                level=int(os.getenv('COMPRESSION_LEVEL')) if os.getenv('COMPRESSION_LEVEL') else None
+            )
         
         # Configure logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger("fastapi-mcp-server")
         
+        # Shared database holding one table per distinct CSV file. Every load, conversion and
+        # query runs on it, so these are global limits rather than per-connection ones.
+        total_memory = physical_memory()
+        memory_limit = os.getenv('DUCKDB_MEMORY_LIMIT')
+        memory_limit = parse_bytes(memory_limit) if memory_limit else (total_memory * 8 // 10 if total_memory else None)
+        threads = int(os.getenv('DUCKDB_THREADS', str(os.cpu_count() or 4)))
+        catalog_conn = duckdb.connect(database=':memory:')
+        if memory_limit:
+            catalog_conn.execute(f"SET memory_limit = '{memory_limit}B'")
+        catalog_conn.execute(f"SET threads = {threads}")
+
+        # Independent files (and the files behind a glob) are loaded this many at a time
+        load_workers = int(os.getenv('LOAD_WORKERS', str(min(4, threads))))
+        self.ingest_pool = ThreadPoolExecutor(max_workers=load_workers, thread_name_prefix="ingest")
+
+        # On-disk columnar conversions of CSVs, reused across restarts
+        self.ingest_cache = None
+        if os.getenv('INGEST_CACHE', '1') != '0':
+            self.ingest_cache = IngestCache(
+                os.getenv('INGEST_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ingest_cache')),
+                full_hash=os.getenv('INGEST_CACHE_FULL_HASH', '0') == '1',
+                connect=catalog_conn.cursor
+            )
+
+        # Files that only grew are refreshed by appending the new rows instead of reloading;
+        # large files are queried lazily from disk until they are used often enough
+        materialize_max = os.getenv('MATERIALIZE_MAX_BYTES')
+        self.catalog = DatasetCatalog(
+            catalog_conn, self.load_file_table,
+            incremental=os.getenv('INCREMENTAL_APPEND', '1') != '0',
+            policy=LoadPolicy(
+                mode=os.getenv('DATASET_MODE', 'auto'),
+                lazy_min_bytes=parse_bytes(os.getenv('LAZY_MIN_BYTES', '512MB')),
+                materialize_after=int(os.getenv('MATERIALIZE_AFTER', '20')),
+                materialize_max_bytes=parse_bytes(materialize_max) if materialize_max else None
+            ),
+            load_workers=load_workers
+        )
+
+        # Loaded file combinations, evicted by LRU under a memory budget and when idle
+        budget = os.getenv('CACHE_MEMORY_BUDGET')
+        self.dataset_cache = DatasetCacheManager(
+            release=self.catalog.close,
+            resident_bytes=self.catalog.memory_usage,
+            memory_budget=parse_bytes(budget) if budget else (total_memory // 2 if total_memory else None),
+            idle_ttl=float(os.getenv('CACHE_IDLE_TTL', '600')),
+            size_of=lambda dataset: dataset.bytes
+        )
+        self.cleanup_interval = float(os.getenv('CACHE_CLEANUP_INTERVAL', '300'))
+
+        # Blocking DuckDB work runs on this bounded pool, never on the event loop
+        max_queued = os.getenv('QUERY_MAX_QUEUED')
+        self.executor = QueryExecutor(
+            max_workers=int(os.getenv('QUERY_WORKERS', str(min(8, os.cpu_count() or 4)))),
+            max_queued=int(max_queued) if max_queued else None
+        )
+
+        # Encoded results of repeated queries, keyed by dataset fingerprint and normalised SQL
+        result_budget = parse_bytes(os.getenv('RESULT_CACHE_BUDGET', '256MB'))
+        max_entry = os.getenv('RESULT_CACHE_MAX_ENTRY')
+        self.result_cache = ResultCache(
+            max_bytes=result_budget,
+            max_entry_bytes=parse_bytes(max_entry) if max_entry else result_budget // 4
+        )
+        self.result_cache_enabled = result_budget > 0 and os.getenv('RESULT_CACHE', '1') != '0'
+
+        # Profile every file as soon as it is loaded instead of on the first describe_dataset
+        self.profile_on_load = os.getenv('PROFILE_ON_LOAD', '0') == '1'
+
+        # Named parameterised queries
+        self.statements = StatementRegistry()
+
+        # Server-held result cursors for paginated queries
+        self.cursors = CursorRegistry(ttl=float(os.getenv('CURSOR_TTL', '300')))
+
+        # Finished query counters and the log of queries slower than SLOW_QUERY_SECONDS (0 disables)
+        self.query_metrics = QueryMetrics()
+        slow_seconds = float(os.getenv('SLOW_QUERY_SECONDS', '5'))
+        self.slow_queries = SlowQueryLog(slow_seconds or None, os.getenv('SLOW_QUERY_LOG') or None)
+
+        # Running queries, for cancellation, timeouts and progress polling
+        self.queries = QueryRegistry(
+            default_timeout=float(os.getenv('QUERY_TIMEOUT', '300')) or None,
+            retention=float(os.getenv('QUERY_RETENTION', '60')),
+            on_done=self.query_done
+        )
+
+        # Background jobs run on their own pool so long jobs cannot starve interactive queries
+        self.job_executor = QueryExecutor(max_workers=int(os.getenv('JOB_WORKERS', '2')))
+        self.job_timeout = float(os.getenv('JOB_TIMEOUT', '3600')) or None
+        self.jobs = JobManager(
+            os.getenv('JOB_SPOOL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'job_spool')),
+            ttl=float(os.getenv('JOB_TTL', '3600'))
+        )
+
+        # Pinned file combinations -> cache key of the pinned version (None until loaded)
+        self.pins: Dict[Tuple[str, ...], Optional[str]] = {}
+        self.pins_lock = threading.Lock()
+
+        # Datasets loaded in the background ahead of their first query, starting with the manifest
+        self.warmer = Warmer(self.warm_dataset)
+        manifest = os.getenv('PRELOAD_MANIFEST') if preload else None
+        if manifest:
+            try:
+                for entry in load_manifest(manifest):
+                    self.warmer.submit(entry)
+            except (OSError, ValueError) as e:
+                self.logger.error(f"Could not read preload manifest {manifest}: {str(e)}")
+
         # Set up handlers
         self.setup_handlers()
         self.setup_fastapi_routes()
@@ -59,17 +266,31 @@ class MCPFastAPIServer:
         self.cleanup_thread.start()
 
     def is_valid_csv_path(self, csv_file_path: str) -> bool:
-        """Validate if the CSV path is safe to use"""
+        """Validate if the CSV path (or glob/directory of CSVs) is safe to use"""
+        if is_multi_file(csv_file_path):
+            return bool(expand_source(csv_file_path))
         csv_file_path = os.path.abspath(csv_file_path)
         return csv_file_path.endswith('.csv') and os.path.exists(csv_file_path)
 
     def get_cache_key(self, csv_paths: List[str]) -> str:
-        """Generate cache key based on file paths and modification times"""
-        mod_times = [os.path.getmtime(path) for path in csv_paths]
-        return f"{','.join(csv_paths)}:{','.join(map(str, mod_times))}"
+        """Generate cache key based on file paths, modification times and sizes"""
+        stats = self.file_stats(csv_paths)
+        return f"{','.join(csv_paths)}:{','.join(f'{mtime}/{size}' for mtime, size in stats.values())}"
+
+    @staticmethod
+    def file_stats(csv_paths: List[str]) -> dict:
+        return {path: source_stat(path) for path in csv_paths}
 
     def load_csv_into_duckdb(self, csv_file_paths: List[str]) -> duckdb.DuckDBPyConnection:
         """Load multiple CSVs into DuckDB with caching"""
+        with self.using_dataset(csv_file_paths) as dataset:
+            return dataset.conn
+
+    def load_dataset(self, csv_file_paths: List[str]) -> Dataset:
+        """Return the cached dataset for a combination of CSVs, loading missing files.
+
+        The dataset cannot be evicted until it is handed back with `release_dataset`.
+        """
         # Validate all paths
         for path in csv_file_paths:
             if not self.is_valid_csv_path(path):
@@ -77,88 +298,966 @@ class MCPFastAPIServer:
 
         cache_key = self.get_cache_key(csv_file_paths)
 
-        if cache_key in duckdb_cache:
-            cache_access_times[cache_key] = time.time()
-            return duckdb_cache[cache_key]
+        # Files shared with other cached combinations are not loaded again
+        dataset = self.dataset_cache.get(cache_key, lambda: self.catalog.open(cache_key, csv_file_paths))
+        try:
+            self.update_pin(csv_file_paths, cache_key)
+            if self.catalog.record_access(dataset):
+                self.dataset_cache.enforce_budget(protect=cache_key)
+            if self.profile_on_load:
+                self.profile_dataset(dataset)
+        except Exception:
+            self.release_dataset(dataset)
+            raise
+        return dataset
+
+    def release_dataset(self, dataset: Dataset):
+        self.dataset_cache.done(dataset.key, dataset)
+
+    @contextmanager
+    def using_dataset(self, csv_file_paths: List[str]) -> Iterator[Dataset]:
+        """Load a dataset and keep it from being evicted for the duration of the block"""
+        dataset = self.load_dataset(csv_file_paths)
+        try:
+            yield dataset
+        finally:
+            self.release_dataset(dataset)
+
+    def update_pin(self, csv_file_paths: List[str], cache_key: str):
+        """Move a pin to the current version of a pinned combination, so older versions can expire"""
+        paths = tuple(csv_file_paths)
+        with self.pins_lock:
+            if paths not in self.pins or self.pins[paths] == cache_key:
+                return
+            previous, self.pins[paths] = self.pins[paths], cache_key
+        self.dataset_cache.pin(cache_key)
+        if previous is not None:
+            self.dataset_cache.unpin(previous)
+
+    def warm_dataset(self, csv_file_paths: List[str], pin: bool = False):
+        """Load a dataset ahead of its first query, optionally pinning it"""
+        if pin:
+            with self.pins_lock:
+                self.pins.setdefault(tuple(csv_file_paths), None)
+        with self.using_dataset(csv_file_paths):
+            pass
+
+    def unpin_dataset(self, csv_file_paths: List[str]):
+        """Let a pinned dataset be evicted again; raises KeyError if it is not pinned"""
+        with self.pins_lock:
+            key = self.pins.pop(tuple(csv_file_paths))
+        if key is not None:
+            self.dataset_cache.unpin(key)
+
+    def profile_dataset(self, dataset: Dataset) -> List[dict]:
+        """Column profiles of a dataset's files, computed once per file version"""
+        profiles = []
+        for table in dataset.tables:
+            profile = table.profile
+            if profile is None:
+                version = (table.mtime, table.size)
+                cursor = self.catalog.conn.cursor()
+                try:
+                    profile = profile_table(cursor, table.name)
+                finally:
+                    cursor.close()
+                # Do not keep a profile of content that changed while it was computed
+                if (table.mtime, table.size) == version:
+                    table.profile = profile
+            profiles.append(profile)
+        return profiles
+
+    def describe_dataset(self, csv_file_paths: List[str]):
+        """Schema and column statistics of each file, as seen through data_0..data_n"""
+        with self.using_dataset(csv_file_paths) as dataset:
+            profiles = self.profile_dataset(dataset)
+        return {
+            "success": True,
+            "tables": [
+                {"view": f"data_{i}", "table": table.name, "path": table.path, "mode": table.mode, **profile}
+                for i, (table, profile) in enumerate(zip(dataset.tables, profiles))
+            ]
+        }
+
+    def load_file_table(self, conn: duckdb.DuckDBPyConnection, table_name: str, file_path: str, lazy: bool = False):
+        """(Re)load one CSV file into its shared table, or expose it as a view that reads it lazily"""
+        table = quote_identifier(table_name)
+        select, values = self.source_query(file_path)
+        if lazy:
+            # View definitions cannot take parameters, so paths are embedded as quoted literals
+            literals = {
+                name: quote_literal(value) if isinstance(value, str)
+                else f"[{', '.join(quote_literal(item) for item in value)}]"
+                for name, value in values.items()
+            }
+            if CSV_FULL_SNIFF in select:
+                # Infer the column types from the whole file once, here, and pin them in the
+                # view so that queries against it do not each re-sniff the file
+                columns = conn.execute(f"DESCRIBE {select.format(**literals)}").fetchall()
+                types = ', '.join(f"{quote_literal(column[0])}: {quote_literal(column[1])}" for column in columns)
+                pinned = f"types = {{{types}}}".replace('{', '{{').replace('}', '}}')
+                select = select.replace(CSV_FULL_SNIFF, pinned)
+            conn.execute(f"CREATE OR REPLACE VIEW {table} AS {select.format(**literals)}")
         else:
-            conn = duckdb.connect(database=':memory:')
-            
-            # Configure DuckDB for large files
-            conn.execute("SET memory_limit='80%'")
-            conn.execute("SET threads TO 4")
-            
-            # Load each CSV file into a separate table
-            for i, file_path in enumerate(csv_file_paths):
-                table_name = f"data_{i}"
-                conn.execute(f"CREATE TABLE {table_name} AS SELECT * FROM read_csv_auto('{file_path}', sample_size=-1);")
-            
-            duckdb_cache[cache_key] = conn
-            cache_access_times[cache_key] = time.time()
-            return conn
+            conn.execute(f"CREATE OR REPLACE TABLE {table} AS {select.format(**{name: f'${name}' for name in values})}",
+                         values)
+
+    def source_query(self, file_path: str):
+        """SELECT template reading a CSV file or glob/directory, and the paths to fill into it.
+
+        A glob or directory becomes a single union of its files, matched by column
+        name, with a `filename` column naming the CSV each row came from. Its files
+        are converted to the ingest cache in parallel.
+        """
+        if not is_multi_file(file_path):
+            cached_path = self.get_ingested_path(file_path)
+            if cached_path:
+                return "SELECT * FROM read_parquet({path})", {'path': cached_path}
+            return f"SELECT * FROM read_csv_auto({{path}}, {CSV_FULL_SNIFF})", {'path': file_path}
+
+        files = expand_source(file_path)
+        if not files:
+            raise ValueError(f"No CSV files match {file_path}")
+        cached_paths = list(self.ingest_pool.map(self.get_ingested_path, files))
+        if all(cached_paths):
+            return (
+                "SELECT * REPLACE ({files}[list_position({sources}, filename)] AS filename) "
+                "FROM read_parquet({sources}, union_by_name = true, filename = true)"
+            ), {'files': files, 'sources': cached_paths}
+        return (
+            f"SELECT * FROM read_csv({{files}}, union_by_name = true, filename = true, {CSV_FULL_SNIFF})"
+        ), {'files': files}
+
+    def get_ingested_path(self, csv_file_path: str) -> Optional[str]:
+        """Return the on-disk columnar copy of a CSV, or None to read the CSV directly"""
+        if self.ingest_cache is None:
+            return None
+        try:
+            return self.ingest_cache.get(csv_file_path)
+        except Exception as e:
+            self.logger.warning(f"Ingest cache unavailable for {csv_file_path}, reading CSV directly: {str(e)}")
+            return None
 
     def cleanup_duckdb_connections(self):
         """Cleanup unused DuckDB connections periodically"""
         while True:
-            time.sleep(3000)  # Check every 5 minutes
-            current_time = time.time()
-            to_delete = []
-            for cache_key, last_access in cache_access_times.items():
-                if current_time - last_access > 600:  # 10 minutes timeout
-                    conn = duckdb_cache.get(cache_key)
-                    if conn:
-                        conn.close()
-                    to_delete.append(cache_key)
-            for cache_key in to_delete:
-                del duckdb_cache[cache_key]
-                del cache_access_times[cache_key]
+            time.sleep(self.cleanup_interval)
+            try:
+                self.dataset_cache.expire()
+                self.cursors.expire()
+                self.queries.expire()
+                self.jobs.expire()
+            except Exception as e:
+                self.logger.error(f"Error during cache cleanup: {str(e)}", exc_info=True)
 
     def setup_fastapi_routes(self):
         @self.fastapi_app.post("/execute_query")
-        async def execute_query(request: QueryRequest):
+        async def execute_query(request: QueryRequest, http_request: Request, response: Response):
+            handle = None
             try:
+                # Continue a paginated query from its server-held cursor
+                if request.cursor:
+                    return FastJSONResponse(await self.executor.run(self.fetch_page, request.cursor))
+
+                try:
+                    csv_file_path, query, params = self.resolve_query(
+                        request.csv_file_path, request.query, request.params, request.statement
+                    )
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+
                 # Handle multiple CSV files
-                csv_paths = [path.strip() for path in request.csv_file_path.split(',')]
-                result = await self.execute_query_internal(
-                    csv_file_paths=csv_paths,
-                    query=request.query
+                csv_paths = [path.strip() for path in csv_file_path.split(',')]
+
+                fmt = request.format or negotiate_format(http_request.headers.get('accept'))
+                if fmt is not None and fmt not in MEDIA_TYPES:
+                    raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+                if request.stream is not None and request.stream not in ('ndjson', 'json'):
+                    raise HTTPException(status_code=400, detail=f"Unsupported stream format: {request.stream}")
+                if fmt == 'ndjson' or fmt in BINARY_FORMATS:
+                    stream = fmt
+                else:
+                    stream = request.stream
+
+                try:
+                    handle = self.queries.open(query, request.query_id, request.timeout, csv_paths, params)
+                except ValueError as e:
+                    raise HTTPException(status_code=409, detail=str(e))
+                response.headers['X-Query-Id'] = handle.id
+
+                if stream is not None:
+                    opened = await self.run_tracked(
+                        handle, self.open_reader, csv_paths, query, STREAM_BATCH_SIZE, params,
+                        http_request=http_request
+                    )
+                    headers = {'X-Query-Id': handle.id, 'Server-Timing': server_timing(handle.phases)}
+                    if stream in FILE_EXTENSIONS:
+                        headers['Content-Disposition'] = f'attachment; filename="result.{FILE_EXTENSIONS[stream]}"'
+                    # The stream now owns the handle and finishes it
+                    stream_handle, handle = handle, None
+                    return StreamingResponse(
+                        self.stream_tracked(stream_handle, self.stream_batches(stream_handle, opened, stream)),
+                        media_type=MEDIA_TYPES[stream],
+                        headers=headers
+                    )
+
+                if request.page_size:
+                    return FastJSONResponse(await self.run_tracked(
+                        handle, self.open_cursor, csv_paths, query, request.page_size, params,
+                        http_request=http_request
+                    ), headers={'X-Query-Id': handle.id, 'Server-Timing': server_timing(handle.phases)})
+
+                body, cached = await self.cached_query(
+                    handle, csv_paths, query, params, not request.no_cache, http_request=http_request
                 )
-                return result
+                extra = {}
+                if request.profile:
+                    extra["profile"] = await self.run_tracked(
+                        handle, self.profile_query, csv_paths, query, params, http_request=http_request
+                    )
+                    extra["timings"] = {name: round(seconds, 4) for name, seconds in handle.phases.items()}
+                return Response(content=self.result_document(handle, body, cached, **extra),
+                                media_type=MEDIA_TYPES['json'],
+                                headers={'X-Query-Id': handle.id, 'X-Cache': 'HIT' if cached else 'MISS',
+                                         'Server-Timing': server_timing(handle.phases)})
+            except HTTPException:
+                raise
+            except ExecutorBusyError as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            except QueryTimeoutError as e:
+                raise HTTPException(status_code=408, detail=str(e))
+            except QueryCancelledError as e:
+                raise HTTPException(status_code=409, detail=str(e))
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=str(e).strip("'"))
             except Exception as e:
                 self.logger.error(f"Error processing request: {str(e)}", exc_info=True)
                 raise HTTPException(status_code=500, detail=str(e))
+            finally:
+                if handle is not None:
+                    handle.finish()
+
+        @self.fastapi_app.post("/statements", status_code=201)
+        async def register_statement(request: StatementRequest):
+            try:
+                statement = self.statements.add(Statement(
+                    request.name, request.query, request.csv_file_path, request.param_types
+                ))
+            except (ValueError, duckdb.Error) as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return statement.to_dict()
+
+        @self.fastapi_app.get("/statements")
+        async def list_statements():
+            return {"statements": [statement.to_dict() for statement in self.statements.list()]}
+
+        @self.fastapi_app.delete("/statements/{name}")
+        async def remove_statement(name: str):
+            try:
+                self.statements.remove(name)
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=str(e).strip("'"))
+            return {"success": True, "name": name}
+
+        @self.fastapi_app.post("/describe_dataset")
+        async def describe_dataset(request: DescribeRequest):
+            csv_paths = [path.strip() for path in request.csv_file_path.split(',')]
+            try:
+                return await self.executor.run(self.describe_dataset, csv_paths)
+            except ExecutorBusyError as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except Exception as e:
+                self.logger.error(f"Error describing dataset: {str(e)}", exc_info=True)
+                raise HTTPException(status_code=500, detail=str(e))
+
+        @self.fastapi_app.post("/warmup", status_code=202)
+        async def warmup(request: WarmupRequest):
+            csv_paths = [path.strip() for path in request.csv_file_path.split(',')]
+            entry = self.warmer.submit(WarmupEntry(csv_paths, pin=request.pin, priority=request.priority))
+            return entry.to_dict()
+
+        @self.fastapi_app.get("/warmup")
+        async def warmup_status():
+            with self.pins_lock:
+                pinned = [','.join(paths) for paths in self.pins]
+            return {**self.warmer.status(), "pinned": pinned}
+
+        @self.fastapi_app.delete("/pins")
+        async def unpin(csv_file_path: str):
+            csv_paths = [path.strip() for path in csv_file_path.split(',')]
+            try:
+                self.unpin_dataset(csv_paths)
+            except KeyError:
+                raise HTTPException(status_code=404, detail=f"Not pinned: {csv_file_path}")
+            return {"success": True, "csvFilePaths": csv_paths}
+
+        @self.fastapi_app.get("/queries")
+        async def list_queries():
+            return {"queries": [handle.to_dict() for handle in self.queries.active()]}
+
+        @self.fastapi_app.get("/queries/{query_id}")
+        async def query_status(query_id: str):
+            try:
+                return self.queries.get(query_id).to_dict()
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=str(e).strip("'"))
+
+        @self.fastapi_app.delete("/queries/{query_id}")
+        async def cancel_query(query_id: str):
+            try:
+                cancelled = self.queries.cancel(query_id)
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=str(e).strip("'"))
+            return {"success": cancelled, **self.queries.get(query_id).to_dict()}
+
+        @self.fastapi_app.post("/jobs", status_code=202)
+        async def submit_job(request: JobRequest):
+            csv_paths = [path.strip() for path in request.csv_file_path.split(',')]
+            if request.job_id is not None and not valid_job_id(request.job_id):
+                raise HTTPException(
+                    status_code=400, detail="job_id must be 1-64 letters, digits, underscores or hyphens"
+                )
+            try:
+                job = self.submit_job(csv_paths, request.query, request.job_id, request.timeout, request.params)
+            except ValueError as e:
+                raise HTTPException(status_code=409, detail=str(e))
+            return self.job_status(job)
+
+        @self.fastapi_app.get("/jobs")
+        async def list_jobs():
+            return {"jobs": [self.job_status(job) for job in self.jobs.list()]}
+
+        @self.fastapi_app.get("/jobs/{job_id}")
+        async def job_status(job_id: str):
+            try:
+                return self.job_status(self.jobs.get(job_id))
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=str(e).strip("'"))
+
+        @self.fastapi_app.get("/jobs/{job_id}/results")
+        async def job_results(job_id: str, offset: int = 0, limit: int = 1000, format: Optional[str] = None):
+            try:
+                job = self.jobs.get(job_id)
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=str(e).strip("'"))
+            if not job.succeeded:
+                return JSONResponse(status_code=409, content=self.job_status(job))
+            if format == 'parquet':
+                return FileResponse(job.result_path, media_type=MEDIA_TYPES['parquet'], filename=f"{job.id}.parquet")
+            if format is not None and format != 'json':
+                raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+            if offset < 0 or limit <= 0:
+                raise HTTPException(status_code=400, detail="offset must be >= 0 and limit > 0")
+            return FastJSONResponse(await self.executor.run(self.job_page, job, offset, limit))
+
+        @self.fastapi_app.delete("/jobs/{job_id}")
+        async def delete_job(job_id: str):
+            try:
+                self.jobs.remove(job_id)
+            except KeyError as e:
+                raise HTTPException(status_code=404, detail=str(e).strip("'"))
+            return {"success": True, "jobId": job_id}
+
+        @self.fastapi_app.delete("/cursors/{cursor_id}")
+        async def close_cursor(cursor_id: str):
+            self.cursors.close(cursor_id)
+            return {"success": True, "cursor": cursor_id}
+
+        @self.fastapi_app.get("/cache/stats")
+        async def cache_stats():
+            return {
+                **self.dataset_cache.stats(),
+                "results": self.result_cache.stats(),
+                "files": {
+                    "loaded": len(self.catalog.files),
+                    "lazy": sum(1 for table in list(self.catalog.files.values()) if table.mode == 'view'),
+                    "full_loads": self.catalog.full_loads,
+                    "appends": self.catalog.appends,
+                    "materializations": self.catalog.materializations
+                }
+            }
+
+        @self.fastapi_app.get("/slow_queries")
+        async def slow_queries(limit: int = 20):
+            return {
+                "thresholdSeconds": self.slow_queries.threshold,
+                "total": self.slow_queries.count,
+                "queries": self.slow_queries.worst(limit)
+            }
+
+        @self.fastapi_app.get("/metrics")
+        async def metrics():
+            return PlainTextResponse(render_prometheus(self.metrics()), media_type="text/plain; version=0.0.4")
+
+        @self.fastapi_app.delete("/cache/results")
+        async def clear_result_cache():
+            self.result_cache.clear()
+            return {"success": True}
 
         @self.fastapi_app.get("/health")
         async def health_check():
-            return {"status": "healthy", "server": "fastapi-mcp-server"}
+            stats = self.dataset_cache.stats()
+            return {
+                "status": "healthy",
+                "server": "fastapi-mcp-server",
+                "cache": {k: v for k, v in stats.items() if k != "datasets"},
+                "resultCache": self.result_cache.stats(),
+                "executor": self.executor.stats(),
+                "activeQueries": len(self.queries.active()),
+                "jobs": self.job_executor.stats(),
+                "warmup": {k: v for k, v in self.warmer.status().items() if k != "datasets"}
+            }
 
-    async def execute_query_internal(self, csv_file_paths: List[str], query: str):
-        """Execute DuckDB query on CSV data"""
+    async def run_tracked(self, handle: QueryHandle, func, *args, http_request: Optional[Request] = None):
+        """Run a tracked query on the executor, cancelling it if the caller goes away"""
+        watcher = None
+        if http_request is not None:
+            watcher = asyncio.ensure_future(self.watch_disconnect(http_request, handle))
         try:
-            # Load CSVs into DuckDB
-            conn = self.load_csv_into_duckdb(csv_file_paths)
+            return await self.executor.run(self.queued(handle, func), handle, *args)
+        except asyncio.CancelledError:
+            handle.cancel('request cancelled')
+            raise
+        except Exception as e:
+            handle.finish(e)
+            raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
 
-            # Execute the query with pagination
-            result = conn.execute(query).fetchdf()
-            
-            # Convert DataFrame to dict for JSON serialization
-            processed_data = result.to_dict('records')
-            columns = list(result.columns)
+    @staticmethod
+    def queued(handle: QueryHandle, func):
+        """Wrap an executor function so the time it waits for a worker counts as the 'queue' phase"""
+        submitted = time.perf_counter()
 
-            return {
-                "success": True,
-                "data": {
-                    "columns": columns,
-                    "rows": processed_data,
-                    "rowCount": len(processed_data)
-                }
+        def run(*args):
+            handle.phases['queue'] = handle.phases.get('queue', 0.0) + time.perf_counter() - submitted
+            return func(*args)
+        return run
+
+    def query_done(self, handle: QueryHandle):
+        """Record a finished query in the metrics, and in the slow-query log with its plan if slow"""
+        seconds = handle.finished - handle.created
+        self.query_metrics.observe(handle.state, seconds, handle.phases)
+        if self.slow_queries.is_slow(seconds):
+            # Planning may load the dataset, so it never runs on the caller's thread
+            threading.Thread(target=self.log_slow_query, args=(handle, seconds), daemon=True).start()
+
+    def log_slow_query(self, handle: QueryHandle, seconds: float):
+        plan = plan_error = None
+        if handle.csv_file_paths:
+            try:
+                with self.using_dataset(handle.csv_file_paths) as dataset, dataset.pooled_cursor() as cursor:
+                    plan = explain(cursor, handle.query, handle.params)
+            except Exception as e:
+                plan_error = str(e)
+        self.slow_queries.record({
+            "timestamp": datetime.fromtimestamp(handle.created).isoformat(),
+            "queryId": handle.id,
+            "query": handle.query,
+            "params": handle.params,
+            "csvFilePaths": handle.csv_file_paths,
+            "state": handle.state,
+            "reason": handle.reason,
+            "error": handle.error,
+            "seconds": round(seconds, 3),
+            "phases": {name: round(phase, 4) for name, phase in handle.phases.items()},
+            "plan": plan,
+            "planError": plan_error
+        })
+
+    def profile_query(self, handle: QueryHandle, csv_file_paths: List[str], query: str, params: Params = None) -> str:
+        """Run a query again under EXPLAIN ANALYZE and return DuckDB's per-operator profile"""
+        with self.using_dataset(csv_file_paths) as dataset, dataset.pooled_cursor() as cursor:
+            with handle.running(cursor, detach=True), handle.phase('profile'):
+                return explain(cursor, query, params, analyze=True)
+
+    def metrics(self):
+        """Server state as (name, type, help, [(labels, value)]) metrics for the /metrics endpoint"""
+        cache = self.dataset_cache.stats()
+        results = self.result_cache.stats()
+        pools = {"query": self.executor.stats(), "job": self.job_executor.stats()}
+        jobs: Dict[str, int] = {}
+        for job in self.jobs.list():
+            jobs[job.handle.state] = jobs.get(job.handle.state, 0) + 1
+        warmup = self.warmer.status()
+        return [
+            ("duckdb_executor_workers", "gauge", "Worker threads per executor pool",
+             [({"pool": pool}, stats["max_workers"]) for pool, stats in pools.items()]),
+            ("duckdb_executor_active", "gauge", "Tasks running per executor pool",
+             [({"pool": pool}, stats["active"]) for pool, stats in pools.items()]),
+            ("duckdb_executor_queued", "gauge", "Tasks waiting for a worker per executor pool",
+             [({"pool": pool}, stats["queued"]) for pool, stats in pools.items()]),
+            *[(f"duckdb_executor_{key}_total", "counter", f"Tasks {key} per executor pool",
+               [({"pool": pool}, stats[key]) for pool, stats in pools.items()])
+              for key in ("submitted", "completed", "failed", "rejected")],
+            ("duckdb_active_queries", "gauge", "Queries queued or running", [({}, len(self.queries.active()))]),
+            ("duckdb_open_cursors", "gauge", "Server-held result cursors", [({}, len(self.cursors.cursors))]),
+            ("duckdb_jobs", "gauge", "Background jobs by state",
+             [({"state": state}, count) for state, count in sorted(jobs.items())]),
+            ("duckdb_dataset_cache_entries", "gauge", "Cached datasets", [({}, cache["entries"])]),
+            ("duckdb_dataset_cache_pinned", "gauge", "Pinned cached datasets", [({}, cache["pinned"])]),
+            ("duckdb_dataset_cache_hits_total", "counter", "Dataset cache hits", [({}, cache["hits"])]),
+            ("duckdb_dataset_cache_misses_total", "counter", "Dataset cache misses", [({}, cache["misses"])]),
+            ("duckdb_dataset_cache_evictions_total", "counter", "Datasets evicted to fit the memory budget",
+             [({}, cache["evictions"])]),
+            ("duckdb_dataset_cache_expirations_total", "counter", "Datasets released after idling",
+             [({}, cache["expirations"])]),
+            ("duckdb_dataset_cache_budget_bytes", "gauge", "Dataset cache memory budget",
+             [({}, cache["memory_budget_bytes"])]),
+            ("duckdb_memory_bytes", "gauge", "Memory DuckDB accounts for", [({}, cache["resident_bytes"])]),
+            ("duckdb_result_cache_entries", "gauge", "Cached query results", [({}, results["entries"])]),
+            ("duckdb_result_cache_bytes", "gauge", "Bytes held by the result cache", [({}, results["bytes"])]),
+            ("duckdb_result_cache_hits_total", "counter", "Result cache hits", [({}, results["hits"])]),
+            ("duckdb_result_cache_misses_total", "counter", "Result cache misses", [({}, results["misses"])]),
+            ("duckdb_result_cache_evictions_total", "counter", "Results evicted from the result cache",
+             [({}, results["evictions"])]),
+            ("duckdb_files_loaded", "gauge", "Files held by the catalog", [({}, len(self.catalog.files))]),
+            ("duckdb_file_loads_total", "counter", "File loads by kind",
+             [({"kind": "full"}, self.catalog.full_loads), ({"kind": "append"}, self.catalog.appends),
+              ({"kind": "materialize"}, self.catalog.materializations)]),
+            ("duckdb_warmup_datasets", "gauge", "Preload requests by state",
+             [({"state": state}, warmup[state]) for state in ("pending", "loading", "ready", "failed")]),
+            ("duckdb_slow_queries_total", "counter", "Queries over the slow-query threshold",
+             [({}, self.slow_queries.count)]),
+            ("process_resident_memory_bytes", "gauge", "Resident memory of the server process",
+             [({}, process_rss())]),
+            *self.query_metrics.samples(),
+        ]
+
+    async def watch_disconnect(self, http_request: Request, handle: QueryHandle):
+        while not handle.done:
+            if await http_request.is_disconnected():
+                handle.cancel('client disconnected')
+                return
+            await asyncio.sleep(PROGRESS_INTERVAL)
+
+    def open_reader(self, handle: QueryHandle, csv_file_paths: List[str], query: str, batch_size: int,
+                    params: Params = None):
+        """Run a query on its own cursor and return the dataset, the cursor and an Arrow batch reader.
+
+        The dataset stays in use until `close_reader` is called.
+        """
+        with handle.phase('load'):
+            dataset = self.load_dataset(csv_file_paths)
+        # A dedicated cursor keeps the pending result valid while other queries use the connection
+        try:
+            cursor = dataset.cursor()
+            try:
+                with handle.running(cursor), handle.phase('execute'):
+                    reader = cursor.execute(query, params).fetch_record_batch(batch_size)
+            except Exception:
+                cursor.close()
+                raise
+        except Exception:
+            self.release_dataset(dataset)
+            raise
+        return dataset, cursor, reader
+
+    def close_reader(self, dataset: Dataset, cursor: duckdb.DuckDBPyConnection):
+        try:
+            cursor.close()
+        finally:
+            self.release_dataset(dataset)
+
+    def stream_batches(self, handle: QueryHandle, opened, fmt: str) -> Iterator[bytes]:
+        """Yield a query result batch by batch in the requested format"""
+        dataset, cursor, reader = opened
+        try:
+            with handle.phase('stream'):
+                yield from encode_batches(reader, fmt)
+        except Exception as e:
+            error = handle.cancellation() if handle.cancelled else e
+            self.logger.error(f"Error streaming query result: {str(error)}", exc_info=True)
+            if fmt == 'ndjson':
+                yield (json.dumps({"success": False, "error": str(error)}) + '\n').encode()
+            # Re-raise so the chunked response is aborted rather than ending like a complete result
+            if error is e:
+                raise
+            raise error from e
+        finally:
+            self.close_reader(dataset, cursor)
+
+    async def stream_tracked(self, handle: QueryHandle, chunks: Iterator[bytes]):
+        """Relay a result stream, interrupting the query if the client stops reading"""
+        completed = False
+        error = None
+        try:
+            async for chunk in iterate_in_threadpool(chunks):
+                yield chunk
+            completed = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if not completed and error is None:
+                handle.cancel('client disconnected')
+            handle.finish(error)
+
+    def open_cursor(self, handle: QueryHandle, csv_file_paths: List[str], query: str, page_size: int,
+                    params: Params = None):
+        """Execute a query, keep its result on the server and return the first page"""
+        dataset, cursor, reader = self.open_reader(handle, csv_file_paths, query, page_size, params)
+        try:
+            with handle.running(cursor):
+                result_cursor = ResultCursor(cursor, reader, page_size,
+                                             on_close=lambda: self.release_dataset(dataset))
+        except Exception:
+            self.close_reader(dataset, cursor)
+            raise
+        self.cursors.add(result_cursor)
+        return self.fetch_page(result_cursor.id)
+
+    def fetch_page(self, cursor_id: str):
+        """Return the next page of a server-held cursor, closing it once exhausted"""
+        result_cursor = self.cursors.get(cursor_id)
+        page = result_cursor.next_page()
+        rows = page.to_pylist() if page is not None else []
+        if result_cursor.exhausted:
+            self.cursors.close(cursor_id)
+        return {
+            "success": True,
+            "data": {
+                "columns": result_cursor.columns,
+                "rows": rows,
+                "rowCount": len(rows)
+            },
+            "cursor": None if result_cursor.exhausted else cursor_id,
+            "rowsServed": result_cursor.rows_served
+        }
+
+    def fetch_shaped_page(self, cursor_id: str, shape: ShapeOptions):
+        """Return the next page of a cursor as a tool response, bounded like the result that opened it"""
+        result_cursor = self.cursors.get(cursor_id)
+        shape = result_cursor.shape or shape
+        page = result_cursor.next_page()
+        if page is None:
+            page = pa.RecordBatch.from_pylist([], schema=result_cursor.reader.schema)
+        document, rows = shape_page(page, shape, {"success": True, "cursor": cursor_id,
+                                                  "rowsServed": result_cursor.rows_served})
+        # Rows that did not fit in max_bytes start the next page
+        result_cursor.push_back(page.slice(rows))
+        if result_cursor.exhausted:
+            self.cursors.close(cursor_id)
+            document["cursor"] = None
+        document["rowsServed"] = result_cursor.rows_served
+        return document
+
+    def submit_job(self, csv_file_paths: List[str], query: str, job_id: Optional[str] = None,
+                   timeout: Optional[float] = None, params: Params = None) -> Job:
+        """Register a background job and start it; raises ValueError if the ID is invalid or in use"""
+        if job_id is not None and not valid_job_id(job_id):
+            raise ValueError(f"Invalid job ID: {job_id}")
+        handle = self.queries.open(query, job_id, timeout if timeout is not None else self.job_timeout,
+                                   csv_file_paths, params)
+        job = self.jobs.add(handle, csv_file_paths, params)
+        job.task = asyncio.ensure_future(self.run_job(job))
+        return job
+
+    async def run_job(self, job: Job):
+        try:
+            await self.job_executor.run(self.queued(job.handle, self.spool_job), job)
+        except Exception as e:
+            if not job.handle.cancelled:
+                self.logger.error(f"Job {job.id} failed: {str(e)}")
+            job.handle.finish(e)
+        else:
+            job.handle.finish()
+
+    def spool_job(self, job: Job):
+        """Run a job's query and write its result to the job's Parquet file (blocking)"""
+        handle = job.handle
+        dataset, cursor, reader = self.open_reader(
+            handle, job.csv_file_paths, handle.query, STREAM_BATCH_SIZE, job.params
+        )
+        try:
+            with handle.running(cursor), handle.phase('spool'):
+                job.columns = reader.schema.names
+                job.row_count = spool_batches(reader, job.result_path, STREAM_BATCH_SIZE)
+        finally:
+            self.close_reader(dataset, cursor)
+        job.result_bytes = os.path.getsize(job.result_path)
+
+    def job_status(self, job: Job):
+        return job.to_dict(self.jobs.ttl)
+
+    def job_page(self, job: Job, offset: int, limit: int):
+        """Read one page of a finished job's spooled result"""
+        page = read_rows(job.result_path, offset, limit)
+        rows = page.to_pylist()
+        next_offset = offset + len(rows)
+        return {
+            "success": True,
+            "jobId": job.id,
+            "data": {
+                "columns": job.columns,
+                "rows": rows,
+                "rowCount": len(rows)
+            },
+            "offset": offset,
+            "nextOffset": next_offset if next_offset < job.row_count else None,
+            "totalRows": job.row_count
+        }
+
+    def resolve_query(self, csv_file_path: Optional[str], query: Optional[str], params: Params,
+                      statement_name: Optional[str]):
+        """Return the files, SQL and bound parameters for a raw query or a registered statement"""
+        if statement_name:
+            try:
+                statement = self.statements.get(statement_name)
+            except KeyError as e:
+                raise ValueError(str(e).strip("'"))
+            params = statement.bind(params)
+            statement.executions += 1
+            csv_file_path, query = csv_file_path or statement.csv_file_path, statement.sql
+        if not csv_file_path or not query:
+            raise ValueError("csv_file_path and query are required")
+        return csv_file_path, query, params
+
+    async def cached_query(self, handle: QueryHandle, csv_file_paths: List[str], query: str, params: Params = None,
+                           use_cache: bool = True, http_request: Optional[Request] = None):
+        """Return a query's encoded `data` object and whether it came from the result cache"""
+        key, files = self.result_cache_key(csv_file_paths, query, params, use_cache)
+        if key is not None:
+            body = self.result_cache.get(key)
+            if body is not None:
+                handle.finish()
+                return body, True
+
+        body = await self.run_tracked(
+            handle, self.run_query_encoded, csv_file_paths, query, params, http_request=http_request
+        )
+        if key is not None:
+            self.result_cache.put(key, body, files)
+        return body, False
+
+    def result_cache_key(self, csv_file_paths: List[str], query: str, params: Any, use_cache: bool):
+        """Result cache key and file stats for a query, or (None, None) if it must not be cached"""
+        if not self.result_cache_enabled:
+            return None, None
+        if not use_cache:
+            self.result_cache.record_bypass()
+            return None, None
+        try:
+            files = self.file_stats(csv_file_paths)
+        except OSError:
+            # Let the query report the missing file
+            return None, None
+        self.result_cache.invalidate(files)
+        return self.result_cache.make_key(self.get_cache_key(csv_file_paths), query, params), files
+
+    async def shaped_query(self, handle: QueryHandle, csv_file_paths: List[str], query: str, params: Params,
+                           shape: ShapeOptions, use_cache: bool = True):
+        """Run a query for a tool response limited to shape.max_rows/max_bytes"""
+        key, files = self.result_cache_key(csv_file_paths, query, [params, shape.to_key()], use_cache)
+        if key is not None:
+            body = self.result_cache.get(key)
+            if body is not None:
+                handle.finish()
+                return {"success": True, "queryId": handle.id, "cached": True, **json.loads(body)}
+
+        document = await self.run_tracked(handle, self.run_query_shaped, csv_file_paths, query, params, shape)
+        # Truncated results hold a cursor, so only complete ones are cached
+        if key is not None and not document["truncated"]:
+            self.result_cache.put(key, encode_compact({k: v for k, v in document.items() if k != "queryId"}), files)
+        return {"success": True, "queryId": handle.id, "cached": False, **document}
+
+    def run_query_shaped(self, handle: QueryHandle, csv_file_paths: List[str], query: str, params: Params,
+                         shape: ShapeOptions):
+        """Cut a query result down to the shape without holding the whole result in memory.
+
+        Only the first rows are read from the live result; a truncated result's row count,
+        column summaries and tail are computed by DuckDB with further queries over it. The
+        live result stays behind a cursor that pages through the omitted rows.
+        """
+        page_size = shape.max_rows or MCP_MAX_ROWS
+        dataset, cursor, reader = self.open_reader(handle, csv_file_paths, query, page_size, params)
+        keep_open = False
+        try:
+            # Read one row more than can be returned to learn whether the result is complete
+            batches = []
+            with handle.running(cursor), handle.phase('execute'):
+                while sum(batch.num_rows for batch in batches) <= shape.max_rows:
+                    try:
+                        batches.append(reader.read_next_batch())
+                    except StopIteration:
+                        break
+            head = pa.Table.from_batches(batches, schema=reader.schema)
+            complete = head.num_rows <= shape.max_rows
+
+            with handle.phase('shape'), dataset.pooled_cursor() as side, handle.running(side, detach=True):
+                if not complete:
+                    try:
+                        source = query.strip().rstrip(';')
+                        total, summary = read_summary(
+                            side.execute(summary_query(source, reader.schema), params).fetchone(), reader.schema
+                        )
+                        _, tail_rows = split_sample(total, shape.max_rows, shape.sample)
+                        tail = head.slice(0, 0)
+                        if tail_rows:
+                            tail = side.execute(
+                                f"SELECT * FROM ({source}) LIMIT {tail_rows} OFFSET {total - tail_rows}", params
+                            ).fetch_arrow_table()
+                    except duckdb.Error as e:
+                        # Statements that cannot be used as a subquery (SHOW, PRAGMA, ...) are read in full
+                        self.logger.info(f"Reading the whole result to shape it: {str(e)}")
+                        with handle.running(cursor):
+                            head = pa.concat_tables([head, reader.read_all()])
+                        complete = True
+                if complete:
+                    total, tail = head.num_rows, head
+                    summary = None
+                document, head_rows, tail_rows = shape_result(
+                    head, tail, total, shape, {},
+                    lambda: summary if summary is not None else self.summarize_table(side, head)
+                )
+
+            document["cursor"] = None
+            omitted = total - head_rows - tail_rows
+            if omitted > 0:
+                if complete:
+                    rows = head.slice(head_rows, omitted)
+                    result_cursor = ResultCursor(
+                        None, pa.RecordBatchReader.from_batches(rows.schema, rows.to_batches(max_chunksize=page_size)),
+                        page_size, shape=shape
+                    )
+                else:
+                    # Rows already read past the head come first, then the rest of the live result
+                    batches = itertools.chain(head.slice(head_rows).to_batches(), reader)
+                    result_cursor = ResultCursor(
+                        cursor, pa.RecordBatchReader.from_batches(reader.schema, limit_batches(batches, omitted)),
+                        page_size, on_close=lambda: self.release_dataset(dataset), shape=shape
+                    )
+                    keep_open = True
+                self.cursors.add(result_cursor)
+                document["cursor"] = result_cursor.id
+            return document
+        finally:
+            if not keep_open:
+                self.close_reader(dataset, cursor)
+
+    @staticmethod
+    def summarize_table(cursor: duckdb.DuckDBPyConnection, table: pa.Table) -> Dict[str, Dict[str, Any]]:
+        """Column summaries of a result already held in memory"""
+        cursor.register('shaped_result', table)
+        try:
+            return read_summary(cursor.execute(summary_query('FROM shaped_result', table.schema)).fetchone(),
+                                table.schema)[1]
+        finally:
+            cursor.unregister('shaped_result')
+
+    @staticmethod
+    def result_document(handle: QueryHandle, body: bytes, cached: bool, **extra) -> bytes:
+        head = dumps({"success": True, "queryId": handle.id, "cached": cached, **extra})
+        return head[:-1] + b',"data":' + body + b'}'
+
+    def run_query_encoded(self, handle: QueryHandle, csv_file_paths: List[str], query: str,
+                          params: Params = None) -> bytes:
+        """Run a query and JSON-encode its `data` object on the worker thread"""
+        result = self.run_query(handle, csv_file_paths, query, params)
+        with handle.phase('serialize'):
+            return dumps(result["data"])
+
+    def run_query(self, handle: QueryHandle, csv_file_paths: List[str], query: str, params: Params = None):
+        """Load the CSVs and run a query on a pooled cursor (blocking; runs on the executor)"""
+        # Load CSVs into DuckDB
+        with handle.phase('load'):
+            dataset = self.load_dataset(csv_file_paths)
+
+        # Each query holds its own cursor so queries on one dataset can run in parallel;
+        # parameters are bound by DuckDB, never formatted into the SQL
+        try:
+            with dataset.pooled_cursor() as cursor:
+                with handle.running(cursor, detach=True), handle.phase('execute'):
+                    result = cursor.execute(query, params).fetch_record_batch(STREAM_BATCH_SIZE).read_all()
+        finally:
+            self.release_dataset(dataset)
+
+        # Straight from Arrow to Python values: SQL NULLs become None and types stay exact
+        with handle.phase('convert'):
+            processed_data = result.to_pylist()
+        columns = result.column_names
+
+        return {
+            "success": True,
+            "queryId": handle.id,
+            "data": {
+                "columns": columns,
+                "rows": processed_data,
+                "rowCount": len(processed_data)
             }
+        }
+
+    async def execute_query_internal(self, csv_file_paths: List[str], query: str, query_id: Optional[str] = None,
+                                     timeout: Optional[float] = None, on_progress=None, use_cache: bool = True,
+                                     params: Params = None, shape: Optional[ShapeOptions] = None):
+        """Execute DuckDB query on CSV data, reporting progress through `on_progress(percent)`.
 
+        With `shape`, the result is cut down to a bounded tool response instead of returned in full.
+        """
+        handle = None
+        reporter = None
+        try:
+            handle = self.queries.open(query, query_id, timeout, csv_file_paths, params)
+            if on_progress is not None:
+                reporter = asyncio.ensure_future(self.report_progress(handle, on_progress))
+            if shape is not None:
+                return await self.shaped_query(handle, csv_file_paths, query, params, shape, use_cache)
+            body, cached = await self.cached_query(handle, csv_file_paths, query, params, use_cache)
+            return json.loads(self.result_document(handle, body, cached))
+
+        except QueryCancelledError as e:
+            self.logger.info(str(e))
+            return {
+                "success": False,
+                "queryId": e.query_id,
+                "cancelled": True,
+                "reason": e.reason,
+                "error": str(e)
+            }
         except Exception as e:
             self.logger.error(f"Error executing query: {str(e)}", exc_info=True)
             return {
                 "success": False,
                 "error": str(e)
             }
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+            if handle is not None:
+                handle.finish()
+
+    async def report_progress(self, handle: QueryHandle, on_progress):
+        """Call on_progress whenever DuckDB reports a new completion percentage"""
+        last = None
+        while not handle.done:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            progress = handle.progress()
+            if progress is not None and progress != last:
+                last = progress
+                try:
+                    await on_progress(progress)
+                except Exception as e:
+                    self.logger.warning(f"Could not report progress for query {handle.id}: {str(e)}")
+                    return
+
+    async def call_job_tool(self, name: str, arguments: Any):
+        if name == "submit_query_job":
+            csv_paths = [path.strip() for path in arguments.get("csv_file_path").split(',')]
+            return self.job_status(self.submit_job(csv_paths, arguments.get("query"), timeout=arguments.get("timeout")))
+        if name == "cancel_query_job":
+            self.jobs.remove(arguments.get("job_id"))
+            return {"success": True, "jobId": arguments.get("job_id")}
+        job = self.jobs.get(arguments.get("job_id"))
+        status = self.job_status(job)
+        if job.succeeded:
+            page = await self.executor.run(
+                self.job_page, job, int(arguments.get("offset", 0)), int(arguments.get("limit", 100))
+            )
+            status.update(data=page["data"], nextOffset=page["nextOffset"])
+        return status
 
     def setup_handlers(self):
         @self.app.list_tools()
@@ -166,40 +1265,222 @@ class MCPFastAPIServer:
             return [
                 Tool(
                     name="execute_query",
-                    description="Execute DuckDB query on one or more CSV files",
+                    description="Execute DuckDB query on one or more CSV files (csv_file_path and query, "
+                                "or a registered statement)",
                     inputSchema={
                         "type": "object",
                         "properties": {
                             "csv_file_path": {
                                 "type": "string",
-                                "description": "Comma-separated paths to CSV files"
+                                "description": "Comma-separated paths to CSV files, globs (logs/*.csv) or directories"
+                            },
+                            "query": {
+                                "type": "string",
+                                "description": "DuckDB SQL query to execute; use $name placeholders with params"
+                            },
+                            "params": {
+                                "type": ["object", "array"],
+                                "description": "Values for $name (object) or $1/? (array) placeholders"
+                            },
+                            "statement": {
+                                "type": "string",
+                                "description": "Name of a registered statement to run instead of query"
+                            },
+                            "query_id": {
+                                "type": "string",
+                                "description": "Optional ID for cancelling or polling the query over HTTP"
+                            },
+                            "timeout": {
+                                "type": "number",
+                                "description": "Seconds before the query is interrupted"
+                            },
+                            "no_cache": {
+                                "type": "boolean",
+                                "description": "Run the query even if a cached result exists"
+                            },
+                            "max_rows": {
+                                "type": "integer",
+                                "description": f"Most rows to return (default {MCP_MAX_ROWS}); the rest are "
+                                               "summarised per column and can be paged with the returned cursor"
+                            },
+                            "max_bytes": {
+                                "type": "integer",
+                                "description": f"Most bytes of JSON to return (default {MCP_MAX_BYTES})"
+                            },
+                            "sample": {
+                                "type": "string",
+                                "enum": ["head", "tail", "head_tail"],
+                                "description": "Which rows to return when the result is truncated (default head)"
+                            },
+                            "layout": {
+                                "type": "string",
+                                "enum": ["columnar", "rows"],
+                                "description": "columnar: one array per column (default); rows: one object per row"
+                            },
+                            "cursor": {
+                                "type": "string",
+                                "description": "Cursor from a truncated result; returns its next page of omitted rows"
+                            }
+                        },
+                        "required": []
+                    }
+                ),
+                Tool(
+                    name="describe_dataset",
+                    description="Describe the columns of one or more CSV files (data_0..data_n): type, "
+                                "null count, min/max, approximate distinct count and sample values",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "csv_file_path": {
+                                "type": "string",
+                                "description": "Comma-separated paths to CSV files, globs (logs/*.csv) or directories"
+                            }
+                        },
+                        "required": ["csv_file_path"]
+                    }
+                ),
+                Tool(
+                    name="warm_dataset",
+                    description="Load one or more CSV files in the background so later queries start warm; "
+                                "pinned datasets stay loaded",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "csv_file_path": {
+                                "type": "string",
+                                "description": "Comma-separated paths to CSV files, globs (logs/*.csv) or directories"
+                            },
+                            "pin": {
+                                "type": "boolean",
+                                "description": "Keep the dataset loaded regardless of idle time and memory pressure"
+                            },
+                            "priority": {
+                                "type": "integer",
+                                "description": "Higher priorities are loaded first (default 0)"
+                            }
+                        },
+                        "required": ["csv_file_path"]
+                    }
+                ),
+                Tool(
+                    name="submit_query_job",
+                    description="Start a long-running DuckDB query in the background and return its job ID",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "csv_file_path": {
+                                "type": "string",
+                                "description": "Comma-separated paths to CSV files, globs (logs/*.csv) or directories"
                             },
                             "query": {
                                 "type": "string",
                                 "description": "DuckDB SQL query to execute"
+                            },
+                            "timeout": {
+                                "type": "number",
+                                "description": "Seconds before the job is interrupted"
                             }
                         },
                         "required": ["csv_file_path", "query"]
                     }
+                ),
+                Tool(
+                    name="get_query_job",
+                    description="Get a background job's status and, once it has finished, a page of its result",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "job_id": {"type": "string"},
+                            "offset": {"type": "integer", "description": "First result row to return (default 0)"},
+                            "limit": {"type": "integer", "description": "Result rows to return (default 100)"}
+                        },
+                        "required": ["job_id"]
+                    }
+                ),
+                Tool(
+                    name="cancel_query_job",
+                    description="Cancel a background job and delete its result",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "job_id": {"type": "string"}
+                        },
+                        "required": ["job_id"]
+                    }
                 )
             ]
 
         @self.app.call_tool()
         async def call_tool(name: str, arguments: Any) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
+            if name == "describe_dataset":
+                csv_paths = [path.strip() for path in arguments.get("csv_file_path").split(',')]
+                try:
+                    result = await self.executor.run(self.describe_dataset, csv_paths)
+                except Exception as e:
+                    self.logger.error(f"Error describing dataset: {str(e)}", exc_info=True)
+                    result = {"success": False, "error": str(e)}
+                return [TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+            if name == "warm_dataset":
+                csv_paths = [path.strip() for path in arguments.get("csv_file_path").split(',')]
+                entry = self.warmer.submit(WarmupEntry(
+                    csv_paths, pin=bool(arguments.get("pin", False)), priority=int(arguments.get("priority", 0))
+                ))
+                result = {"success": True, **entry.to_dict()}
+                return [TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
+            if name in ("submit_query_job", "get_query_job", "cancel_query_job"):
+                try:
+                    result = await self.call_job_tool(name, arguments)
+                except (KeyError, ValueError) as e:
+                    result = {"success": False, "error": str(e).strip("'")}
+                return [TextContent(type="text", text=json.dumps(result, indent=2, default=str))]
             if name != "execute_query":
                 raise ValueError(f"Unknown tool: {name}")
 
             try:
-                csv_paths = [path.strip() for path in arguments.get("csv_file_path").split(',')]
+                shape = ShapeOptions(
+                    max_rows=int(arguments.get("max_rows", MCP_MAX_ROWS)),
+                    max_bytes=int(arguments.get("max_bytes", MCP_MAX_BYTES)),
+                    sample=arguments.get("sample", "head"),
+                    layout=arguments.get("layout", "columnar")
+                )
+
+                # Page through the rows a truncated result left out
+                if arguments.get("cursor"):
+                    result = await self.executor.run(self.fetch_shaped_page, arguments.get("cursor"), shape)
+                    return [TextContent(type="text", text=encode_compact(result).decode())]
+                csv_file_path, query, params = self.resolve_query(
+                    arguments.get("csv_file_path"), arguments.get("query"), arguments.get("params"),
+                    arguments.get("statement")
+                )
+                csv_paths = [path.strip() for path in csv_file_path.split(',')]
+
+                # Report progress if the client asked for it with a progress token
+                ctx = self.app.request_context
+                token = ctx.meta.progressToken if ctx.meta else None
+
+                async def notify_progress(progress: float):
+                    await ctx.session.send_progress_notification(
+                        token, progress, total=100.0, related_request_id=ctx.request_id
+                    )
+
+                # MCP cancellation cancels this handler, which interrupts the query
                 result = await self.execute_query_internal(
                     csv_file_paths=csv_paths,
-                    query=arguments.get("query")
+                    query=query,
+                    query_id=arguments.get("query_id"),
+                    timeout=arguments.get("timeout"),
+                    on_progress=notify_progress if token is not None else None,
+                    use_cache=not arguments.get("no_cache", False),
+                    params=params,
+                    shape=shape
                 )
-                
+
+                # Compact encoding: no indentation, so responses stay small and fast to serialise
                 return [
                     TextContent(
                         type="text",
-                        text=json.dumps(result, indent=2)
+                        text=encode_compact(result).decode()
                     )
                 ]
 
@@ -219,8 +1500,8 @@ class MCPFastAPIServer:
         """Run the FastAPI server"""
         config = uvicorn.Config(
             self.fastapi_app, 
-            host="0.0.0.0", 
-            port=8010, 
+            host=os.getenv('HOST', '0.0.0.0'),
+            port=int(os.getenv('PORT', '8010')),
             log_level="info",
             reload=False
         )
@@ -238,22 +1519,47 @@ class MCPFastAPIServer:
                 self.app.create_initialization_options()
             )
 
-    async def run(self):
+    async def run(self, http: bool = True, mcp: bool = True):
         """Main entry point for the server"""
         self.logger.info("Starting FastAPI MCP Server")
         try:
             await asyncio.gather(
-                self.run_fastapi(),
-                self.run_mcp()
+                *([self.run_fastapi()] if http else []),
+                *([self.run_mcp()] if mcp else [])
             )
         except Exception as e:
             self.logger.error(f"Server error: {str(e)}", exc_info=True)
             raise
 
 async def main():
+    """Start the servers selected by SERVER_MODE: all (HTTP and MCP stdio), http or mcp.
+
+    With HTTP_WORKERS above 1 the HTTP API runs as that many worker processes
+    behind a router, and an MCP stdio server in the same deployment keeps its
+    own engine in the router process.
+    """
     try:
-        server = MCPFastAPIServer()
-        await server.run()
+        mode = os.getenv('SERVER_MODE', 'all')
+        if mode not in ('all', 'http', 'mcp'):
+            raise ValueError(f"Unknown SERVER_MODE: {mode}")
+        workers = int(os.getenv('HTTP_WORKERS', '1'))
+        serve_http, serve_mcp = mode in ('all', 'http'), mode in ('all', 'mcp')
+
+        tasks = []
+        if serve_http and workers > 1:
+            # The MCP frontend in this process takes one share of the machine's budget
+            share = worker_environment(workers + (1 if serve_mcp else 0))
+            tasks.append(run_router(
+                os.path.abspath(__file__), workers,
+                os.getenv('HOST', '0.0.0.0'), int(os.getenv('PORT', '8010')), share
+            ))
+            if serve_mcp:
+                os.environ.update(share)
+            serve_http = False
+        if serve_http or serve_mcp:
+            server = MCPFastAPIServer(preload=serve_http or workers <= 1)
+            tasks.append(server.run(http=serve_http, mcp=serve_mcp))
+        await asyncio.gather(*tasks)
     except Exception as e:
         logging.error(f"Failed to start server: {str(e)}", exc_info=True)
         raise
@@ -0,0 +1,129 @@
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("fastapi-mcp-server")
+
+
+class WarmupEntry:
+    """A dataset (file combination) to load ahead of the first query"""
+
+    def __init__(self, csv_file_paths: List[str], pin: bool = False, priority: int = 0):
+        self.csv_file_paths = csv_file_paths
+        self.pin = pin
+        self.priority = priority
+        # pending -> loading -> ready | failed
+        self.state = 'pending'
+        self.error: Optional[str] = None
+        self.queued = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "csvFilePaths": self.csv_file_paths,
+            "pin": self.pin,
+            "priority": self.priority,
+            "state": self.state,
+            "error": self.error,
+            "loadSeconds": round(self.finished - self.started, 3) if self.finished and self.started else None,
+        }
+
+
+def load_manifest(path: str) -> List[WarmupEntry]:
+    """Read a preload manifest.
+
+    The manifest is a JSON object with a `datasets` list, each item naming
+    `csv_file_path` (comma-separated files, globs or directories, as in
+    queries) plus optional `pin` (default false) and `priority` (higher loads
+    first, default 0).
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    entries = []
+    for item in manifest.get("datasets", []):
+        if not isinstance(item, dict) or not item.get("csv_file_path"):
+            raise ValueError(f"Manifest entries need a csv_file_path: {item!r}")
+        entries.append(WarmupEntry(
+            [path.strip() for path in item["csv_file_path"].split(',')],
+            pin=bool(item.get("pin", False)),
+            priority=int(item.get("priority", 0))
+        ))
+    return entries
+
+
+class Warmer:
+    """Loads datasets one at a time on a background thread, highest priority first.
+
+    `load(csv_file_paths, pin)` does the actual loading; queries keep being
+    served while it runs.
+    """
+
+    def __init__(self, load: Callable[[List[str], bool], Any]):
+        self.load = load
+        self.entries: List[WarmupEntry] = []
+        self.queue: List = []
+        self.order = itertools.count()
+        self.condition = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
+
+    def submit(self, entry: WarmupEntry) -> WarmupEntry:
+        """Queue a dataset; a pending request for the same files is updated instead"""
+        with self.condition:
+            for existing in self.entries:
+                if existing.csv_file_paths == entry.csv_file_paths and existing.state == 'pending':
+                    existing.pin = existing.pin or entry.pin
+                    if entry.priority > existing.priority:
+                        existing.priority = entry.priority
+                        heapq.heappush(self.queue, (-existing.priority, next(self.order), existing))
+                    return existing
+            # Keep only the latest request for the same files
+            self.entries = [e for e in self.entries
+                            if e.csv_file_paths != entry.csv_file_paths or e.state in ('pending', 'loading')]
+            self.entries.append(entry)
+            heapq.heappush(self.queue, (-entry.priority, next(self.order), entry))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return entry
+
+    def _next(self) -> WarmupEntry:
+        with self.condition:
+            while True:
+                while self.queue:
+                    _, _, entry = heapq.heappop(self.queue)
+                    # Entries re-queued at a higher priority leave a stale copy behind
+                    if entry.state == 'pending':
+                        entry.state = 'loading'
+                        entry.started = time.time()
+                        return entry
+                self.condition.wait()
+
+    def _run(self):
+        while True:
+            entry = self._next()
+            try:
+                self.load(entry.csv_file_paths, entry.pin)
+                entry.finished, entry.state = time.time(), 'ready'
+                logger.info(f"Warmed {','.join(entry.csv_file_paths)} in {entry.finished - entry.started:.2f}s")
+            except Exception as e:
+                entry.finished, entry.error, entry.state = time.time(), str(e), 'failed'
+                logger.warning(f"Could not warm {','.join(entry.csv_file_paths)}: {str(e)}")
+
+    def status(self) -> Dict[str, Any]:
+        with self.condition:
+            entries = list(self.entries)
+        counts = {state: 0 for state in ('pending', 'loading', 'ready', 'failed')}
+        for entry in entries:
+            counts[entry.state] += 1
+        return {
+            **counts,
+            "total": len(entries),
+            "done": counts['pending'] == 0 and counts['loading'] == 0,
+            "datasets": [entry.to_dict() for entry in entries],
+        }
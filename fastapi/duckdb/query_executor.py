@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when the query queue is full"""
+
+
+class QueryExecutor:
+    """Bounded thread pool that runs blocking DuckDB work off the event loop.
+
+    At most `max_workers` queries run at once; further submissions wait in the
+    pool's queue (up to `max_queued`, beyond which ExecutorBusyError is raised).
+    The time each job spends waiting for a worker is recorded so queueing can
+    be told apart from slow queries.
+    """
+
+    def __init__(self, max_workers: int, max_queued: Optional[int] = None, window: int = 1000):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='duckdb-query')
+        self.lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        # Recent queue waits and run times in seconds
+        self.waits = deque(maxlen=window)
+        self.run_times = deque(maxlen=window)
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking function on a worker thread and await its result"""
+        with self.lock:
+            if self.max_queued is not None and self.queued >= self.max_queued:
+                self.rejected += 1
+                raise ExecutorBusyError(f"Query queue is full ({self.queued} waiting)")
+            self.queued += 1
+            self.submitted += 1
+        enqueued = time.perf_counter()
+        # Set once the job has left the queue, either by starting or by being abandoned
+        dequeued = [False]
+
+        def job():
+            started = time.perf_counter()
+            with self.lock:
+                if dequeued[0]:
+                    return None
+                dequeued[0] = True
+                self.queued -= 1
+                self.active += 1
+                self.waits.append(started - enqueued)
+            ok = False
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self.lock:
+                    self.active -= 1
+                    self.run_times.append(time.perf_counter() - started)
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.pool, job)
+        except asyncio.CancelledError:
+            with self.lock:
+                if not dequeued[0]:
+                    dequeued[0] = True
+                    self.queued -= 1
+            raise
+
+    @staticmethod
+    def _percentiles(samples) -> Dict[str, Optional[float]]:
+        ordered = sorted(samples)
+        if not ordered:
+            return {"p50_ms": None, "p95_ms": None, "max_ms": None}
+        pick = lambda pct: round(ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))] * 1000, 3)
+        return {"p50_ms": pick(50), "p95_ms": pick(95), "max_ms": round(ordered[-1] * 1000, 3)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            waits, run_times = list(self.waits), list(self.run_times)
+            counters = {
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "active": self.active,
+                "queued": self.queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+        return {**counters, "queue_wait": self._percentiles(waits), "run_time": self._percentiles(run_times)}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,156 @@
+import glob
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from query_tracker import QueryHandle
+from statements import Params
+
+# Client-chosen job IDs; anything else (e.g. containing path separators) is rejected
+JOB_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def valid_job_id(job_id: str) -> bool:
+    return JOB_ID_PATTERN.fullmatch(job_id) is not None
+
+
+class Job:
+    """A query run in the background whose result is spooled to a Parquet file"""
+
+    def __init__(self, handle: QueryHandle, csv_file_paths: List[str], result_path: str, params: Params = None):
+        self.handle = handle
+        self.id = handle.id
+        self.csv_file_paths = csv_file_paths
+        self.params = params
+        self.result_path = result_path
+        self.columns: Optional[List[str]] = None
+        self.row_count: Optional[int] = None
+        self.result_bytes: Optional[int] = None
+        self.task = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.handle.state == 'finished' and self.row_count is not None
+
+    def to_dict(self, ttl: float) -> Dict[str, Any]:
+        status = self.handle.to_dict()
+        status.pop("queryId")
+        return {
+            "jobId": self.id,
+            **status,
+            "csvFilePaths": self.csv_file_paths,
+            "columns": self.columns,
+            "rowCount": self.row_count,
+            "resultBytes": self.result_bytes,
+            "expiresAt": self.handle.finished + ttl if self.handle.finished else None,
+        }
+
+
+def spool_batches(reader: pa.RecordBatchReader, path: str, row_group_size: int) -> int:
+    """Write a batch reader to a Parquet file, publishing it atomically; returns the row count"""
+    tmp_path = f"{path}.tmp"
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp_path, reader.schema, compression='zstd') as writer:
+            for batch in reader:
+                if batch.num_rows:
+                    writer.write_table(pa.Table.from_batches([batch]), row_group_size=row_group_size)
+                    rows += batch.num_rows
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+
+def read_rows(path: str, offset: int, limit: int) -> pa.Table:
+    """Read rows [offset, offset + limit) of a Parquet file, touching only the row groups needed"""
+    parquet_file = pq.ParquetFile(path)
+    tables = []
+    start = 0
+    for i in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(i).num_rows
+        end = start + group_rows
+        if end > offset and start < offset + limit:
+            tables.append(parquet_file.read_row_group(i))
+        start = end
+        if start >= offset + limit:
+            break
+    if not tables:
+        return parquet_file.schema_arrow.empty_table()
+    table = pa.concat_tables(tables)
+    first = max(0, offset - (start - table.num_rows))
+    return table.slice(first, limit)
+
+
+class JobManager:
+    """Background query jobs keyed by ID; finished jobs and their spool files expire after `ttl` seconds"""
+
+    def __init__(self, spool_dir: str, ttl: float = 3600.0):
+        self.spool_dir = spool_dir
+        self.ttl = ttl
+        self.jobs: Dict[str, Job] = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.spool_dir, exist_ok=True)
+        # Jobs do not survive a restart, so results left by a previous run are orphans
+        for orphan in glob.glob(os.path.join(self.spool_dir, '*.parquet*')):
+            try:
+                os.remove(orphan)
+            except OSError:
+                pass
+
+    def add(self, handle: QueryHandle, csv_file_paths: List[str], params: Params = None) -> Job:
+        """Register a job; raises ValueError for IDs that do not match JOB_ID_PATTERN"""
+        if not valid_job_id(handle.id):
+            raise ValueError(f"Invalid job ID: {handle.id}")
+        # Spool files are named by the server, never after the client-chosen ID
+        job = Job(handle, csv_file_paths, os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.parquet"), params)
+        with self.lock:
+            existing = self.jobs.get(job.id)
+            if existing is not None:
+                self._remove_result(existing)
+            self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Job:
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Unknown or expired job: {job_id}")
+        return job
+
+    def list(self) -> List[Job]:
+        with self.lock:
+            return list(self.jobs.values())
+
+    @staticmethod
+    def _remove_result(job: Job):
+        for path in (job.result_path, f"{job.result_path}.tmp"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def remove(self, job_id: str):
+        """Cancel a job if it is still running and delete its result"""
+        with self.lock:
+            job = self.jobs.pop(job_id, None)
+        if job is None:
+            raise KeyError(f"Unknown or expired job: {job_id}")
+        job.handle.cancel()
+        self._remove_result(job)
+
+    def expire(self):
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            expired = [job for job in self.jobs.values() if job.handle.done and job.handle.finished < cutoff]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            self._remove_result(job)
@@ -0,0 +1,139 @@
+import logging
+import math
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import duckdb
+
+from json_encoding import dumps
+
+logger = logging.getLogger("fastapi-mcp-server")
+
+# Upper bounds (seconds) of the query duration histogram buckets
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def explain(cursor: duckdb.DuckDBPyConnection, query: str, params: Any = None, analyze: bool = False) -> str:
+    """DuckDB's plan for a query as text; with `analyze` the query is run again and timed per operator"""
+    rows = cursor.execute(f"EXPLAIN {'ANALYZE ' if analyze else ''}{query}", params).fetchall()
+    return '\n'.join(row[-1] for row in rows)
+
+
+def process_rss() -> Optional[int]:
+    """Resident memory of this process in bytes, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def server_timing(phases: Dict[str, float]) -> str:
+    """Phases as a Server-Timing header value (durations in milliseconds)"""
+    return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in list(phases.items()))
+
+
+class SlowQueryLog:
+    """Queries slower than `threshold` seconds, kept in memory and appended as JSON lines to `path`"""
+
+    def __init__(self, threshold: Optional[float], path: Optional[str] = None, keep: int = 100):
+        self.threshold = threshold
+        self.path = path
+        self.entries = deque(maxlen=keep)
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def is_slow(self, seconds: float) -> bool:
+        return self.threshold is not None and seconds >= self.threshold
+
+    def record(self, entry: Dict[str, Any]):
+        line = dumps(entry) + b'\n'
+        with self.lock:
+            self.entries.append(entry)
+            self.count += 1
+            if self.path:
+                try:
+                    with open(self.path, 'ab') as f:
+                        f.write(line)
+                except OSError as e:
+                    logger.error(f"Could not write slow query log {self.path}: {str(e)}")
+        logger.warning(f"Slow query {entry['queryId']} took {entry['seconds']:.2f}s ({entry['state']}): "
+                       f"{' '.join(entry['query'].split())[:200]}")
+
+    def worst(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self.lock:
+            entries = list(self.entries)
+        return sorted(entries, key=lambda entry: entry['seconds'], reverse=True)[:limit]
+
+
+class QueryMetrics:
+    """Counters and a duration histogram over finished queries"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.states: Dict[str, int] = {}
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.phase_seconds: Dict[str, float] = {}
+
+    def observe(self, state: str, seconds: float, phases: Dict[str, float]):
+        with self.lock:
+            self.states[state] = self.states.get(state, 0) + 1
+            self.count += 1
+            self.total_seconds += seconds
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    self.buckets[i] += 1
+            for name, phase in list(phases.items()):
+                self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + phase
+
+    def samples(self) -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+        with self.lock:
+            histogram = [({"le": f"{bound:g}"}, count) for bound, count in zip(DURATION_BUCKETS, self.buckets)]
+            histogram.append(({"le": "+Inf"}, self.count))
+            return [
+                ("duckdb_queries_total", "counter", "Queries by final state",
+                 [({"state": state}, count) for state, count in sorted(self.states.items())]),
+                ("duckdb_query_duration_seconds", "histogram", "Query duration from registration to completion",
+                 [({"__suffix": "_bucket", **labels}, value) for labels, value in histogram]
+                 + [({"__suffix": "_sum"}, self.total_seconds), ({"__suffix": "_count"}, self.count)]),
+                ("duckdb_query_phase_seconds_total", "counter", "Time spent in each query phase",
+                 [({"phase": name}, seconds) for name, seconds in sorted(self.phase_seconds.items())]),
+            ]
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+               for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _value(value: Any) -> str:
+    if not isinstance(value, float):
+        return str(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    # repr keeps every digit; :g would round large totals to 6 significant digits
+    return repr(value)
+
+
+def render_prometheus(metrics: Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], Any]]]]) -> str:
+    """Prometheus text exposition of (name, type, help, [(labels, value)]) metrics; None values are skipped"""
+    lines = []
+    for name, metric_type, help_text, samples in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            labels = dict(labels)
+            suffix = labels.pop("__suffix", "")
+            lines.append(f"{name}{suffix}{_labels(labels)} {_value(value)}")
+    return '\n'.join(lines) + '\n'
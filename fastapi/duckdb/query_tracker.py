@@ -0,0 +1,216 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+import duckdb
+
+
+class QueryCancelledError(RuntimeError):
+    """Raised in place of DuckDB's interrupt error when a tracked query is cancelled"""
+
+    def __init__(self, query_id: str, reason: str):
+        super().__init__(f"Query {query_id} was cancelled: {reason}")
+        self.query_id = query_id
+        self.reason = reason
+
+
+class QueryTimeoutError(QueryCancelledError):
+    def __init__(self, query_id: str, timeout: float):
+        RuntimeError.__init__(self, f"Query {query_id} timed out after {timeout:g}s")
+        self.query_id = query_id
+        self.reason = 'timeout'
+
+
+class QueryHandle:
+    """A running query that can be cancelled and polled for progress from any thread.
+
+    The worker attaches the cursor it executes on; cancelling interrupts that
+    cursor, or makes `attach` fail if execution has not started yet. A timeout
+    (counted from registration, so it includes time spent queued) cancels the
+    query with reason 'timeout'. Time spent in each phase (queue, load,
+    execute, ...) is accumulated in `phases`; `on_done(handle)` is called once
+    the query has finished, failed or been cancelled.
+    """
+
+    def __init__(self, query_id: str, query: str, timeout: Optional[float],
+                 on_done: Optional[Callable[['QueryHandle'], None]] = None):
+        self.id = query_id
+        self.query = query
+        self.timeout = timeout
+        self.on_done = on_done
+        # What the query ran against, for the slow-query log
+        self.csv_file_paths: List[str] = []
+        self.params: Any = None
+        self.phases: Dict[str, float] = {}
+        self.state = 'queued'
+        self.reason: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.cursor: Optional[duckdb.DuckDBPyConnection] = None
+        self.lock = threading.Lock()
+        self.timer: Optional[threading.Timer] = None
+        if timeout:
+            self.timer = threading.Timer(timeout, self.cancel, args=('timeout',))
+            self.timer.daemon = True
+            self.timer.start()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.state == 'cancelled'
+
+    @property
+    def done(self) -> bool:
+        return self.state in ('finished', 'failed', 'cancelled')
+
+    def cancellation(self) -> QueryCancelledError:
+        if self.reason == 'timeout':
+            return QueryTimeoutError(self.id, self.timeout)
+        return QueryCancelledError(self.id, self.reason or 'cancelled')
+
+    def attach(self, cursor: duckdb.DuckDBPyConnection):
+        """Register the cursor the query executes on (progress reporting must be enabled on it)"""
+        with self.lock:
+            if self.cancelled:
+                raise self.cancellation()
+            if self.cursor is None:
+                self.started = time.time()
+            self.cursor = cursor
+            self.state = 'running'
+
+    def detach(self):
+        """Stop interrupting the cursor, e.g. before it is reused for another query"""
+        with self.lock:
+            self.cursor = None
+
+    @contextmanager
+    def running(self, cursor: duckdb.DuckDBPyConnection, detach: bool = False):
+        """Attach a cursor and report interrupts caused by cancellation as QueryCancelledError"""
+        self.attach(cursor)
+        try:
+            yield cursor
+        except duckdb.InterruptException:
+            if self.cancelled:
+                raise self.cancellation() from None
+            raise
+        finally:
+            if detach:
+                self.detach()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Add the time spent in the block to the named phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def _done(self):
+        if self.on_done is not None:
+            try:
+                self.on_done(self)
+            except Exception:
+                pass
+
+    def cancel(self, reason: str = 'cancelled') -> bool:
+        """Interrupt the query; returns False if it had already finished"""
+        with self.lock:
+            if self.done:
+                return False
+            self.state = 'cancelled'
+            self.reason = reason
+            self.finished = time.time()
+            # Interrupt under the lock so a detached (pooled) cursor is never interrupted
+            if self.cursor is not None:
+                try:
+                    self.cursor.interrupt()
+                except Exception:
+                    pass
+        self._done()
+        return True
+
+    def finish(self, error: Optional[BaseException] = None):
+        if self.timer is not None:
+            self.timer.cancel()
+        with self.lock:
+            self.cursor = None
+            if self.done:
+                return
+            self.state = 'failed' if error is not None else 'finished'
+            self.error = str(error) if error is not None else None
+            self.finished = time.time()
+        self._done()
+
+    def progress(self) -> Optional[float]:
+        """Percentage complete reported by DuckDB, or None if unknown"""
+        cursor = self.cursor
+        if cursor is None or self.state != 'running':
+            return None
+        try:
+            value = cursor.query_progress()
+        except Exception:
+            return None
+        return round(value, 1) if value >= 0 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished or time.time()
+        return {
+            "queryId": self.id,
+            "state": self.state,
+            "reason": self.reason,
+            "error": self.error,
+            "progress": 100.0 if self.state == 'finished' else self.progress(),
+            "elapsedSeconds": round(end - self.created, 3),
+            "phases": {name: round(seconds, 4) for name, seconds in list(self.phases.items())},
+            "timeout": self.timeout,
+            "query": self.query,
+        }
+
+
+class QueryRegistry:
+    """Tracked queries keyed by ID; finished ones stay visible for `retention` seconds"""
+
+    def __init__(self, default_timeout: Optional[float] = None, retention: float = 60.0,
+                 on_done: Optional[Callable[[QueryHandle], None]] = None):
+        self.default_timeout = default_timeout
+        self.retention = retention
+        self.on_done = on_done
+        self.queries: Dict[str, QueryHandle] = {}
+        self.lock = threading.Lock()
+
+    def open(self, query: str, query_id: Optional[str] = None, timeout: Optional[float] = None,
+             csv_file_paths: Optional[List[str]] = None, params: Any = None) -> QueryHandle:
+        query_id = query_id or uuid.uuid4().hex
+        with self.lock:
+            existing = self.queries.get(query_id)
+            if existing is not None and not existing.done:
+                raise ValueError(f"Query {query_id} is already running")
+            handle = QueryHandle(query_id, query, timeout if timeout is not None else self.default_timeout,
+                                 self.on_done)
+            handle.csv_file_paths, handle.params = list(csv_file_paths or []), params
+            self.queries[query_id] = handle
+        return handle
+
+    def get(self, query_id: str) -> QueryHandle:
+        with self.lock:
+            handle = self.queries.get(query_id)
+        if handle is None:
+            raise KeyError(f"Unknown query: {query_id}")
+        return handle
+
+    def cancel(self, query_id: str, reason: str = 'cancelled') -> bool:
+        return self.get(query_id).cancel(reason)
+
+    def active(self) -> List[QueryHandle]:
+        with self.lock:
+            return [handle for handle in self.queries.values() if not handle.done]
+
+    def expire(self):
+        cutoff = time.time() - self.retention
+        with self.lock:
+            for query_id in [qid for qid, h in self.queries.items() if h.done and h.finished < cutoff]:
+                del self.queries[query_id]
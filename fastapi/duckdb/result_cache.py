@@ -0,0 +1,149 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Quoted strings/identifiers (including $tag$ dollar quoting), comments, or runs of whitespace
+_SQL_TOKENS = re.compile(
+    r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\$(?P<tag>[A-Za-z_]\w*|)\$.*?\$(?P=tag)\$)|(--[^\n]*|/\*.*?\*/)|(\s+)",
+    re.S
+)
+
+# Statements whose results depend only on the data
+_CACHEABLE = re.compile(r"^\(*\s*(select|with|from|values|table|pivot|unpivot|summarize)\b")
+# Functions that make a result differ between runs over the same data
+_VOLATILE = re.compile(
+    r"\b(random|gen_random_uuid|uuid|uuidv4|uuidv7|setseed|nextval|currval|now|"
+    r"current_date|current_time|current_timestamp|get_current_time|get_current_timestamp|"
+    r"today|localtime|localtimestamp|transaction_timestamp)\b"
+)
+# Table functions and replacement scans that read files the cache does not track
+_EXTERNAL = re.compile(
+    r"\b(read_\w+|parquet_scan|parquet_metadata|parquet_schema|parquet_file_metadata|"
+    r"sniff_csv|glob|iceberg_scan|delta_scan)\s*\("
+)
+_FILE_SCAN = re.compile(r"""\b(from|join)\s*('|"[^"]*[./\\][^"]*")""")
+
+
+def _normalize_unquoted(text: str) -> str:
+    text = re.sub(r'\s+', ' ', text.lower())
+    return re.sub(r' ?([,()=<>+*/%|-]) ?', r'\1', text)
+
+
+def normalize_sql(sql: str) -> str:
+    """Lowercase unquoted text, drop comments and insignificant whitespace and trailing semicolons"""
+    parts = []
+    unquoted = []
+    pos = 0
+    for match in _SQL_TOKENS.finditer(sql):
+        unquoted.append(sql[pos:match.start()])
+        quoted = match.group(1)
+        if quoted is not None:
+            parts.append(_normalize_unquoted(''.join(unquoted)))
+            parts.append(quoted)
+            unquoted = []
+        else:
+            unquoted.append(' ')
+        pos = match.end()
+    unquoted.append(sql[pos:])
+    parts.append(_normalize_unquoted(''.join(unquoted)))
+    return ''.join(parts).strip().rstrip(';').strip()
+
+
+def is_cacheable(normalized_sql: str) -> bool:
+    """Whether the result depends only on the loaded data: read-only, not volatile and not reading other files"""
+    unquoted = _SQL_TOKENS.sub(' ', normalized_sql)
+    return (bool(_CACHEABLE.match(normalized_sql)) and not _VOLATILE.search(unquoted)
+            and not _EXTERNAL.search(unquoted) and not _FILE_SCAN.search(normalized_sql))
+
+
+class ResultCache:
+    """Byte-budgeted LRU cache of encoded query results.
+
+    Keys combine a dataset fingerprint, the normalised SQL and any parameters.
+    Each entry remembers the (mtime, size) of the files it was computed from;
+    `invalidate` drops entries for files whose stats have since changed.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes
+        self.entries: 'OrderedDict[str, Tuple[bytes, Dict[str, Tuple[float, int]]]]' = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(dataset_key: str, sql: str, params: Any = None) -> Optional[str]:
+        """Cache key for a query, or None if its result must not be cached"""
+        normalized = normalize_sql(sql)
+        if not is_cacheable(normalized):
+            return None
+        payload = json.dumps([dataset_key, normalized, params], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: bytes, files: Dict[str, Tuple[float, int]]):
+        if len(value) > self.max_entry_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous[0])
+            self.entries[key] = (value, dict(files))
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def record_bypass(self):
+        with self.lock:
+            self.bypasses += 1
+
+    def invalidate(self, files: Dict[str, Tuple[float, int]]):
+        """Drop entries computed from any of these files with different stats"""
+        with self.lock:
+            stale = [
+                key for key, (_, entry_files) in self.entries.items()
+                if any(path in entry_files and entry_files[path] != stat for path, stat in files.items())
+            ]
+            for key in stale:
+                value, _ = self.entries.pop(key)
+                self.bytes -= len(value)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "bypasses": self.bypasses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
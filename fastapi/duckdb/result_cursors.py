@@ -0,0 +1,122 @@
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import duckdb
+import pyarrow as pa
+
+from result_shaping import ShapeOptions
+
+
+def limit_batches(batches: Iterable[pa.RecordBatch], limit: int) -> Iterator[pa.RecordBatch]:
+    """The first `limit` rows of a stream of batches, reading no further"""
+    for batch in batches:
+        if limit <= 0:
+            return
+        if batch.num_rows > limit:
+            batch = batch.slice(0, limit)
+        limit -= batch.num_rows
+        yield batch
+
+
+class ResultCursor:
+    """A server-held query result that is read one Arrow record batch at a time.
+
+    `on_close` is called once when the cursor is closed, e.g. to release the dataset it reads.
+    `shape` holds the size limits of a tool response whose omitted rows the cursor serves.
+    """
+
+    def __init__(self, cursor: Optional[duckdb.DuckDBPyConnection], reader: pa.RecordBatchReader, page_size: int,
+                 on_close: Optional[Callable[[], None]] = None, shape: Optional[ShapeOptions] = None):
+        self.id = uuid.uuid4().hex
+        self.cursor = cursor
+        self.on_close = on_close
+        self.shape = shape
+        self.reader = reader
+        self.page_size = page_size
+        self.columns: List[str] = reader.schema.names
+        self.rows_served = 0
+        self.last_access = time.time()
+        self.lock = threading.Lock()
+        self._returned: Optional[pa.RecordBatch] = None
+        self._next = self._read()
+
+    def _read(self) -> Optional[pa.RecordBatch]:
+        try:
+            return self.reader.read_next_batch()
+        except StopIteration:
+            return None
+
+    @property
+    def exhausted(self) -> bool:
+        return self._next is None and self._returned is None
+
+    def next_page(self) -> Optional[pa.RecordBatch]:
+        """Return the next page, reading one batch ahead so callers know if more remain"""
+        with self.lock:
+            self.last_access = time.time()
+            if self._returned is not None:
+                page, self._returned = self._returned, None
+            else:
+                page, self._next = self._next, (self._read() if self._next is not None else None)
+            if page is not None:
+                self.rows_served += page.num_rows
+            return page
+
+    def push_back(self, rows: pa.RecordBatch):
+        """Hand back the unserved end of the last page; it becomes the next page"""
+        with self.lock:
+            if rows.num_rows:
+                self._returned = rows
+                self.rows_served -= rows.num_rows
+
+    def close(self):
+        # Wait for a page being read, then leave nothing to read from the closed reader
+        with self.lock:
+            self._next = self._returned = None
+            # Cursors over results already held in memory have no DuckDB cursor
+            if self.cursor is not None:
+                try:
+                    self.cursor.close()
+                except Exception:
+                    pass
+            on_close, self.on_close = self.on_close, None
+        if on_close is not None:
+            on_close()
+
+
+class CursorRegistry:
+    """Open result cursors keyed by ID, expired after `ttl` seconds without access"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.cursors: Dict[str, ResultCursor] = {}
+        self.lock = threading.Lock()
+
+    def add(self, cursor: ResultCursor) -> str:
+        with self.lock:
+            self.cursors[cursor.id] = cursor
+        return cursor.id
+
+    def get(self, cursor_id: str) -> ResultCursor:
+        with self.lock:
+            cursor = self.cursors.get(cursor_id)
+        if cursor is None:
+            raise KeyError(f"Unknown or expired cursor: {cursor_id}")
+        return cursor
+
+    def close(self, cursor_id: str):
+        with self.lock:
+            cursor = self.cursors.pop(cursor_id, None)
+        if cursor is not None:
+            cursor.close()
+
+    def expire(self):
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            # A cursor whose lock is held is serving a page right now, so is not idle
+            expired = [cid for cid, c in self.cursors.items() if c.last_access < cutoff and not c.lock.locked()]
+            cursors = [self.cursors.pop(cid) for cid in expired]
+        for cursor in cursors:
+            cursor.close()
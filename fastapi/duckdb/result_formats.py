@@ -0,0 +1,122 @@
+import json
+from typing import Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from json_encoding import dumps
+
+# Response format name -> media type
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'csv': 'text/csv',
+}
+
+# Accepted media types (including common aliases) -> response format name
+ACCEPT_FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/vnd.apache.arrow.stream': 'arrow',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+    'text/csv': 'csv',
+}
+
+# Formats that are always streamed from the Arrow reader
+BINARY_FORMATS = ('arrow', 'parquet', 'csv')
+
+FILE_EXTENSIONS = {'arrow': 'arrows', 'parquet': 'parquet', 'csv': 'csv'}
+
+
+def negotiate_format(accept: Optional[str]) -> Optional[str]:
+    """Return the first supported format named in an Accept header, or None"""
+    if not accept:
+        return None
+    for media_range in accept.split(','):
+        media_type = media_range.split(';')[0].strip().lower()
+        if media_type in ACCEPT_FORMATS:
+            return ACCEPT_FORMATS[media_type]
+    return None
+
+
+class ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def encode_json_batches(reader: pa.RecordBatchReader, fmt: str) -> Iterator[bytes]:
+    """Encode batches as NDJSON lines or as one chunked JSON response document"""
+    row_count = 0
+    if fmt == 'json':
+        columns = json.dumps(reader.schema.names)
+        yield f'{{"success": true, "data": {{"columns": {columns}, "rows": ['.encode()
+    for batch in reader:
+        rows = batch.to_pylist()
+        if not rows:
+            continue
+        if fmt == 'ndjson':
+            yield b'\n'.join(dumps(row) for row in rows) + b'\n'
+        else:
+            prefix = b', ' if row_count else b''
+            yield prefix + b', '.join(dumps(row) for row in rows)
+        row_count += len(rows)
+    if fmt == 'json':
+        yield f'], "rowCount": {row_count}}}}}'.encode()
+
+
+def encode_arrow_batches(reader: pa.RecordBatchReader, fmt: str) -> Iterator[bytes]:
+    """Encode batches as an Arrow IPC stream, Parquet or CSV without leaving Arrow"""
+    sink = ChunkSink()
+    schema = reader.schema
+    if fmt == 'arrow':
+        writer = pa.ipc.new_stream(sink, schema)
+    elif fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema)
+    elif fmt == 'csv':
+        writer = pa_csv.CSVWriter(sink, schema)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+    for batch in reader:
+        if batch.num_rows == 0:
+            continue
+        if fmt == 'parquet':
+            writer.write_batch(batch)
+        else:
+            writer.write(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    # Only a complete result gets an end-of-stream marker or Parquet footer; on error the
+    # exception propagates and the output is left visibly truncated
+    writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def encode_batches(reader: pa.RecordBatchReader, fmt: str) -> Iterator[bytes]:
+    if fmt in ('json', 'ndjson'):
+        return encode_json_batches(reader, fmt)
+    return encode_arrow_batches(reader, fmt)
@@ -0,0 +1,162 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+import pyarrow as pa
+
+from json_encoding import dumps
+
+SAMPLES = ('head', 'tail', 'head_tail')
+LAYOUTS = ('columnar', 'rows')
+
+
+def encode_compact(document: Dict[str, Any]) -> bytes:
+    return dumps(document)
+
+
+class ShapeOptions:
+    """How much of a result a tool response may contain and how it is laid out"""
+
+    def __init__(self, max_rows: int, max_bytes: int, sample: str = 'head', layout: str = 'columnar'):
+        if sample not in SAMPLES:
+            raise ValueError(f"sample must be one of {', '.join(SAMPLES)}")
+        if layout not in LAYOUTS:
+            raise ValueError(f"layout must be one of {', '.join(LAYOUTS)}")
+        if max_rows < 0 or max_bytes <= 0:
+            raise ValueError("max_rows must be >= 0 and max_bytes > 0")
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.sample = sample
+        self.layout = layout
+
+    def to_key(self) -> List[Any]:
+        return [self.max_rows, self.max_bytes, self.sample, self.layout]
+
+
+def layout_rows(table: pa.Table, layout: str) -> Any:
+    if layout == 'rows':
+        return table.to_pylist()
+    return {name: column.to_pylist() for name, column in zip(table.column_names, table.columns)}
+
+
+def _has_min_max(data_type: pa.DataType) -> bool:
+    return not pa.types.is_nested(data_type)
+
+
+def _is_numeric(data_type: pa.DataType) -> bool:
+    return pa.types.is_integer(data_type) or pa.types.is_floating(data_type) or pa.types.is_decimal(data_type)
+
+
+def summary_query(source: str, schema: pa.Schema) -> str:
+    """One aggregate query over the rows of `source` (a query or relation) giving the row
+    count and, per column, the null count, approximate distinct count, min/max and mean"""
+    aliases = [f"c{i}" for i in range(len(schema))]
+    aggregates = ["count(*)"]
+    for alias, field in zip(aliases, schema):
+        aggregates += [f"count({alias})", f"approx_count_distinct({alias})"]
+        if _has_min_max(field.type):
+            aggregates += [f"min({alias})", f"max({alias})"]
+        if _is_numeric(field.type):
+            aggregates.append(f"avg({alias})")
+    return f"SELECT {', '.join(aggregates)} FROM ({source}) AS shaped({', '.join(aliases)})"
+
+
+def read_summary(row: Tuple[Any, ...], schema: pa.Schema) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+    """Row count and per-column summaries from the row returned by summary_query"""
+    values = iter(row)
+    total = next(values)
+    summaries = {}
+    for field in schema:
+        non_null = next(values)
+        # The estimate can exceed the number of values on small results
+        summary: Dict[str, Any] = {"type": str(field.type), "nulls": total - non_null,
+                                   "distinct": min(next(values), non_null)}
+        if _has_min_max(field.type):
+            summary["min"], summary["max"] = next(values), next(values)
+        if _is_numeric(field.type):
+            summary["mean"] = next(values)
+        summaries[field.name] = summary
+    return total, summaries
+
+
+def split_sample(total: int, rows: int, sample: str):
+    """Number of leading and trailing rows to return for a sample of `rows` rows"""
+    rows = min(rows, total)
+    if sample == 'head':
+        return rows, 0
+    if sample == 'tail':
+        return 0, rows
+    head = (rows + 1) // 2
+    return head, rows - head
+
+
+def shape_result(head: pa.Table, tail: pa.Table, total: int, options: ShapeOptions, base: Dict[str, Any],
+                 summarize: Callable[[], Dict[str, Dict[str, Any]]]) -> Tuple[Dict[str, Any], int, int]:
+    """Build a response document of `total` rows that fits the options.
+
+    `head` and `tail` hold at least the first and last rows the sample can
+    return (a complete result may be passed as both). `summarize()` gives
+    per-column summaries of the whole result and is only called if it is
+    truncated. Returns (document, head rows, tail rows) with the number of
+    leading and trailing rows the document contains; the rows between them
+    are left out and can be offered through a cursor. If even the summaries
+    do not fit in max_bytes, their min/max are dropped ("summaryTrimmed") and
+    then the summaries themselves ("summaryOmitted").
+    """
+    document = {**base, "rowCount": total, "columns": head.column_names,
+                "types": [str(t) for t in head.schema.types]}
+
+    rows = min(total, options.max_rows)
+    head_rows = tail_rows = 0
+    while True:
+        head_rows, tail_rows = split_sample(total, rows, options.sample)
+        truncated = head_rows + tail_rows < total
+        document["truncated"] = truncated
+        document["returnedRows"] = head_rows + tail_rows
+        document["data"] = layout_rows(head.slice(0, head_rows), options.layout)
+        if tail_rows:
+            tail_data = layout_rows(tail.slice(tail.num_rows - tail_rows, tail_rows), options.layout)
+            if options.sample == 'tail':
+                document["data"] = tail_data
+            else:
+                document["tail"] = tail_data
+        else:
+            document.pop("tail", None)
+        if truncated and "sample" not in document:
+            document["sample"] = options.sample
+            document["summary"] = summarize()
+        if len(encode_compact(document)) <= options.max_bytes:
+            break
+        if rows == 0:
+            _fit_summary(document, options.max_bytes)
+            break
+        # Too large: halve the sample until it fits
+        rows //= 2
+    return document, head_rows, tail_rows
+
+
+def _fit_summary(document: Dict[str, Any], max_bytes: int):
+    """Shrink the summaries of a document that is over max_bytes without any rows"""
+    if "summary" not in document:
+        return
+    document["summary"] = {
+        name: {key: value for key, value in summary.items() if key not in ('min', 'max')}
+        for name, summary in document["summary"].items()
+    }
+    document["summaryTrimmed"] = True
+    if len(encode_compact(document)) > max_bytes:
+        del document["summary"], document["summaryTrimmed"]
+        document["summaryOmitted"] = True
+
+
+def shape_page(page: pa.RecordBatch, options: ShapeOptions, base: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """Lay out a cursor page within options.max_bytes.
+
+    Returns (document, rows), where `rows` leading rows of the page were used;
+    at least one row is always returned so that paging makes progress.
+    """
+    rows = page.num_rows
+    while True:
+        document = {**base, "columns": page.schema.names, "returnedRows": rows,
+                    "data": layout_rows(page.slice(0, rows), options.layout)}
+        if rows <= 1 or len(encode_compact(document)) <= options.max_bytes:
+            return document, rows
+        rows //= 2
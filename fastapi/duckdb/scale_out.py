@@ -0,0 +1,347 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from cache_manager import parse_bytes, physical_memory
+from preload import load_manifest
+
+logger = logging.getLogger("fastapi-mcp-server")
+
+# Headers that describe one connection rather than the message, so are not forwarded
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'te', 'trailer', 'upgrade', 'host', 'content-length'}
+
+
+class HashRing:
+    """Consistent hashing of dataset keys onto nodes.
+
+    Each node owns `replicas` points on the ring, so adding or removing a node
+    only moves the keys next to its points.
+    """
+
+    def __init__(self, nodes: List[str], replicas: int = 64):
+        self.nodes = list(nodes)
+        self.points = sorted((self._hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self.hashes = [point for point, _ in self.points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(hashlib.sha1(value.encode()).hexdigest()[:16], 16)
+
+    def node_for(self, key: str) -> str:
+        index = bisect.bisect(self.hashes, self._hash(key)) % len(self.points)
+        return self.points[index][1]
+
+
+def route_key(csv_file_path: str) -> str:
+    """Dataset identity used for routing: the absolute paths of the combination, in order"""
+    return ','.join(os.path.abspath(path.strip()) for path in csv_file_path.split(','))
+
+
+def worker_environment(shares: int) -> Dict[str, str]:
+    """Thread and memory settings giving each of `shares` processes an equal part of the global budget.
+
+    DUCKDB_THREADS, DUCKDB_MEMORY_LIMIT and CACHE_MEMORY_BUDGET are read as
+    totals for the machine (with the usual defaults).
+    """
+    total_memory = physical_memory()
+    threads = int(os.getenv('DUCKDB_THREADS', str(os.cpu_count() or 4)))
+    memory_limit = os.getenv('DUCKDB_MEMORY_LIMIT')
+    memory_limit = parse_bytes(memory_limit) if memory_limit else (total_memory * 8 // 10 if total_memory else None)
+    budget = os.getenv('CACHE_MEMORY_BUDGET')
+    budget = parse_bytes(budget) if budget else (total_memory // 2 if total_memory else None)
+
+    env = {'DUCKDB_THREADS': str(max(1, threads // shares))}
+    if memory_limit:
+        env['DUCKDB_MEMORY_LIMIT'] = str(memory_limit // shares)
+    if budget:
+        env['CACHE_MEMORY_BUDGET'] = str(budget // shares)
+    if 'LOAD_WORKERS' not in os.environ:
+        env['LOAD_WORKERS'] = str(max(1, min(4, threads // shares)))
+    return env
+
+
+def merge_metrics(texts: List[Tuple[str, str]]) -> str:
+    """Combine (worker, Prometheus text) pairs into one exposition, labelling each sample with its worker"""
+    families: Dict[str, Tuple[List[str], List[str]]] = {}
+    for worker, text in texts:
+        family = None
+        for line in text.splitlines():
+            if line.startswith(('# HELP ', '# TYPE ')):
+                family = line.split()[2]
+                header, _ = families.setdefault(family, ([], []))
+                if line not in header:
+                    header.append(line)
+            elif line and family is not None:
+                name, _, value = line.partition(' ')
+                label = f'worker="{worker}"'
+                name = name.replace('{', '{' + label + ',', 1) if '{' in name else f'{name}{{{label}}}'
+                families[family][1].append(f"{name} {value}")
+    return ''.join('\n'.join(header + samples) + '\n' for header, samples in families.values())
+
+
+class WorkerSupervisor:
+    """Runs `count` single-process HTTP workers of `script` on consecutive local ports, restarting any that exit"""
+
+    def __init__(self, script: str, count: int, base_port: int, env: Dict[str, str]):
+        self.script = script
+        self.count = count
+        self.base_port = base_port
+        self.env = env
+        self.processes: List[Optional[subprocess.Popen]] = [None] * count
+        self.restarts = 0
+
+    @property
+    def urls(self) -> List[str]:
+        return [f"http://127.0.0.1:{self.base_port + i}" for i in range(self.count)]
+
+    def spawn(self, index: int):
+        env = {
+            **os.environ, **self.env,
+            'SERVER_MODE': 'http', 'HTTP_WORKERS': '1', 'HOST': '127.0.0.1', 'PORT': str(self.base_port + index),
+        }
+        # The manifest is routed to the owning workers instead of being loaded by all of them
+        env.pop('PRELOAD_MANIFEST', None)
+        # Workers must never write to stdout, which may be the MCP stdio channel
+        self.processes[index] = subprocess.Popen(
+            [sys.executable, self.script], env=env, stdin=subprocess.DEVNULL, stdout=sys.stderr
+        )
+
+    def start(self):
+        for index in range(self.count):
+            self.spawn(index)
+
+    def check(self):
+        for index, process in enumerate(self.processes):
+            if process is not None and process.poll() is not None:
+                logger.warning(f"HTTP worker {index} exited with {process.returncode}, restarting")
+                self.restarts += 1
+                self.spawn(index)
+
+    def stop(self):
+        for process in self.processes:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+class Router:
+    """HTTP front for a set of workers.
+
+    Requests naming a dataset go to the worker that owns it on a hash ring,
+    so each dataset is loaded by one worker and repeated queries find it warm.
+    Requests for a query, job or cursor ID are tried on each worker until one
+    knows the ID; registrations are sent to all workers and listings merged.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.urls = urls
+        self.ring = HashRing(urls)
+        self.client = httpx.AsyncClient(timeout=None)
+        # Statement name -> default csv_file_path, to route statements run without one
+        self.statements: Dict[str, Optional[str]] = {}
+        self.app = FastAPI()
+        self.setup_routes()
+
+    def worker_for(self, csv_file_path: Optional[str]) -> str:
+        return self.ring.node_for(route_key(csv_file_path)) if csv_file_path else self.urls[0]
+
+    async def send(self, url: str, request: Request, body: bytes) -> httpx.Response:
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+        upstream = self.client.build_request(
+            request.method, url + request.url.path, params=request.query_params, headers=headers, content=body
+        )
+        return await self.client.send(upstream, stream=True)
+
+    @staticmethod
+    def relay(upstream: httpx.Response) -> StreamingResponse:
+        headers = {k: v for k, v in upstream.headers.items() if k.lower() not in HOP_HEADERS}
+        return StreamingResponse(
+            upstream.aiter_raw(), status_code=upstream.status_code, headers=headers,
+            background=BackgroundTask(upstream.aclose)
+        )
+
+    async def forward(self, url: str, request: Request, body: bytes) -> Response:
+        try:
+            return self.relay(await self.send(url, request, body))
+        except httpx.TransportError as e:
+            return JSONResponse({"detail": f"Worker {url} unavailable: {str(e)}"}, status_code=503)
+
+    async def find(self, request: Request, body: bytes) -> Response:
+        """Forward to the first worker that does not answer 404"""
+        for url in self.urls:
+            try:
+                upstream = await self.send(url, request, body)
+            except httpx.TransportError:
+                continue
+            if upstream.status_code != 404 or url == self.urls[-1]:
+                return self.relay(upstream)
+            await upstream.aclose()
+        return JSONResponse({"detail": "No worker knows this ID"}, status_code=404)
+
+    async def gather(self, request: Request, body: bytes) -> List[Optional[httpx.Response]]:
+        """Send a request to every worker; returns each response, or None if the worker is unavailable"""
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+
+        async def call(url: str):
+            try:
+                return await self.client.request(
+                    request.method, url + request.url.path, params=request.query_params,
+                    headers=headers, content=body
+                )
+            except httpx.TransportError:
+                return None
+
+        return list(await asyncio.gather(*(call(url) for url in self.urls)))
+
+    async def gather_json(self, request: Request, body: bytes) -> List[Optional[Dict[str, Any]]]:
+        results = []
+        for response in await self.gather(request, body):
+            try:
+                results.append(response.json() if response is not None else None)
+            except ValueError:
+                results.append(None)
+        return results
+
+    def setup_routes(self):
+        @self.app.get("/health")
+        async def health(request: Request):
+            results = await self.gather_json(request, b"")
+            return {
+                "status": "healthy" if all(results) else "degraded",
+                "server": "fastapi-mcp-server",
+                "workers": [{"url": url, **(result or {"status": "unavailable"})}
+                            for url, result in zip(self.urls, results)],
+            }
+
+        @self.app.api_route("/{path:path}", methods=["GET", "POST", "DELETE"])
+        async def proxy(path: str, request: Request):
+            body = await request.body()
+            data = {}
+            if body and request.headers.get('content-type', '').startswith('application/json'):
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    data = {}
+            method, parts = request.method, path.strip('/').split('/')
+
+            if method == "POST" and path == "execute_query":
+                if data.get("cursor"):
+                    return await self.find(request, body)
+                csv_file_path = data.get("csv_file_path") or self.statements.get(data.get("statement"))
+                return await self.forward(self.worker_for(csv_file_path), request, body)
+            if method == "POST" and path in ("describe_dataset", "jobs", "warmup"):
+                return await self.forward(self.worker_for(data.get("csv_file_path")), request, body)
+            if method == "DELETE" and path == "pins":
+                return await self.forward(self.worker_for(request.query_params.get("csv_file_path")), request, body)
+
+            if parts[0] in ("queries", "jobs") and len(parts) > 1:
+                return await self.find(request, body)
+
+            if (method, parts[0]) in (("POST", "statements"), ("DELETE", "statements"),
+                                      ("DELETE", "cursors"), ("DELETE", "cache")):
+                responses = await self.gather(request, body)
+                if any(response is None for response in responses):
+                    return JSONResponse({"detail": "Not every worker is available"}, status_code=503)
+                if path == "statements" and method == "POST" and responses[0].is_success:
+                    self.statements[data.get("name")] = data.get("csv_file_path")
+                elif parts[0] == "statements" and method == "DELETE" and len(parts) > 1:
+                    self.statements.pop(parts[1], None)
+                return Response(responses[0].content, status_code=responses[0].status_code,
+                                media_type=responses[0].headers.get('content-type'))
+
+            if method == "GET" and path in ("queries", "jobs"):
+                merged = []
+                for result in await self.gather_json(request, body):
+                    merged.extend((result or {}).get(path, []))
+                return {path: merged}
+            if method == "GET" and path == "slow_queries":
+                merged = []
+                for result in await self.gather_json(request, body):
+                    merged.extend((result or {}).get("queries", []))
+                merged.sort(key=lambda entry: entry["seconds"], reverse=True)
+                return {"queries": merged[:int(request.query_params.get("limit", 20))]}
+            if method == "GET" and path == "metrics":
+                responses = await self.gather(request, body)
+                return PlainTextResponse(
+                    merge_metrics([(str(i), response.text) for i, response in enumerate(responses)
+                                   if response is not None and response.is_success]),
+                    media_type="text/plain; version=0.0.4"
+                )
+            if method == "GET" and path in ("warmup", "cache/stats"):
+                results = await self.gather_json(request, body)
+                return {"workers": [{"url": url, **(result or {})} for url, result in zip(self.urls, results)]}
+
+            return await self.forward(self.urls[0], request, body)
+
+
+async def wait_ready(urls: List[str], timeout: float = 120.0):
+    deadline = time.time() + timeout
+    async with httpx.AsyncClient(timeout=5) as client:
+        for url in urls:
+            while True:
+                try:
+                    if (await client.get(f"{url}/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.time() > deadline:
+                    raise RuntimeError(f"HTTP worker {url} did not start")
+                await asyncio.sleep(0.5)
+
+
+async def run_router(script: str, workers: int, host: str, port: int, env: Optional[Dict[str, str]] = None):
+    """Run `workers` HTTP worker processes (with `env` added to theirs) behind a routing front on host:port"""
+    supervisor = WorkerSupervisor(
+        script, workers, int(os.getenv('WORKER_BASE_PORT', str(port + 1))),
+        env if env is not None else worker_environment(workers)
+    )
+    supervisor.start()
+    router = Router(supervisor.urls)
+
+    async def supervise():
+        while True:
+            await asyncio.sleep(5)
+            supervisor.check()
+
+    monitor = asyncio.ensure_future(supervise())
+    try:
+        await wait_ready(supervisor.urls)
+        logger.info(f"Routing port {port} to {workers} HTTP workers on {', '.join(supervisor.urls)}")
+
+        # Preload each manifest dataset on the worker that will serve it
+        manifest = os.getenv('PRELOAD_MANIFEST')
+        if manifest:
+            try:
+                for entry in load_manifest(manifest):
+                    csv_file_path = ','.join(entry.csv_file_paths)
+                    await router.client.post(
+                        f"{router.worker_for(csv_file_path)}/warmup",
+                        json={"csv_file_path": csv_file_path, "pin": entry.pin, "priority": entry.priority}
+                    )
+            except (OSError, ValueError, httpx.TransportError) as e:
+                logger.error(f"Could not read preload manifest {manifest}: {str(e)}")
+
+        server = uvicorn.Server(uvicorn.Config(router.app, host=host, port=port, log_level="info"))
+        await server.serve()
+    finally:
+        monitor.cancel()
+        await router.client.aclose()
+        supervisor.stop()
@@ -0,0 +1,46 @@
+import glob
+import os
+from typing import List, Tuple
+
+GLOB_CHARS = ('*', '?', '[')
+
+
+def is_multi_file(path: str) -> bool:
+    """Whether a path names several files: a glob such as `logs/*.csv` or a directory"""
+    return any(char in path for char in GLOB_CHARS) or os.path.isdir(path)
+
+
+def expand_source(path: str) -> List[str]:
+    """The CSV files a path refers to, in a stable order.
+
+    A directory stands for the CSV files directly inside it; `**` in a glob
+    matches nested directories.
+    """
+    if not is_multi_file(path):
+        return [path]
+    pattern = os.path.join(path, '*.csv') if os.path.isdir(path) else path
+    return sorted(
+        match for match in glob.glob(pattern, recursive=True)
+        if match.endswith('.csv') and os.path.isfile(match)
+    )
+
+
+def source_stat(path: str) -> Tuple[float, int]:
+    """(mtime, size) of a file, or for a glob/directory the newest mtime and total size of its files.
+
+    The mtimes of the matched files' directories are included, so adding or
+    removing a file changes the result even when sizes happen to add up.
+    """
+    if not is_multi_file(path):
+        stat = os.stat(path)
+        return stat.st_mtime, stat.st_size
+    files = expand_source(path)
+    if not files:
+        raise FileNotFoundError(f"No CSV files match {path}")
+    mtime, size = 0.0, 0
+    for file_path in files:
+        stat = os.stat(file_path)
+        mtime, size = max(mtime, stat.st_mtime), size + stat.st_size
+    for directory in {os.path.dirname(file_path) or '.' for file_path in files}:
+        mtime = max(mtime, os.stat(directory).st_mtime)
+    return mtime, size
@@ -0,0 +1,117 @@
+import datetime
+import decimal
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import duckdb
+
+Params = Union[Dict[str, Any], List[Any], None]
+
+# Declared parameter type -> converter from its JSON value
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    'BOOLEAN': lambda v: v if isinstance(v, bool) else str(v).strip().lower() in ('1', 'true', 't', 'yes'),
+    'TINYINT': int, 'SMALLINT': int, 'INTEGER': int, 'BIGINT': int, 'HUGEINT': int,
+    'FLOAT': float, 'DOUBLE': float, 'REAL': float,
+    'DECIMAL': lambda v: decimal.Decimal(str(v)),
+    'VARCHAR': str, 'TEXT': str,
+    'DATE': lambda v: datetime.date.fromisoformat(v),
+    'TIMESTAMP': lambda v: datetime.datetime.fromisoformat(v),
+    'TIME': lambda v: datetime.time.fromisoformat(v),
+}
+
+
+def parameter_names(sql: str) -> List[str]:
+    """Parameters used by a single SQL statement (`$name`, or `$1`/`?` for positional)"""
+    statements = duckdb.extract_statements(sql)
+    if len(statements) != 1:
+        raise ValueError("Exactly one SQL statement is expected")
+    return sorted(statements[0].named_parameters)
+
+
+def convert_params(params: Params, types: Dict[str, str]) -> Params:
+    """Convert JSON parameter values to the declared types (by name, or by 1-based position)"""
+    if not params or not types:
+        return params
+
+    def convert(key: str, value: Any) -> Any:
+        declared = types.get(key)
+        if declared is None or value is None:
+            return value
+        converter = _CONVERTERS.get(declared.upper().split('(')[0])
+        if converter is None:
+            raise ValueError(f"Unsupported parameter type {declared} for {key}")
+        try:
+            return converter(value)
+        except (TypeError, ValueError, decimal.InvalidOperation) as e:
+            raise ValueError(f"Parameter {key} is not a valid {declared}: {value!r}") from e
+
+    if isinstance(params, dict):
+        return {key: convert(key, value) for key, value in params.items()}
+    return [convert(str(i + 1), value) for i, value in enumerate(params)]
+
+
+class Statement:
+    """A named, parameterised query that clients run by name with different parameters"""
+
+    def __init__(self, name: str, sql: str, csv_file_path: Optional[str] = None,
+                 param_types: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.sql = sql
+        self.csv_file_path = csv_file_path
+        self.param_types = {key: value.upper() for key, value in (param_types or {}).items()}
+        self.parameters = parameter_names(sql)
+        unknown = set(self.param_types) - set(self.parameters)
+        if unknown:
+            raise ValueError(f"Types given for unknown parameters: {', '.join(sorted(unknown))}")
+        self.created = time.time()
+        self.executions = 0
+
+    def bind(self, params: Params) -> Params:
+        """Check the supplied parameters against the statement and convert them to their types"""
+        if isinstance(params, dict):
+            supplied = set(params)
+        else:
+            supplied = {str(i + 1) for i in range(len(params or []))}
+        if supplied != set(self.parameters):
+            raise ValueError(
+                f"Statement {self.name} expects parameters {self.parameters}, got {sorted(supplied)}"
+            )
+        return convert_params(params, self.param_types)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "query": self.sql,
+            "csv_file_path": self.csv_file_path,
+            "parameters": self.parameters,
+            "param_types": self.param_types,
+            "executions": self.executions,
+        }
+
+
+class StatementRegistry:
+    def __init__(self):
+        self.statements: Dict[str, Statement] = {}
+        self.lock = threading.Lock()
+
+    def add(self, statement: Statement) -> Statement:
+        with self.lock:
+            self.statements[statement.name] = statement
+        return statement
+
+    def get(self, name: str) -> Statement:
+        with self.lock:
+            statement = self.statements.get(name)
+        if statement is None:
+            raise KeyError(f"Unknown statement: {name}")
+        return statement
+
+    def remove(self, name: str):
+        with self.lock:
+            if self.statements.pop(name, None) is None:
+                raise KeyError(f"Unknown statement: {name}")
+
+    def list(self) -> List[Statement]:
+        with self.lock:
+            return list(self.statements.values())
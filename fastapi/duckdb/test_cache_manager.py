@@ -0,0 +1,95 @@
+from cache_manager import DatasetCacheManager
+
+
+class FakeMemory:
+    """Resident bytes as the sum of the sizes of the values not yet released"""
+
+    def __init__(self):
+        self.held = {}
+        self.released = []
+
+    def load(self, key, size):
+        self.held[key] = size
+        return key
+
+    def release(self, value):
+        self.held.pop(value, None)
+        self.released.append(value)
+
+    def resident(self):
+        return sum(self.held.values())
+
+
+def make_cache(memory, budget=100, idle_ttl=600):
+    return DatasetCacheManager(release=memory.release, resident_bytes=memory.resident,
+                               memory_budget=budget, idle_ttl=idle_ttl)
+
+
+def test_budget_evicts_least_recently_used_idle_entry():
+    memory = FakeMemory()
+    cache = make_cache(memory)
+    for key in ("a", "b"):
+        cache.done(key, cache.get(key, lambda key=key: memory.load(key, 60)))
+    assert memory.released == ["a"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entry_in_use_is_not_evicted():
+    memory = FakeMemory()
+    cache = make_cache(memory)
+    a = cache.get("a", lambda: memory.load("a", 60))
+    cache.done("b", cache.get("b", lambda: memory.load("b", 60)))
+    assert memory.released == []
+    assert cache.stats()["entries"] == 2
+
+    # Once handed back it is evictable again
+    cache.done("a", a)
+    cache.enforce_budget()
+    assert memory.released == ["a"]
+
+
+def test_entry_in_use_is_not_expired():
+    memory = FakeMemory()
+    cache = make_cache(memory, idle_ttl=-1)
+    a = cache.get("a", lambda: memory.load("a", 10))
+    cache.expire()
+    assert memory.released == []
+    cache.done("a", a)
+    cache.expire()
+    assert memory.released == ["a"]
+
+
+def test_clear_releases_entries_in_use_after_their_last_user():
+    memory = FakeMemory()
+    cache = make_cache(memory)
+    first = cache.get("a", lambda: memory.load("a", 10))
+    second = cache.get("a", lambda: memory.load("a", 10))
+    assert first is second
+    cache.clear()
+    assert memory.released == []
+    cache.done("a", first)
+    assert memory.released == []
+    cache.done("a", second)
+    assert memory.released == ["a"]
+
+
+def test_eviction_stops_when_it_frees_nothing():
+    released = []
+    # Every entry shares the same memory, so no eviction reduces it
+    cache = DatasetCacheManager(release=released.append, resident_bytes=lambda: 1000,
+                                memory_budget=None, idle_ttl=600)
+    for key in ("a", "b", "c", "d"):
+        cache.done(key, cache.get(key, lambda key=key: key))
+    cache.memory_budget = 100
+    cache.enforce_budget()
+    assert released == ["a"]
+    assert cache.stats()["entries"] == 3
+
+
+def test_pinned_entry_is_not_evicted():
+    memory = FakeMemory()
+    cache = make_cache(memory)
+    cache.done("a", cache.get("a", lambda: memory.load("a", 60)))
+    cache.pin("a")
+    cache.done("b", cache.get("b", lambda: memory.load("b", 60)))
+    assert memory.released == []
@@ -0,0 +1,76 @@
+import os
+
+import duckdb
+import pytest
+
+from catalog import DatasetCatalog, LoadPolicy, quote_identifier, quote_literal
+
+
+def load_table(cursor, name, path, lazy):
+    cursor.execute(f"CREATE OR REPLACE TABLE {quote_identifier(name)} AS "
+                   f"SELECT * FROM read_csv_auto({quote_literal(path)}, sample_size = -1)")
+
+
+@pytest.fixture
+def catalog():
+    return DatasetCatalog(duckdb.connect(), load_table, policy=LoadPolicy('table'), load_workers=1)
+
+
+def rows(catalog, path):
+    table = catalog.acquire_files([path])[0]
+    return catalog.conn.execute(f"SELECT * FROM {quote_identifier(table.name)} ORDER BY id").fetchall()
+
+
+def write(path, text, mode='w'):
+    with open(path, mode) as f:
+        f.write(text)
+
+
+def test_append_ingests_only_new_rows(catalog, tmp_path):
+    path = str(tmp_path / "events.csv")
+    write(path, "id,name\n1,a\n2,b\n")
+    assert rows(catalog, path) == [(1, 'a'), (2, 'b')]
+    write(path, "3,c\n4,d\n", 'a')
+    assert rows(catalog, path) == [(1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')]
+    assert (catalog.full_loads, catalog.appends) == (1, 1)
+
+
+def test_edit_to_loaded_part_forces_full_reload(catalog, tmp_path):
+    path = str(tmp_path / "events.csv")
+    # Large enough that a sampled hash would skip the edited region
+    lines = [f"{i},{'x' * 60}\n" for i in range(80000)]
+    write(path, "id,name\n" + ''.join(lines))
+    assert len(rows(catalog, path)) == 80000
+    offset = len("id,name\n") + sum(len(line) for line in lines[:25000])
+    with open(path, 'r+b') as f:
+        f.seek(offset + len("25000,"))
+        f.write(b'y')
+    write(path, f"80000,{'x' * 60}\n", 'a')
+    loaded = rows(catalog, path)
+    assert len(loaded) == 80001
+    assert loaded[25000] == (25000, 'y' + 'x' * 59)
+    assert (catalog.full_loads, catalog.appends) == (2, 0)
+
+
+def test_partial_last_line_waits_until_complete(catalog, tmp_path):
+    path = str(tmp_path / "events.csv")
+    write(path, "id,name\n1,a\n")
+    rows(catalog, path)
+    write(path, "2,b\n3,", 'a')
+    assert rows(catalog, path) == [(1, 'a'), (2, 'b')]
+    # Nothing changed since, so the partial line is not looked at again
+    assert rows(catalog, path) == [(1, 'a'), (2, 'b')]
+    assert (catalog.full_loads, catalog.appends) == (1, 1)
+    write(path, "c\n", 'a')
+    assert rows(catalog, path) == [(1, 'a'), (2, 'b'), (3, 'c')]
+    assert (catalog.full_loads, catalog.appends) == (1, 2)
+
+
+def test_shrunk_file_is_reloaded_in_full(catalog, tmp_path):
+    path = str(tmp_path / "events.csv")
+    write(path, "id,name\n1,a\n2,b\n3,c\n")
+    rows(catalog, path)
+    write(path, "id,name\n1,a\n")
+    os.utime(path, (1, 1))
+    assert rows(catalog, path) == [(1, 'a')]
+    assert (catalog.full_loads, catalog.appends) == (2, 0)
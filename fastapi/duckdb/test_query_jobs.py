@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from query_jobs import JobManager, valid_job_id
+from query_tracker import QueryHandle
+
+
+@pytest.mark.parametrize("job_id", ["daily-report", "job_1", "A" * 64])
+def test_valid_job_ids(job_id):
+    assert valid_job_id(job_id)
+
+
+@pytest.mark.parametrize("job_id", ["", "A" * 65, "../etc/passwd", "a/b", "a\\b", "job.1", "job\n", "jöb"])
+def test_invalid_job_ids(job_id):
+    assert not valid_job_id(job_id)
+
+
+def test_add_rejects_path_traversal(tmp_path):
+    jobs = JobManager(str(tmp_path / "spool"))
+    with pytest.raises(ValueError):
+        jobs.add(QueryHandle("../../outside", "SELECT 1", None), [])
+
+
+def test_spool_file_stays_in_spool_dir(tmp_path):
+    spool_dir = str(tmp_path / "spool")
+    jobs = JobManager(spool_dir)
+    job = jobs.add(QueryHandle("report", "SELECT 1", None), [])
+    assert os.path.dirname(job.result_path) == spool_dir
+    assert "report" not in os.path.basename(job.result_path)
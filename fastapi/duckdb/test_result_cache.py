@@ -0,0 +1,47 @@
+from result_cache import ResultCache, is_cacheable, normalize_sql
+
+
+def test_normalize_lowercases_and_collapses_unquoted_text_only():
+    sql = 'SELECT  "MixedCase" ,\n\tName  FROM data_0 -- note\nWHERE Name = \'Bob\';'
+    assert normalize_sql(sql) == 'select "MixedCase",name from data_0 where name=\'Bob\''
+
+
+def test_normalize_preserves_dollar_quoted_strings():
+    assert normalize_sql("SELECT $$Hello  World$$ AS T") == "select $$Hello  World$$ as t"
+    assert normalize_sql("SELECT $x$It's $$ Fine$x$") == "select $x$It's $$ Fine$x$"
+    assert normalize_sql("SELECT $$A$$") != normalize_sql("SELECT $$a$$")
+
+
+def test_quoted_identifiers_with_different_case_get_different_keys():
+    first = ResultCache.make_key('d', 'SELECT "Col" FROM data_0')
+    second = ResultCache.make_key('d', 'SELECT "col" FROM data_0')
+    assert first is not None and second is not None and first != second
+    assert ResultCache.make_key('d', 'select  "Col"  from DATA_0') == first
+
+
+def test_read_only_queries_over_loaded_data_are_cacheable():
+    assert is_cacheable(normalize_sql('SELECT count(*) FROM data_0'))
+    assert is_cacheable(normalize_sql('WITH t AS (SELECT 1) SELECT * FROM t'))
+    assert is_cacheable(normalize_sql('SELECT * FROM "Data 0"'))
+    assert is_cacheable(normalize_sql("SELECT * FROM data_0 WHERE path = 'read_csv(x)'"))
+
+
+def test_volatile_and_write_statements_are_not_cacheable():
+    assert not is_cacheable(normalize_sql('SELECT random() FROM data_0'))
+    assert not is_cacheable(normalize_sql('SELECT NOW()'))
+    assert not is_cacheable(normalize_sql('CREATE TABLE t AS SELECT 1'))
+
+
+def test_queries_reading_other_files_are_not_cacheable():
+    for sql in (
+        "SELECT * FROM read_csv('/tmp/other.csv')",
+        "SELECT * FROM READ_PARQUET ('s3://bucket/x.parquet')",
+        "SELECT * FROM data_0 JOIN read_json_auto('x.json') USING (id)",
+        "SELECT * FROM parquet_scan('x.parquet')",
+        "SELECT * FROM glob('*.csv')",
+        "SELECT * FROM '/tmp/other.csv'",
+        "SELECT * FROM data_0 JOIN 'lookup.parquet' l ON data_0.id = l.id",
+        'SELECT * FROM "other.csv"',
+    ):
+        assert not is_cacheable(normalize_sql(sql)), sql
+        assert ResultCache.make_key('d', sql) is None, sql
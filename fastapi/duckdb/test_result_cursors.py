@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pyarrow as pa
+
+from result_cursors import CursorRegistry, ResultCursor
+
+
+class SlowReader:
+    """Record batch reader whose reads block until `release` is set"""
+
+    def __init__(self, batches):
+        self.schema = batches[0].schema
+        self.batches = list(batches)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.closed = False
+
+    def read_next_batch(self):
+        self.reading.set()
+        self.release.wait()
+        assert not self.closed, "read from a closed reader"
+        if not self.batches:
+            raise StopIteration
+        return self.batches.pop(0)
+
+
+def make_cursor(batches=3):
+    reader = SlowReader([pa.record_batch({'a': [i]}) for i in range(batches)])
+    closed = []
+    cursor = ResultCursor(None, reader, page_size=1, on_close=lambda: closed.append(True))
+    return cursor, reader, closed
+
+
+def test_close_waits_for_page_being_read():
+    cursor, reader, closed = make_cursor()
+    reader.reading.clear()
+    reader.release.clear()
+    pages = []
+    thread = threading.Thread(target=lambda: pages.append(cursor.next_page()))
+    thread.start()
+    reader.reading.wait(1)
+    closer = threading.Thread(target=lambda: (cursor.close(), setattr(reader, 'closed', True)))
+    closer.start()
+    time.sleep(0.05)
+    assert not closed
+    reader.release.set()
+    thread.join(1)
+    closer.join(1)
+    assert pages[0].column('a').to_pylist() == [0]
+    assert closed == [True]
+    assert cursor.next_page() is None and cursor.exhausted
+
+
+def test_expire_skips_cursors_serving_a_page():
+    registry = CursorRegistry(ttl=0)
+    idle, _, idle_closed = make_cursor()
+    busy, _, busy_closed = make_cursor()
+    registry.add(idle)
+    registry.add(busy)
+    time.sleep(0.01)
+    with busy.lock:
+        registry.expire()
+    assert idle_closed == [True] and not busy_closed
+    assert list(registry.cursors) == [busy.id]
+    registry.expire()
+    assert busy_closed == [True] and not registry.cursors
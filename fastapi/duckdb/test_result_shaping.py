@@ -0,0 +1,42 @@
+import pyarrow as pa
+
+from result_shaping import ShapeOptions, encode_compact, shape_result
+
+
+def wide_table(columns, rows=50, width=100):
+    return pa.table({f"c{j}": [f"{j}-{i}".ljust(width, 'x') for i in range(rows)] for j in range(columns)})
+
+
+def summarize(table):
+    return {name: {"type": "string", "nulls": 0, "distinct": table.num_rows,
+                   "min": table.column(name)[0].as_py(), "max": table.column(name)[-1].as_py()}
+            for name in table.column_names}
+
+
+def test_small_result_is_returned_whole():
+    table = wide_table(2, rows=3, width=1)
+    document, head, tail = shape_result(table, table, 3, ShapeOptions(10, 10000), {}, lambda: summarize(table))
+    assert (document["truncated"], document["returnedRows"], head, tail) == (False, 3, 3, 0)
+    assert "summary" not in document
+
+
+def test_rows_are_halved_to_fit_max_bytes():
+    table = wide_table(1)
+    document, head, tail = shape_result(table, table, 50, ShapeOptions(50, 2000), {}, lambda: summarize(table))
+    assert document["truncated"] and 0 < head < 50 and tail == 0
+    assert len(encode_compact(document)) <= 2000
+
+
+def test_summary_min_max_are_dropped_when_they_do_not_fit():
+    table = wide_table(8)
+    document, head, _ = shape_result(table, table, 50, ShapeOptions(50, 1200), {}, lambda: summarize(table))
+    assert head == 0 and document["summaryTrimmed"]
+    assert all("min" not in summary for summary in document["summary"].values())
+    assert len(encode_compact(document)) <= 1200
+
+
+def test_summary_is_omitted_when_even_counts_do_not_fit():
+    table = wide_table(40, width=1)
+    document, head, _ = shape_result(table, table, 50, ShapeOptions(50, 1100), {}, lambda: summarize(table))
+    assert head == 0 and document["summaryOmitted"] and "summary" not in document
+    assert len(encode_compact(document)) <= 1100
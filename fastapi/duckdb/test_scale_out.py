@@ -0,0 +1,45 @@
+import os
+
+from scale_out import HashRing, Router, route_key
+
+WORKERS = ['http://w0', 'http://w1', 'http://w2']
+KEYS = [f'/data/{i}.csv' for i in range(1000)]
+
+
+def test_placement_is_deterministic():
+    ring = HashRing(WORKERS)
+    # Fixed by the hash function, so every router process agrees without coordination
+    assert [ring.node_for(key) for key in ['/data/a.csv', '/data/b.csv', '/data/c.csv', '/data/d.csv']] == \
+        ['http://w2', 'http://w2', 'http://w1', 'http://w0']
+    reordered = HashRing(list(reversed(WORKERS)))
+    assert all(ring.node_for(key) == reordered.node_for(key) for key in KEYS)
+
+
+def test_keys_are_spread_over_all_workers():
+    ring = HashRing(WORKERS)
+    counts = {worker: 0 for worker in WORKERS}
+    for key in KEYS:
+        counts[ring.node_for(key)] += 1
+    assert all(200 < count < 500 for count in counts.values()), counts
+
+
+def test_removing_a_worker_only_moves_its_keys():
+    before = HashRing(WORKERS)
+    after = HashRing(WORKERS[:2])
+    moved = 0
+    for key in KEYS:
+        old, new = before.node_for(key), after.node_for(key)
+        if old == 'http://w2':
+            assert new in WORKERS[:2]
+            moved += 1
+        else:
+            assert new == old
+    assert moved > 0
+
+
+def test_router_routes_by_absolute_dataset_paths():
+    router = Router(WORKERS)
+    relative = os.path.relpath('/tmp/a.csv')
+    assert route_key(f'{relative}, /tmp/b.csv') == '/tmp/a.csv,/tmp/b.csv'
+    assert router.worker_for(relative) == router.worker_for('/tmp/a.csv') == router.ring.node_for('/tmp/a.csv')
+    assert router.worker_for(None) == WORKERS[0]
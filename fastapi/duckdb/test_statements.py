@@ -0,0 +1,71 @@
+import datetime
+import decimal
+
+import duckdb
+import pytest
+
+from statements import Statement, StatementRegistry, convert_params, parameter_names
+
+
+def test_parameter_names_named_and_positional():
+    assert parameter_names("SELECT * FROM data_0 WHERE a = $min AND b < $max") == ['max', 'min']
+    assert parameter_names("SELECT * FROM data_0 WHERE a = ? AND b < ?") == ['1', '2']
+    with pytest.raises(ValueError):
+        parameter_names("SELECT 1; SELECT 2")
+
+
+def test_bind_converts_to_declared_types():
+    statement = Statement('q', "SELECT $day, $amount, $flag, $n, $label",
+                          param_types={'day': 'date', 'amount': 'DECIMAL(10,2)', 'flag': 'BOOLEAN', 'n': 'BIGINT'})
+    bound = statement.bind({'day': '2024-03-01', 'amount': 12.1, 'flag': 'yes', 'n': '7', 'label': 5})
+    assert bound == {'day': datetime.date(2024, 3, 1), 'amount': decimal.Decimal('12.1'),
+                     'flag': True, 'n': 7, 'label': 5}
+    # The converted values bind directly in DuckDB
+    row = duckdb.connect().execute(statement.sql, bound).fetchone()
+    assert row == (datetime.date(2024, 3, 1), decimal.Decimal('12.1'), True, 7, 5)
+
+
+def test_bind_positional_parameters():
+    statement = Statement('q', "SELECT ? + ?", param_types={'2': 'INTEGER'})
+    assert statement.bind([1, '2']) == [1, 2]
+    assert statement.bind([None, None]) == [None, None]
+
+
+def test_bind_rejects_missing_and_extra_parameters():
+    statement = Statement('q', "SELECT * FROM data_0 WHERE a = $a AND b = $b")
+    with pytest.raises(ValueError, match="expects parameters"):
+        statement.bind({'a': 1})
+    with pytest.raises(ValueError, match="expects parameters"):
+        statement.bind({'a': 1, 'b': 2, 'c': 3})
+    with pytest.raises(ValueError, match="expects parameters"):
+        statement.bind(None)
+    with pytest.raises(ValueError, match="expects parameters"):
+        Statement('p', "SELECT ?").bind([1, 2])
+
+
+def test_bind_rejects_values_that_do_not_convert():
+    statement = Statement('q', "SELECT $n, $day", param_types={'n': 'INTEGER', 'day': 'DATE'})
+    with pytest.raises(ValueError, match="n is not a valid INTEGER"):
+        statement.bind({'n': 'seven', 'day': '2024-01-01'})
+    with pytest.raises(ValueError, match="day is not a valid DATE"):
+        statement.bind({'n': 1, 'day': 20240101})
+
+
+def test_declared_types_must_name_known_parameters_and_types():
+    with pytest.raises(ValueError, match="unknown parameters: b"):
+        Statement('q', "SELECT $a", param_types={'b': 'INTEGER'})
+    with pytest.raises(ValueError, match="Unsupported parameter type"):
+        convert_params({'a': 1}, {'a': 'GEOMETRY'})
+
+
+def test_registry_lookup_and_removal():
+    registry = StatementRegistry()
+    statement = registry.add(Statement('q', "SELECT $a"))
+    assert registry.get('q') is statement
+    replacement = registry.add(Statement('q', "SELECT $b"))
+    assert registry.list() == [replacement]
+    registry.remove('q')
+    with pytest.raises(KeyError, match="Unknown statement: q"):
+        registry.get('q')
+    with pytest.raises(KeyError, match="Unknown statement: q"):
+        registry.remove('q')